@@ -0,0 +1,148 @@
+"""
+Database reads saved by the MongoSQLParser read-through cache.
+
+Replays one workload against two parsers over identical mongomock
+databases, one without and one with a QueryCache. Restaurant popularity is
+Zipf-distributed, and the statement mix follows the app: mostly lookups by
+name or restaurant_id, some rating range SELECTs, rating updates, and a
+trickle of inserts and deletes. Every database call is counted; the cached
+parser's count includes the reads it makes to find what a write touched.
+Each SELECT result of the cached parser must equal the uncached one. Run
+from the app directory:
+
+    python -m benchmarks.query_cache --restaurants 2000 --ops 50000
+"""
+import argparse
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import mongomock
+import numpy as np
+
+from utils.cache import QueryCache
+from utils.parsers import MongoSQLParser
+
+DATABASE = "food-critic-reviews-bench"
+
+# (kind, share of the workload)
+MIX = (("lookup_name", 0.55), ("select_id", 0.2), ("select_range", 0.05),
+       ("update", 0.15), ("insert", 0.03), ("delete", 0.02))
+
+
+class CountingCollection:
+    """Collection proxy counting every method call by name."""
+
+    def __init__(self, collection: Any, counts: Counter):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self._counts[name] += 1
+            return attribute(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, db: Any):
+        self._db = db
+        self.counts: Counter = Counter()
+
+    def __getitem__(self, name: str) -> CountingCollection:
+        return CountingCollection(self._db[name], self.counts)
+
+
+def make_parser(restaurants: int, cache: Any) -> Tuple[MongoSQLParser, CountingDatabase]:
+    parser = MongoSQLParser("mongodb://localhost:27017", DATABASE, cache=cache)
+    # MongoClient connects lazily, so swapping the handle before any query is enough
+    parser.client = mongomock.MongoClient()
+    parser.client[DATABASE]["restaurants"].insert_many([
+        {"restaurant_id": str(i), "name": f"Restaurant {i}", "avg_rating": round(1 + (i * 7919 % 400) / 100, 2)}
+        for i in range(restaurants)
+    ])
+    parser.db = CountingDatabase(parser.client[DATABASE])
+    return parser, parser.db
+
+
+def workload(restaurants: int, ops: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """(kind, argument) pairs; lookups get a name, everything else a statement."""
+    rng = np.random.default_rng(seed)
+    kinds = rng.choice([kind for kind, _ in MIX], size=ops, p=[share for _, share in MIX])
+    popular = (rng.zipf(1.3, size=ops) - 1) % restaurants
+    statements = []
+    inserted = 0
+    for kind, restaurant in zip(kinds, popular):
+        if kind == "lookup_name":
+            statements.append((kind, f"Restaurant {restaurant}"))
+        elif kind == "select_id":
+            statements.append((kind, f"SELECT * FROM restaurants WHERE restaurant_id = '{restaurant}'"))
+        elif kind == "select_range":
+            statements.append((kind, f"SELECT * FROM restaurants WHERE avg_rating > {rng.choice([4.5, 4.8])}"))
+        elif kind == "update":
+            statements.append((kind, f"UPDATE restaurants SET (avg_rating = {rng.integers(10, 50) / 10}) "
+                                     f"WHERE name = 'Restaurant {restaurant}'"))
+        elif kind == "insert":
+            statements.append((kind, f"INSERT INTO restaurants (name, restaurant_id, avg_rating) "
+                                     f"VALUES ('New {inserted}', 'new-{inserted}', 4.9)"))
+            inserted += 1
+        elif inserted:
+            statements.append((kind, f"DELETE FROM restaurants WHERE restaurant_id = 'new-{rng.integers(inserted)}'"))
+    return statements
+
+
+def without_ids(results: Any) -> Any:
+    if isinstance(results, dict):
+        return {key: value for key, value in results.items() if key not in ("_id", "inserted_id")}
+    if results is None:
+        return None
+    return sorted((without_ids(doc) for doc in results), key=lambda doc: (doc["restaurant_id"], repr(doc)))
+
+
+def replay(parser: MongoSQLParser, statements: List[Tuple[str, str]]) -> Tuple[List[Any], float]:
+    results = []
+    started = time.perf_counter()
+    for kind, argument in statements:
+        if kind == "lookup_name":
+            doc = parser.find_restaurant(name=argument)
+            results.append(without_ids([doc] if doc else []))
+        else:
+            results.append(without_ids(parser.execute_query(argument)))
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=50_000)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--ttl", type=float, default=30.0)
+    args = parser.parse_args()
+
+    statements = workload(args.restaurants, args.ops)
+    plain, plain_db = make_parser(args.restaurants, None)
+    cached, cached_db = make_parser(args.restaurants, QueryCache(args.cache_size, args.ttl))
+    plain_results, plain_s = replay(plain, statements)
+    cached_results, cached_s = replay(cached, statements)
+    mismatches = sum(a != b for a, b in zip(plain_results, cached_results))
+
+    print(f"{len(statements)} statements over {args.restaurants} restaurants: "
+          + ", ".join(f"{kind} {count}" for kind, count in Counter(kind for kind, _ in statements).items()))
+    print(f"{'':<10} {'find':>8} {'writes':>8} {'total':>8} {'seconds':>9}")
+    for label, counts, seconds in (("no cache", plain_db.counts, plain_s), ("cache", cached_db.counts, cached_s)):
+        writes = sum(count for name, count in counts.items() if name != "find")
+        print(f"{label:<10} {counts['find']:>8} {writes:>8} {sum(counts.values()):>8} {seconds:>9.2f}")
+    reduction = 1 - cached_db.counts["find"] / plain_db.counts["find"]
+    print(f"find calls reduced by {reduction:.1%}")
+    stats: Dict[str, Any] = cached.cache_stats()
+    print(", ".join(f"{key} {value:.3f}" if isinstance(value, float) else f"{key} {value}"
+                    for key, value in stats.items()))
+    print(f"result mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Server memory for chat history held by many concurrent Streamlit sessions.
+
+Simulates `--sessions` critics each sending `--turns` messages (a user
+message plus the system reply per turn), in a fresh process per variant:
+
+    session_state  dicts with datetimes per session, as the page kept them
+    store          SessionStore: compact tail in memory, the rest in sqlite
+
+RSS is read after building every session's history. The store variant
+also reports append and page-load latency, and RSS after idle sessions are
+evicted. Run from the app directory:
+
+    python -m benchmarks.session_store --sessions 500 --turns 100
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+WORDS = ("the", "pasta", "was", "fresh", "and", "service", "friendly", "but", "dessert", "bland", "tacos",
+         "crispy", "cozy", "loud", "overpriced", "perfect", "portion", "generous", "would", "return")
+REPLY = "Thank you for sharing your thoughts! Your review has been recorded."
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def review(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 60)))
+
+
+def child(variant: str, sessions: int, turns: int, path: str) -> Dict:
+    rng = random.Random(0)
+    gc.collect()
+    baseline = rss_mb()
+    result = {"variant": variant, "baseline_rss_mb": baseline}
+
+    if variant == "session_state":
+        states = {}
+        for turn in range(turns):
+            for session in range(sessions):
+                history = states.setdefault(f"critic-{session}", {}).setdefault("chat_history", [])
+                history.extend([
+                    {"role": "user", "content": review(rng), "timestamp": datetime.now(timezone.utc), "type": "insert"},
+                    {"role": "system", "content": REPLY, "timestamp": datetime.now(timezone.utc), "type": "insert"}
+                ])
+        gc.collect()
+        result["rss_mb"] = rss_mb()
+        return result
+
+    from utils.session_store import SessionStore
+
+    store = SessionStore(path, max_messages=50, idle_seconds=3600)
+    started = time.perf_counter()
+    for turn in range(turns):
+        for session in range(sessions):
+            store.append(f"critic-{session}", "user", review(rng))
+            store.append(f"critic-{session}", "system", REPLY)
+    result["append_us"] = (time.perf_counter() - started) / (2 * turns * sessions) * 1e6
+    gc.collect()
+    result["rss_mb"] = rss_mb()
+
+    started = time.perf_counter()
+    for session in range(sessions):
+        store.history(f"critic-{session}", limit=100)
+    result["page_load_ms"] = (time.perf_counter() - started) / sessions * 1000
+
+    # Everyone but the last tenth goes idle
+    store.idle_seconds = 0
+    store.evict_idle()
+    store.idle_seconds = 3600
+    for session in range(sessions - sessions // 10, sessions):
+        store.history(f"critic-{session}")
+    gc.collect()
+    result["evicted_rss_mb"] = rss_mb()
+    result["resident"] = store.resident()
+    store.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--child", choices=("session_state", "store"), help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.sessions, args.turns, args.db)))
+        return
+
+    print(f"{args.sessions} sessions x {args.turns} turns ({2 * args.sessions * args.turns} messages)")
+    with tempfile.TemporaryDirectory() as directory:
+        for variant in ("session_state", "store"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.session_store", "--child", variant, "--sessions",
+                 str(args.sessions), "--turns", str(args.turns), "--db", os.path.join(directory, "sessions.sqlite3")],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            line = (f"{variant:<14} RSS {result['rss_mb'] - result['baseline_rss_mb']:>7.1f} MB "
+                    f"over a {result['baseline_rss_mb']:.1f} MB baseline")
+            if variant == "store":
+                line += (f"; after idle eviction {result['evicted_rss_mb'] - result['baseline_rss_mb']:.1f} MB "
+                         f"({result['resident'][0]} sessions, {result['resident'][1]} messages resident); "
+                         f"append {result['append_us']:.0f} us, 100-message page {result['page_load_ms']:.2f} ms")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
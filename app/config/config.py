@@ -1,10 +1,21 @@
+import importlib.util
+import logging
 import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from utils.cache import QueryCache
+from utils.events import EventForwarder
+from utils.parsers import MongoSQLParser
 
 # Load environment variables
 load_dotenv()
 
+# Configure logging
+logger = logging.getLogger(__name__)
+
 # Database Configuration
 CLUSTER_NAME = os.getenv('CLUSTER_NAME')
 DB_CONFIG = {
@@ -21,8 +32,61 @@ client = MongoClient(MONGODB_URI)
 db = client["food-critic-reviews"]
 users_collection = db["users"]
 reviews_collection = db['restaurants']
+critic_stats_collection = db['critic_stats']
+
+# Client-side validators compiled from db-setup's VALIDATION_SCHEMAS, for MongoSQLParser(validators=...).
+# Compiled on first use: importing the config (every page does) doesn't pay for it
+DB_SETUP_DIR = Path(__file__).resolve().parents[2] / 'db-setup'
+
+def _load_db_setup_module(name: str):
+    spec = importlib.util.spec_from_file_location(f"db_setup_{name}", DB_SETUP_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@lru_cache(maxsize=1)
+def get_validators() -> Dict[str, Any]:
+    """Return collection name -> compiled validator (db-setup/validation.py), compiling on first use."""
+    return _load_db_setup_module('validation').compile_validators(
+        _load_db_setup_module('constants').VALIDATION_SCHEMAS
+    )
+
+# Read-through cache for MongoSQLParser(cache=QueryCache(...)), see utils/cache.py
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '1024'))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '30'))
+QUERY_CACHE_WATCH = os.getenv('QUERY_CACHE_WATCH', 'true').lower() == 'true'
+
+# Backend event bus: parser writes are forwarded to its POST /api/v1/events (needs the backend's EVENTS_TOKEN)
+BACKEND_URL = os.getenv('BACKEND_URL', 'http://127.0.0.1:5000')
+EVENTS_TOKEN = os.getenv('EVENTS_TOKEN', '')
+
+def create_parser() -> MongoSQLParser:
+    """MongoSQLParser for app writes: validated, cached, and reported to the backend's derived views"""
+    listeners = [EventForwarder(f"{BACKEND_URL}/api/v1/events", EVENTS_TOKEN)] if EVENTS_TOKEN else []
+    if not listeners:
+        logger.warning("EVENTS_TOKEN is not set: app writes will not reach the backend's derived views")
+    parser = MongoSQLParser(MONGODB_URI, "food-critic-reviews", listeners=listeners, validators=get_validators(),
+                            cache=QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL))
+    if QUERY_CACHE_WATCH:
+        parser.watch_cache()
+    return parser
+
+# Chat history store (utils/session_store.py): newest messages per session kept in memory, the rest on disk
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', '.sessions.sqlite3')
+SESSION_MAX_MESSAGES = int(os.getenv('SESSION_MAX_MESSAGES', '50'))
+SESSION_IDLE_SECONDS = float(os.getenv('SESSION_IDLE_SECONDS', '1800'))
+CHAT_PAGE_SIZE = int(os.getenv('CHAT_PAGE_SIZE', '20'))
+
+# Past Activity shows this many of the newest activities, from the backend's activity feed (utils/activity_feed.py)
+ACTIVITY_PAGE_SIZE = int(os.getenv('ACTIVITY_PAGE_SIZE', '20'))
+ACTIVITY_STREAM_ADMIN_TOKEN = os.getenv('ACTIVITY_STREAM_ADMIN_TOKEN', '')  # live updates; polls the API without it
+ACTIVITY_POLL_INTERVAL = float(os.getenv('ACTIVITY_POLL_INTERVAL', '10'))  # seconds, while not live
+ACTIVITY_REFRESH_INTERVAL = float(os.getenv('ACTIVITY_REFRESH_INTERVAL', '2'))  # seconds between Past Activity redraws
 
 # Get the Google Cloud Variables
 LOCATION = os.getenv('LOCATION')
 PROJECT_ID = os.getenv('PROJECT_ID')
-BG_IMAGE_URL = os.getenv('BG_IMAGE_URL')
\ No newline at end of file
+BG_IMAGE_URL = os.getenv('BG_IMAGE_URL')
+
+# Per-rerun timing panel on the critic page (debug only)
+DEBUG_TIMINGS = os.getenv('DEBUG_TIMINGS', 'false').lower() == 'true'
@@ -1,14 +1,95 @@
+import html
 import streamlit as st
 from pages.sign_in import sign_in_page
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-from config.config import reviews_collection, BG_IMAGE_URL
+from config.config import (
+    create_parser, critic_stats_collection, BG_IMAGE_URL, DEBUG_TIMINGS,
+    SESSION_DB_PATH, SESSION_MAX_MESSAGES, SESSION_IDLE_SECONDS, CHAT_PAGE_SIZE, ACTIVITY_PAGE_SIZE,
+    BACKEND_URL, ACTIVITY_STREAM_ADMIN_TOKEN, ACTIVITY_POLL_INTERVAL, ACTIVITY_REFRESH_INTERVAL
+)
+from utils.activity_feed import ActivityFeed
+from utils.parsers import MongoSQLParser
+from utils.session_store import SessionStore
+from utils.timing import RerunTimer
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    # One store per server process, shared by every browser session
+    return SessionStore(SESSION_DB_PATH, SESSION_MAX_MESSAGES, SESSION_IDLE_SECONDS)
+
+@st.cache_resource
+def get_parser() -> MongoSQLParser:
+    # One parser per server process: every session shares its query cache and change-stream watcher
+    return create_parser()
+
+@st.cache_resource
+def get_activity_feed() -> ActivityFeed:
+    # One backend stream per server process, however many sessions show Past Activity
+    return ActivityFeed(BACKEND_URL, ACTIVITY_STREAM_ADMIN_TOKEN, ACTIVITY_PAGE_SIZE,
+                        poll_interval=ACTIVITY_POLL_INTERVAL)
+
+def find_restaurant(parser: MongoSQLParser, key: str):
+    # Restaurant ids are numeric strings; anything else is a name
+    return parser.find_restaurant(restaurant_id=key) if key.isdigit() else parser.find_restaurant(name=key)
+
+def describe_activity(activity) -> str:
+    details = activity.get('details') or {}
+    if activity.get('action') == 'chat':
+        return details.get('response', '')
+    if 'collection' in details:
+        return f"{activity['action'].capitalize()} on {details['collection']} ({details.get('documents', 0)} documents)"
+    return ", ".join(f"{key}: {value}" for key, value in details.items())
+
+@st.fragment(run_every=ACTIVITY_REFRESH_INTERVAL)
+def past_activity(feed: ActivityFeed, username: str, timer: RerunTimer):
+    with timer.section("db_fetch"):
+        activities = feed.activities(username)
+    
+    if not activities:
+        st.markdown("""
+            <div class="activity-card">
+                <h3>No Recent Activity</h3>
+                <p>Start a conversation to see your activity here!</p>
+            </div>
+        """, unsafe_allow_html=True)
+        return
+    
+    with timer.section("html_build"):
+        activity_html = []
+        for activity in activities:
+            activity_type = {'update': 'modify'}.get(activity.get('action'), activity.get('action'))
+            background_color = {
+                'insert': 'rgba(232, 245, 233, 0.9)',
+                'modify': 'rgba(255, 243, 224, 0.9)',
+                'delete': 'rgba(255, 235, 238, 0.9)'
+            }.get(activity_type, 'rgba(255, 255, 255, 0.9)')
+            
+            # Activity timestamps are ISO-8601 in UTC; show them in EST
+            timestamp = datetime.fromisoformat(activity['timestamp'])
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            est_time = timestamp.astimezone(ZoneInfo("America/New_York"))
+            
+            activity_html.append(f"""
+                <div class="activity-card" style="background: {background_color};">
+                    <strong>Type:</strong> {html.escape(str(activity.get('action')))}<br>
+                    <strong>Date:</strong> {est_time.strftime('%Y-%m-%d %H:%M')}<br>
+                    <strong>Message:</strong> {html.escape(describe_activity(activity))}
+                </div>
+            """)
+    with timer.section("render"):
+        for card in activity_html:
+            st.markdown(card, unsafe_allow_html=True)
 
 def food_critic_page():
     if not st.session_state.get("authenticated", False):
         sign_in_page()
         return
 
+    # Time spent per rerun in DB fetches, HTML building and rendering
+    timer = RerunTimer(DEBUG_TIMINGS)
+
     st.title("Connoisseur's Corner")
 
     # Hide all Streamlit default elements and set background
@@ -115,23 +196,80 @@ def food_critic_page():
     # Welcome text
     st.markdown('<div class="welcome-text">You can add, modify & change your reviews</div>', unsafe_allow_html=True)
 
-    # Initialize chat history
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
+    # Critic profile (single indexed lookup on the critic_stats rollup)
+    with timer.section("db_fetch"):
+        critic_stats = critic_stats_collection.find_one({"_id": st.session_state["username"]})
+    if critic_stats and critic_stats.get("review_count"):
+        with timer.section("html_build"):
+            review_count = critic_stats["review_count"]
+            sentiment_count = critic_stats.get("sentiment_count") or 0
+            mean_sentiment = (
+                f"{critic_stats.get('sentiment_sum', 0) / sentiment_count:+.2f}" if sentiment_count else "n/a"
+            )
+            profile_html = f"""
+                <div class="activity-card">
+                    <strong>Reviews:</strong> {int(review_count)}<br>
+                    <strong>Mean rating:</strong> {critic_stats.get('rating_sum', 0) / review_count:.2f}<br>
+                    <strong>Mean sentiment:</strong> {mean_sentiment}<br>
+                    <strong>Harshness vs. restaurant average:</strong> {critic_stats.get('harshness_sum', 0) / review_count:+.2f}
+                </div>
+            """
+        with timer.section("render"):
+            st.markdown(profile_html, unsafe_allow_html=True)
+
+    # Restaurant lookup, answered from the parser's read-through cache when it can be
+    parser = get_parser()
+    lookup = st.text_input("Look up a restaurant by name or id").strip()
+    if lookup:
+        with timer.section("db_fetch"):
+            restaurant = find_restaurant(parser, lookup)
+        if restaurant is None:
+            st.warning(f"No restaurant matches {lookup}")
+        else:
+            with timer.section("html_build"):
+                address = restaurant.get("address") or {}
+                reviews = restaurant.get("critic_reviews") or []
+                restaurant_html = f"""
+                    <div class="activity-card">
+                        <strong>{restaurant.get('name')}</strong> (#{restaurant.get('restaurant_id')})<br>
+                        <strong>Address:</strong> {address.get('building', '')} {address.get('street', '')}, {address.get('zipcode', '')}<br>
+                        <strong>Average rating:</strong> {float(restaurant.get('avg_rating') or 0):.2f} from {len(reviews)} reviews
+                    </div>
+                """
+            with timer.section("render"):
+                st.markdown(restaurant_html, unsafe_allow_html=True)
+
+    # Chat history lives in the session store; session_state only holds how many pages are shown
+    store = get_session_store()
+    username = st.session_state["username"]
+    pages = st.session_state.setdefault("chat_pages", 1)
+    with timer.section("db_fetch"):
+        chat_history = store.history(username, limit=CHAT_PAGE_SIZE * pages)
+        has_earlier = store.count(username) > len(chat_history)
+
+    if has_earlier and st.button("Load earlier messages"):
+        st.session_state.chat_pages = pages + 1
+        st.rerun()
+
     # Chat window
-    for msg in st.session_state.chat_history:
-        msg_class = "user-message" if msg["role"] == "user" else "system-message"
-        # Convert UTC to EST
-        est_time = msg["timestamp"].astimezone(ZoneInfo("America/New_York"))
-        st.markdown(f"""
-            <div class="message">
-                <div class="message-container {msg_class}">
-                    <p>{msg["content"]}</p>
-                    <div class="timestamp">{est_time.strftime('%H:%M')}</div>
+    with timer.section("html_build"):
+        eastern = ZoneInfo("America/New_York")
+        message_html = []
+        for msg in chat_history:
+            msg_class = "user-message" if msg.role == "user" else "system-message"
+            # Convert UTC to EST
+            est_time = datetime.fromtimestamp(msg.timestamp, timezone.utc).astimezone(eastern)
+            message_html.append(f"""
+                <div class="message">
+                    <div class="message-container {msg_class}">
+                        <p>{msg.content}</p>
+                        <div class="timestamp">{est_time.strftime('%H:%M')}</div>
+                    </div>
                 </div>
-            </div>
-        """, unsafe_allow_html=True)
+            """)
+    with timer.section("render"):
+        for card in message_html:
+            st.markdown(card, unsafe_allow_html=True)
     
     # Chat input
     with st.form("chat_form", clear_on_submit=True):
@@ -143,27 +281,37 @@ def food_critic_page():
             reset = st.form_submit_button("Reset")
             
     if send and user_input:
-        user_message = {
-            "role": "user",
-            "content": user_input,
-            "timestamp": datetime.now(timezone.utc),
-            "type": "insert"
-        }
-        system_message = {
-            "role": "system",
-            "content": "Thank you for sharing your thoughts! Your review has been recorded.",
-            "timestamp": datetime.now(timezone.utc),
-            "type": "insert"
-        }
-        st.session_state.chat_history.extend([user_message, system_message])
-        
-        # Save to database
-        # reviews_collection.insert_many([user_message, system_message])
+        store.append(username, "user", user_input, type="insert")
+        store.append(username, "system", "Thank you for sharing your thoughts! Your review has been recorded.",
+                     type="insert")
         st.rerun()
     
     if reset:
-        st.session_state.chat_history = []
+        store.clear(username)
+        st.session_state.chat_pages = 1
         st.rerun()
+
+    # Review a restaurant: validated client-side, then written through the parser
+    with st.form("review_form", clear_on_submit=True):
+        review_restaurant = st.text_input("Restaurant name or id")
+        rating = st.slider("Rating", 1, 5, 4)
+        review_text = st.text_area("Your review", height=100)
+        post = st.form_submit_button("Post review")
+
+    if post and review_restaurant.strip() and review_text.strip():
+        restaurant = find_restaurant(parser, review_restaurant.strip())
+        if restaurant is None:
+            st.error(f"No restaurant matches {review_restaurant.strip()}")
+        else:
+            try:
+                parser.add_review(restaurant["restaurant_id"],
+                                  {"name": username, "review": review_text.strip(), "rating": rating}, actor=username)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                store.append(username, "system", f"Your review of {restaurant['name']} has been recorded.",
+                             type="insert")
+                st.rerun()
         
     # Past activity section
     st.subheader("Past Activity")
@@ -186,37 +334,10 @@ def food_critic_page():
         </div>
     """, unsafe_allow_html=True)
     
-    # Display activities
-    activities = list(reviews_collection.find(
-        {"username": st.session_state["username"]}
-    ).sort("timestamp", -1))
-    
-    if not activities:
-        st.markdown("""
-            <div class="activity-card">
-                <h3>No Recent Activity</h3>
-                <p>Start a conversation to see your activity here!</p>
-            </div>
-        """, unsafe_allow_html=True)
-    else:
-        for activity in activities:
-            activity_type = activity.get('type', 'insert')
-            background_color = {
-                'insert': 'rgba(232, 245, 233, 0.9)',
-                'modify': 'rgba(255, 243, 224, 0.9)',
-                'delete': 'rgba(255, 235, 238, 0.9)'
-            }.get(activity_type, 'rgba(255, 255, 255, 0.9)')
-            
-            # Convert UTC to EST for activity timestamps
-            est_time = activity['timestamp'].astimezone(ZoneInfo("America/New_York"))
-            
-            st.markdown(f"""
-                <div class="activity-card" style="background: {background_color};">
-                    <strong>Type:</strong> {activity['role']}<br>
-                    <strong>Date:</strong> {est_time.strftime('%Y-%m-%d %H:%M')}<br>
-                    <strong>Message:</strong> {activity['content']}
-                </div>
-            """, unsafe_allow_html=True)
+    # Redrawn from the in-memory feed every ACTIVITY_REFRESH_INTERVAL seconds, without rerunning the page
+    past_activity(get_activity_feed(), username, timer)
     
     # Footer
-    st.markdown('<div class="footer">© 2024 Connoisseur\'s Corner, All rights reserved</div>', unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown('<div class="footer">© 2024 Connoisseur\'s Corner, All rights reserved</div>', unsafe_allow_html=True)
+    
+    timer.render(cache_stats=parser.cache_stats())
\ No newline at end of file
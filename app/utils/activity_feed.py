@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ActivityFeed:
+    """
+    Newest activity per user, kept current from the backend's live activity stream.
+
+    One daemon thread per process follows the backend's all-users stream
+    (GET /api/v1/activity-stream, which needs its ACTIVITY_STREAM_ADMIN_TOKEN)
+    and appends each record to its user's page in memory, so Past Activity
+    renders without a query per rerun and the backend holds one stream per
+    app process rather than one per browser. A user's page is read from
+    GET /api/v1/activity/<username> the first time it is shown, and again
+    after a `resync` event (the stream dropped events). Without a token, or
+    while the stream is down, pages are re-read from the API at most every
+    `poll_interval` seconds instead.
+    """
+
+    def __init__(self, base_url: str, admin_token: str = "", page_size: int = 20,
+                 timeout: float = 5.0, poll_interval: float = 10.0, read_timeout: float = 45.0):
+        """
+        Args:
+            base_url: The backend, e.g. http://127.0.0.1:5000
+            admin_token: The backend's ACTIVITY_STREAM_ADMIN_TOKEN; polling only when empty
+            page_size: Records kept per user
+            timeout: Seconds to wait for a page from the API
+            poll_interval: Seconds a polled page is served before it is re-read
+            read_timeout: Seconds without data (the backend sends keep-alives) before reconnecting
+        """
+        self.base_url = base_url.rstrip("/")
+        self.admin_token = admin_token
+        self.page_size = page_size
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.read_timeout = read_timeout
+        self.retry = 3.0
+        self.live = False
+        self._pages: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # Records streamed for a user while their page is being read from the API
+        self._loading: Dict[str, List[Dict[str, Any]]] = {}
+        self._last_event_id: Optional[str] = None
+        self._lock = threading.Lock()
+        if admin_token:
+            threading.Thread(target=self._follow, name="activity-feed", daemon=True).start()
+
+    def activities(self, username: str) -> List[Dict[str, Any]]:
+        """
+        A user's newest activity, newest first.
+
+        Args:
+            username: User's identifier
+
+        Returns:
+            Up to `page_size` records shaped {"username", "action", "timestamp", "details"}
+        """
+        with self._lock:
+            page = self._pages.get(username)
+            if page is not None and (self.live or time.monotonic() - self._loaded_at[username] < self.poll_interval):
+                return list(reversed(page))
+        return self._load(username)
+
+    def _load(self, username: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._loading.setdefault(username, [])
+        url = f"{self.base_url}/api/v1/activity/{urllib.parse.quote(username, safe='')}?limit={self.page_size}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                records = json.loads(response.read())["activities"]
+        except Exception as e:
+            logger.error(f"Error loading activity for {username}: {str(e)}")
+            with self._lock:
+                self._loading.pop(username, None)
+                # Serve what we had rather than nothing
+                return list(reversed(self._pages.get(username, [])))
+        with self._lock:
+            page = deque(records, maxlen=self.page_size)
+            for record in self._loading.pop(username, []):
+                if record not in records:
+                    page.append(record)
+            self._pages[username] = page
+            self._loaded_at[username] = time.monotonic()
+            return list(reversed(page))
+
+    def _follow(self) -> None:
+        while True:
+            try:
+                self._stream()
+            except urllib.error.HTTPError as e:
+                if e.code == 401:
+                    logger.error("Backend rejected ACTIVITY_STREAM_ADMIN_TOKEN, polling the activity API instead")
+                    return
+                logger.error(f"Activity stream refused, polling until it is back: {str(e)}")
+            except Exception as e:
+                logger.error(f"Activity stream disconnected, polling until it is back: {str(e)}")
+            self.live = False
+            time.sleep(self.retry)
+
+    def _stream(self) -> None:
+        headers = {"Accept": "text/event-stream", "X-Admin-Token": self.admin_token}
+        if self._last_event_id:
+            headers["Last-Event-ID"] = self._last_event_id
+        request = urllib.request.Request(f"{self.base_url}/api/v1/activity-stream", headers=headers)
+        with urllib.request.urlopen(request, timeout=self.read_timeout) as response:
+            with self._lock:
+                if self._last_event_id is None:
+                    # Nothing to replay from: pages read before now may have missed events
+                    self._pages.clear()
+                self.live = True
+            event_id, kind, data = None, "message", []
+            for raw in response:
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if not line:
+                    if data:
+                        self._dispatch(event_id, kind, "\n".join(data))
+                    event_id, kind, data = None, "message", []
+                    continue
+                if line.startswith(":"):
+                    # Keep-alive
+                    continue
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "id":
+                    event_id = value
+                elif field == "event":
+                    kind = value
+                elif field == "data":
+                    data.append(value)
+                elif field == "retry" and value.isdigit():
+                    self.retry = int(value) / 1000
+        raise ConnectionError("stream closed by the backend")
+
+    def _dispatch(self, event_id: Optional[str], kind: str, data: str) -> None:
+        with self._lock:
+            if kind == "resync":
+                # Events were dropped: every page reloads on its next read
+                self._pages.clear()
+            elif kind == "activity":
+                record = json.loads(data)
+                username = record.get("username")
+                if username in self._pages:
+                    self._pages[username].append(record)
+                elif username in self._loading:
+                    self._loading[username].append(record)
+            if event_id:
+                self._last_event_id = event_id
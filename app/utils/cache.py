@@ -0,0 +1,303 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Comparison operators the parser's WHERE clauses translate to
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '$eq': lambda a, b: a == b,
+    '$ne': lambda a, b: a != b,
+    '$gt': lambda a, b: a > b,
+    '$gte': lambda a, b: a >= b,
+    '$lt': lambda a, b: a < b,
+    '$lte': lambda a, b: a <= b
+}
+
+
+# Returned by `_field` for paths it cannot resolve without Mongo's array traversal rules
+UNKNOWN = object()
+
+
+def _field(doc: Dict[str, Any], path: str) -> Any:
+    """
+    Value at a dotted path, None when absent.
+
+    Paths that index into an array (`reviews.0.rating`) or step through one
+    (`critic_reviews.rating`) give UNKNOWN: Mongo matches those against
+    every element, which is not worth reproducing for invalidation.
+    """
+    value: Any = doc
+    for part in path.split('.'):
+        if isinstance(value, list) or part.isdigit():
+            return UNKNOWN
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(operator: str, value: Any, expected: Any) -> bool:
+    """One condition against a field value, with Mongo's semantics for array fields"""
+    compare = OPERATORS[operator]
+    if not isinstance(value, list):
+        return compare(value, expected)
+    # An array matches when it equals the operand or any element does; $ne needs no element to be equal
+    if operator == '$ne':
+        return value != expected and expected not in value
+    candidates = [value] + value
+    for candidate in candidates:
+        try:
+            if compare(candidate, expected):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+def matches(mongo_filter: Dict[str, Any], doc: Dict[str, Any]) -> bool:
+    """
+    Whether a document satisfies a parser-generated filter.
+
+    Filters with operators or paths this cannot evaluate are assumed to
+    match, so a cached result is invalidated rather than served stale.
+    """
+    for path, condition in mongo_filter.items():
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        value = _field(doc, path)
+        if value is UNKNOWN:
+            return True
+        for operator, expected in condition.items():
+            if operator not in OPERATORS:
+                return True
+            try:
+                if not _compare(operator, value, expected):
+                    return False
+            except TypeError:
+                return False
+    return True
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def document_tags(doc: Dict[str, Any]) -> Set[str]:
+    """Invalidation tags of a document: its restaurant_id and its _id."""
+    tags = set()
+    if doc.get('restaurant_id') is not None:
+        tags.add(f"restaurant_id:{doc['restaurant_id']}")
+    if doc.get('_id') is not None:
+        tags.add(f"_id:{doc['_id']}")
+    return tags
+
+
+class QueryCache:
+    """
+    LRU + TTL read-through cache of query results, invalidated by writes.
+
+    Each entry remembers the filter it answers and the tags (restaurant_id
+    and _id) of the documents it returned. A write invalidates the entries
+    holding any document it touched, plus the entries whose filter matches a
+    written document, since that document may now belong in the result.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, watch_retries: int = 5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watch_retries = watch_retries
+        # Collections whose change stream died for good: other writers' changes would go unseen
+        self._unwatched: Set[str] = set()
+        self._entries: "OrderedDict[Tuple, Tuple[float, str, Dict[str, Any], List[Dict]]]" = OrderedDict()
+        self._by_tag: Dict[str, Set[Tuple]] = {}
+        self._lock = threading.RLock()
+        self._watchers: List[threading.Thread] = []
+        # Bumped by every invalidation, so a load that raced a write is not stored
+        self._generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _drop(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for doc in entry[3]:
+            for tag in document_tags(doc):
+                keys = self._by_tag.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_tag[tag]
+
+    def get_or_load(self, collection: str, mongo_filter: Dict[str, Any],
+                    loader: Callable[[], List[Dict]], options: Any = None) -> List[Dict]:
+        """
+        Return cached results for a query, running `loader` on a miss.
+
+        Args:
+            collection: Collection name
+            mongo_filter: The query filter
+            loader: Runs the query against the database
+            options: Anything else that changes the result (limit, projection)
+
+        Returns:
+            A copy of the results, safe for the caller to modify
+        """
+        if collection in self._unwatched:
+            return loader()
+        key = (collection, _freeze(mongo_filter), _freeze(options))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(entry[3])
+                self._drop(key)
+                self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            generation = self._generation
+
+        results = loader()
+        with self._lock:
+            if generation != self._generation:
+                return results
+            self._drop(key)
+            self._entries[key] = (now + self.ttl, collection, mongo_filter, copy.deepcopy(results))
+            for doc in results:
+                for tag in document_tags(doc):
+                    self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+        return results
+
+    def invalidate(self, collection: str, docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Invalidate entries affected by written documents.
+
+        Args:
+            collection: Collection written to
+            docs: Documents before and/or after the write
+
+        Returns:
+            Number of entries dropped
+        """
+        docs = list(docs)
+        with self._lock:
+            stale = set()
+            for doc in docs:
+                for tag in document_tags(doc):
+                    stale |= self._by_tag.get(tag, set())
+            for key, (_, entry_collection, mongo_filter, _) in self._entries.items():
+                if entry_collection == collection and key not in stale:
+                    if any(matches(mongo_filter, doc) for doc in docs):
+                        stale.add(key)
+            for key in stale:
+                self._drop(key)
+            self._generation += 1
+            self.stats['invalidations'] += len(stale)
+            return len(stale)
+
+    def invalidate_collection(self, collection: str) -> None:
+        """Drop every entry of a collection (used when the written documents are unknown)."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] == collection]
+            for key in stale:
+                self._drop(key)
+            self._generation += 1
+            self.stats['invalidations'] += len(stale)
+
+    def watch(self, db: Any, collection: str) -> bool:
+        """
+        Also invalidate on changes made by other writers, through a change stream.
+
+        Change streams need a replica set or Atlas; elsewhere this logs and
+        returns False, leaving invalidation to the parser's own writes.
+
+        When the stream fails, the collection's entries are dropped and the
+        stream is reopened from its resume token, backing off between
+        attempts. After `watch_retries` failed reopens the collection stops
+        being cached, since outside writes would no longer invalidate it.
+
+        Args:
+            db: Database handle
+            collection: Collection to watch
+
+        Returns:
+            Whether the change stream was opened
+        """
+        try:
+            stream = db[collection].watch(full_document='updateLookup')
+        except Exception as e:
+            logger.info(f"Change streams unavailable for {collection}, cache relies on local writes: {str(e)}")
+            return False
+
+        # Resume token of the last change seen, kept across reopened streams
+        resume = {'token': None}
+
+        def follow(current: Any) -> None:
+            """Invalidate on each change until the stream ends or fails"""
+            with current:
+                for change in current:
+                    resume['token'] = change.get('_id')
+                    docs = [{'_id': change.get('documentKey', {}).get('_id')}]
+                    if change.get('fullDocument'):
+                        docs.append(change['fullDocument'])
+                    if change.get('operationType') in ('drop', 'rename', 'invalidate'):
+                        self.invalidate_collection(collection)
+                        if change.get('operationType') == 'invalidate':
+                            # Nothing can resume after an invalidate; the next stream starts fresh
+                            resume['token'] = None
+                    else:
+                        self.invalidate(collection, docs)
+
+        def run() -> None:
+            current, failures = stream, 0
+            while True:
+                try:
+                    follow(current)
+                    failures = 0
+                    logger.warning(f"Change stream for {collection} ended, reopening")
+                except Exception as e:
+                    logger.error(f"Change stream for {collection} stopped, clearing its cache entries: {str(e)}")
+                # Changes made while no stream was open are unknown
+                self.invalidate_collection(collection)
+                current = None
+                while current is None:
+                    failures += 1
+                    if failures > self.watch_retries:
+                        logger.error(f"Could not reopen the change stream for {collection}, "
+                                     f"no longer caching it")
+                        self._unwatched.add(collection)
+                        self.invalidate_collection(collection)
+                        return
+                    time.sleep(min(2 ** failures, 30))
+                    try:
+                        current = db[collection].watch(full_document='updateLookup', resume_after=resume['token'])
+                    except Exception as e:
+                        logger.error(f"Reopening the change stream for {collection} failed: {str(e)}")
+                        # The token may have aged out of the oplog; the entries are already dropped
+                        resume['token'] = None
+
+        watcher = threading.Thread(target=run, name=f"cache-watch-{collection}", daemon=True)
+        watcher.start()
+        self._watchers.append(watcher)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus current size and hit rate"""
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries), unwatched=sorted(self._unwatched))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,84 @@
+import logging
+import queue
+import threading
+import urllib.request
+from typing import Any, Dict, List
+
+from bson import json_util
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class EventForwarder:
+    """
+    MongoSQLParser listener that hands write events to the backend's event bus.
+
+    The backend's derived views (leaderboards, critic_stats, audit, analytics,
+    dedupe) are event-bus listeners in the backend process; this posts each
+    write event to its POST /api/v1/events so writes made through the app's
+    parser reach them too. The event lands in whichever backend worker
+    serves the request: views persisted to MongoDB are kept current, views
+    held in memory are current in that worker until the others reload.
+
+    Events are queued and posted in batches by a daemon thread, so a slow or
+    unreachable backend never delays the write that produced them. When the
+    queue is full (backend down for a long time) new events are dropped and
+    logged rather than growing without bound.
+    """
+
+    def __init__(self, url: str, token: str, timeout: float = 2.0,
+                 max_queue: int = 10000, batch_size: int = 100):
+        """
+        Args:
+            url: The backend's events endpoint, e.g. http://127.0.0.1:5000/api/v1/events
+            token: The backend's EVENTS_TOKEN
+            timeout: Seconds to wait for the backend per batch
+            max_queue: Events held while the backend is slow or unreachable
+            batch_size: Most events posted in one request
+        """
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="event-forwarder", daemon=True)
+        self._thread.start()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Event queue full, dropped {event.get('operation')} on {event.get('collection')} "
+                           f"({self.dropped} dropped so far)")
+
+    def flush(self) -> None:
+        """Block until every queued event has been posted (or failed)."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._post(batch)
+            except Exception as e:
+                logger.error(f"Error forwarding {len(batch)} events to {self.url}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _post(self, batch: List[Dict[str, Any]]) -> None:
+        # Extended JSON keeps ObjectIds and datetimes intact
+        request = urllib.request.Request(
+            self.url, data=json_util.dumps(batch).encode(), method="POST",
+            headers={"Content-Type": "application/json", "X-Events-Token": self.token}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
@@ -1,12 +1,202 @@
 import re
-from pymongo import MongoClient
-from typing import Dict, Any, List, Union
+import copy
+import logging
+from datetime import datetime, timezone
+from pymongo import MongoClient, ReturnDocument
+from typing import Dict, Any, List, Union, Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Update pipeline stage recomputing avg_rating from critic_reviews, to 2 places rounding half up
+# (as the backend's bulk ingestion does; mongomock has no $round)
+AVG_RATING_STAGE = {'$set': {'avg_rating': {'$divide': [
+    {'$floor': {'$add': [{'$multiply': [{'$avg': '$critic_reviews.rating'}, 100]}, 0.5]}}, 100
+]}}}
+
+# Collections whose schemas carry created_at/updated_at; snapshot exports select changes by updated_at
+TIMESTAMPED_COLLECTIONS = ('restaurants', 'users')
 
 class MongoSQLParser:
-    def __init__(self, connection_string: str, database: str):
-        """Initialize MongoDB connection"""
+    def __init__(self, connection_string: str, database: str,
+                 listeners: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+                 validators: Optional[Dict[str, Any]] = None,
+                 cache: Optional[Any] = None):
+        """
+        Initialize MongoDB connection
+
+        Args:
+            connection_string: MongoDB connection URI
+            database: Database name
+            listeners: Callables notified with a write event dict after every
+                INSERT/UPDATE/DELETE (see `_notify`)
+            validators: Collection name -> compiled validator (see
+                db-setup/validation.py), checked before INSERT/UPDATE
+            cache: Read-through cache (see utils/cache.py QueryCache) for
+                SELECT results and restaurant lookups, invalidated by every
+                write made through this parser
+        """
         self.client = MongoClient(connection_string)
         self.db = self.client[database]
+        self.listeners = list(listeners or [])
+        self.validators = dict(validators or {})
+        self.cache = cache
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callable to be notified after every write"""
+        self.listeners.append(listener)
+
+    def watch_cache(self, collection_name: str = 'restaurants') -> bool:
+        """Invalidate the cache on writes by other clients too, when change streams are available"""
+        if self.cache is None:
+            return False
+        return self.cache.watch(self.db, collection_name)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Cache hit/miss/invalidation counters, empty without a cache"""
+        return self.cache.get_stats() if self.cache is not None else {}
+
+    def _find(self, collection_name: str, mongo_filter: Dict[str, Any], limit: int = 0) -> List[Dict]:
+        """Run a find, through the cache when there is one"""
+        def load() -> List[Dict]:
+            return list(self.db[collection_name].find(mongo_filter, limit=limit))
+        if self.cache is None:
+            return load()
+        return self.cache.get_or_load(collection_name, mongo_filter, load, options=limit)
+
+    def find_restaurant(self, name: Optional[str] = None,
+                        restaurant_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Look up one restaurant by restaurant_id or name
+
+        Args:
+            name: Restaurant name
+            restaurant_id: Restaurant id, preferred over name when both are given
+
+        Returns:
+            The restaurant document, or None when there is no match
+        """
+        if restaurant_id is not None:
+            mongo_filter = {'restaurant_id': {'$eq': restaurant_id}}
+        elif name is not None:
+            mongo_filter = {'name': {'$eq': name}}
+        else:
+            raise ValueError("find_restaurant needs a name or a restaurant_id")
+        results = self._find('restaurants', mongo_filter, limit=1)
+        return results[0] if results else None
+
+    def add_review(self, restaurant_id: str, review: Dict[str, Any], actor: str = 'system') -> Optional[Dict]:
+        """
+        Append a critic review to a restaurant and recompute its avg_rating
+
+        The review is checked against the restaurants validator first, and
+        the write is reported to listeners and the cache like any UPDATE.
+
+        Args:
+            restaurant_id: Restaurant to review
+            review: {"name", "review", "rating"[, "sentiment_score"]}
+            actor: Who wrote the review, reported to write listeners
+
+        Returns:
+            The restaurant after the write, or None when there is no such restaurant
+        """
+        self._validate('restaurants', fields={'critic_reviews.$': review})
+        mongo_filter = {'restaurant_id': {'$eq': restaurant_id}}
+        before = self._fetch_affected('restaurants', mongo_filter)[:1]
+        after = self.db['restaurants'].find_one_and_update(
+            mongo_filter,
+            [
+                {'$set': {
+                    'critic_reviews': {'$concatArrays': [{'$ifNull': ['$critic_reviews', []]}, [review]]},
+                    'updated_at': datetime.now(timezone.utc)
+                }},
+                AVG_RATING_STAGE
+            ],
+            return_document=ReturnDocument.AFTER
+        )
+        if after is None:
+            return None
+        self._invalidate('restaurants', before + [after])
+        self._notify('restaurants', 'update', {'_id': after['_id']},
+                     {'critic_reviews': [review], 'avg_rating': after.get('avg_rating')}, before, [after], actor)
+        return after
+
+    def _invalidate(self, collection_name: str, docs: List[Dict]) -> None:
+        """Drop cached results holding or matching the written documents"""
+        if self.cache is not None:
+            self.cache.invalidate(collection_name, docs)
+
+    @staticmethod
+    def _apply_set(doc: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A copy of a document with a $set of dotted fields applied.
+
+        Numeric segments index into arrays (`critic_reviews.0.name`), padding
+        with nulls as Mongo does. Raises ValueError for a path Mongo would
+        reject, such as a field name on an array.
+        """
+        doc = copy.deepcopy(doc)
+        for field, value in updates.items():
+            target: Any = doc
+            *parents, leaf = field.split('.')
+            for part in parents:
+                if isinstance(target, list):
+                    if not part.isdigit():
+                        raise ValueError(f"Cannot apply {field}: {part} is not an array index")
+                    index = int(part)
+                    target.extend([None] * (index + 1 - len(target)))
+                    if not isinstance(target[index], (dict, list)):
+                        target[index] = {}
+                    target = target[index]
+                else:
+                    if not isinstance(target.get(part), (dict, list)):
+                        target[part] = {}
+                    target = target[part]
+            if isinstance(target, list):
+                if not leaf.isdigit():
+                    raise ValueError(f"Cannot apply {field}: {leaf} is not an array index")
+                target.extend([None] * (int(leaf) + 1 - len(target)))
+                target[int(leaf)] = value
+            else:
+                target[leaf] = value
+        return doc
+
+    def _fetch_affected(self, collection_name: str, mongo_filter: Dict[str, Any]) -> List[Dict]:
+        """Read the documents a write will touch, only when someone is listening or caching"""
+        if not self.listeners and self.cache is None:
+            return []
+        return list(self.db[collection_name].find(mongo_filter))
+
+    def _validate(self, collection_name: str, document: Optional[Dict[str, Any]] = None,
+                  fields: Optional[Dict[str, Any]] = None) -> None:
+        """Reject a write the server-side validator would reject, without a round trip"""
+        validator = self.validators.get(collection_name)
+        if validator is None:
+            return
+        errors = validator(document) if document is not None else validator.validate_fields(fields)
+        if errors:
+            raise ValueError(f"Document failed validation for {collection_name}: {'; '.join(errors)}")
+
+    def _notify(self, collection_name: str, operation: str, mongo_filter: Dict[str, Any],
+                changes: Dict[str, Any], before: List[Dict], after: List[Dict], actor: str) -> None:
+        """Send a write event to every listener; listener errors never fail the write"""
+        if not self.listeners:
+            return
+        event = {
+            "collection": collection_name,
+            "operation": operation,
+            "filter": mongo_filter,
+            "changes": changes,
+            "before": before,
+            "after": after,
+            "actor": actor,
+            "timestamp": datetime.now(timezone.utc)
+        }
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error in write listener: {str(e)}")
     
     def parse_where_clause(self, where_clause: str) -> Dict[str, Any]:
         """Convert SQL WHERE clause to MongoDB filter"""
@@ -46,19 +236,25 @@ class MongoSQLParser:
                     
         return mongo_filter
 
-    def execute_query(self, query: str) -> Union[List[Dict], Dict]:
-        """Execute SQL-like query on MongoDB"""
+    def execute_query(self, query: str, actor: str = 'system') -> Union[List[Dict], Dict]:
+        """
+        Execute SQL-like query on MongoDB
+
+        Args:
+            query: SQL-like statement
+            actor: Who issued the statement, reported to write listeners
+        """
         # Extract operation type
         operation = query.split()[0].upper()
         
         if operation == 'SELECT':
             return self._handle_select(query)
         elif operation == 'INSERT':
-            return self._handle_insert(query)
+            return self._handle_insert(query, actor)
         elif operation == 'UPDATE':
-            return self._handle_update(query)
+            return self._handle_update(query, actor)
         elif operation == 'DELETE':
-            return self._handle_delete(query)
+            return self._handle_delete(query, actor)
         else:
             raise ValueError(f"Unsupported operation: {operation}")
 
@@ -73,9 +269,9 @@ class MongoSQLParser:
         where_clause = match.group(2) if match.group(2) else ''
         
         mongo_filter = self.parse_where_clause(where_clause)
-        return list(self.db[collection_name].find(mongo_filter))
+        return self._find(collection_name, mongo_filter)
 
-    def _handle_insert(self, query: str) -> Dict:
+    def _handle_insert(self, query: str, actor: str = 'system') -> Dict:
         """Handle INSERT queries"""
         # Example: INSERT INTO collection (field1, field2) VALUES (value1, value2)
         match = re.match(r'INSERT INTO (\w+) \((.*?)\) VALUES \((.*?)\)', query, re.IGNORECASE)
@@ -87,10 +283,17 @@ class MongoSQLParser:
         values = [v.strip().strip('\'\"') for v in match.group(3).split(',')]
         
         document = dict(zip(fields, values))
+        if collection_name in TIMESTAMPED_COLLECTIONS:
+            now = datetime.now(timezone.utc)
+            document.setdefault('created_at', now)
+            document.setdefault('updated_at', now)
+        self._validate(collection_name, document=document)
         result = self.db[collection_name].insert_one(document)
+        self._invalidate(collection_name, [document])
+        self._notify(collection_name, 'insert', {}, dict(document), [], [document], actor)
         return {"inserted_id": str(result.inserted_id)}
 
-    def _handle_update(self, query: str) -> Dict:
+    def _handle_update(self, query: str, actor: str = 'system') -> Dict:
         """Handle UPDATE queries"""
         # Example: UPDATE collection SET field1 = value1 WHERE condition
         match = re.match(r'UPDATE (\w+) SET \((.*?)\)(?:\s+WHERE (.+))?', query, re.IGNORECASE)
@@ -112,15 +315,30 @@ class MongoSQLParser:
             except ValueError:
                 pass
             updates[field] = value
+        if collection_name in TIMESTAMPED_COLLECTIONS:
+            updates['updated_at'] = datetime.now(timezone.utc)
         
+        self._validate(collection_name, fields=updates)
         mongo_filter = self.parse_where_clause(where_clause)
+        before = self._fetch_affected(collection_name, mongo_filter)
         result = self.db[collection_name].update_many(
             mongo_filter,
             {'$set': updates}
         )
+        if before and self.listeners:
+            after = self._fetch_affected(collection_name, {'_id': {'$in': [doc['_id'] for doc in before]}})
+            self._invalidate(collection_name, before + after)
+            self._notify(collection_name, 'update', mongo_filter, updates, before, after, actor)
+        elif before:
+            # Only the cache needs the new state, so apply the $set locally instead of reading it back
+            try:
+                after = [self._apply_set(doc, updates) for doc in before]
+            except ValueError:
+                after = self._fetch_affected(collection_name, {'_id': {'$in': [doc['_id'] for doc in before]}})
+            self._invalidate(collection_name, before + after)
         return {"modified_count": result.modified_count}
 
-    def _handle_delete(self, query: str) -> Dict:
+    def _handle_delete(self, query: str, actor: str = 'system') -> Dict:
         """Handle DELETE queries"""
         # Example: DELETE FROM collection WHERE condition
         match = re.match(r'DELETE FROM (\w+)(?:\s+WHERE (.+))?', query, re.IGNORECASE)
@@ -131,5 +349,9 @@ class MongoSQLParser:
         where_clause = match.group(2) if match.group(2) else ''
         
         mongo_filter = self.parse_where_clause(where_clause)
+        before = self._fetch_affected(collection_name, mongo_filter)
         result = self.db[collection_name].delete_many(mongo_filter)
+        self._invalidate(collection_name, before)
+        if before:
+            self._notify(collection_name, 'delete', mongo_filter, {}, before, [], actor)
         return {"deleted_count": result.deleted_count}
\ No newline at end of file
@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Roles and types repeat on every message; share one string object each
+_INTERNED: Dict[str, str] = {}
+
+
+def _intern(value: str) -> str:
+    return _INTERNED.setdefault(value, value)
+
+
+class Message(NamedTuple):
+    """
+    Compact chat message: role and type are interned strings and the
+    timestamp is UTC epoch seconds, so a message costs a small tuple plus
+    its text rather than a dict and a datetime.
+    """
+    seq: int
+    role: str
+    content: str
+    timestamp: float
+    type: str
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    type TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class _Session:
+    __slots__ = ("tail", "count", "last_seen")
+
+    def __init__(self, tail: List[Message], count: int):
+        self.tail = tail
+        self.count = count
+        self.last_seen = time.monotonic()
+
+
+class SessionStore:
+    """
+    Chat history for Streamlit sessions, kept out of `st.session_state`.
+
+    Every message is written through to a local sqlite file, so history
+    survives restarts. Memory holds at most the newest `max_messages` of each
+    live session; older turns are read back from disk a page at a time when
+    the user scrolls up. Sessions idle for `idle_seconds` are dropped from
+    memory and reloaded lazily on their next access.
+    """
+
+    def __init__(self, path: str, max_messages: int = 50, idle_seconds: float = 1800.0):
+        self.path = path
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork: reopen in each new process
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+            self._sessions.clear()
+        return self._connection
+
+    def _rows(self, sql: str, params: Tuple) -> List[Message]:
+        return [Message(row[0], _intern(row[1]), row[2], row[3], _intern(row[4]))
+                for row in self._connect().execute(sql, params).fetchall()]
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            connection = self._connect()
+            count = connection.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?",
+                                       (session_id,)).fetchone()[0]
+            tail = self._rows(
+                "SELECT seq, role, content, timestamp, type FROM messages WHERE session_id = ? "
+                "ORDER BY seq DESC LIMIT ?", (session_id, self.max_messages)
+            )[::-1]
+            session = self._sessions[session_id] = _Session(tail, count)
+        self._sessions.move_to_end(session_id)
+        session.last_seen = time.monotonic()
+        return session
+
+    def append(self, session_id: str, role: str, content: str, type: str = "insert",
+               timestamp: Optional[float] = None) -> Message:
+        """
+        Add a message to a session.
+
+        Args:
+            session_id: Session key (the signed-in username)
+            role: 'user' or 'system'
+            content: Message text
+            type: Activity type shown by the page ('insert', 'modify', 'delete')
+            timestamp: UTC epoch seconds, now by default
+
+        Returns:
+            The stored message
+        """
+        with self._lock:
+            self.evict_idle()
+            session = self._session(session_id)
+            seq = session.tail[-1].seq + 1 if session.tail else session.count
+            message = Message(seq, _intern(role), content, time.time() if timestamp is None else timestamp,
+                              _intern(type))
+            with self._connect() as connection:
+                connection.execute("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", (session_id, *message))
+            session.tail.append(message)
+            session.count += 1
+            if len(session.tail) > self.max_messages:
+                # Older turns are already on disk
+                del session.tail[:len(session.tail) - self.max_messages]
+            return message
+
+    def history(self, session_id: str, limit: Optional[int] = None) -> List[Message]:
+        """
+        The newest messages of a session, oldest first.
+
+        Args:
+            session_id: Session key
+            limit: How many to return, default the in-memory tail
+
+        Returns:
+            Up to `limit` messages; beyond the tail the rest come from disk
+        """
+        limit = self.max_messages if limit is None else limit
+        with self._lock:
+            self.evict_idle()
+            session = self._session(session_id)
+            if limit <= len(session.tail) or len(session.tail) == session.count:
+                return session.tail[-limit:] if limit else []
+            first = session.tail[0].seq if session.tail else session.count
+            older = self._rows(
+                "SELECT seq, role, content, timestamp, type FROM messages WHERE session_id = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?", (session_id, first, limit - len(session.tail))
+            )
+            return older[::-1] + session.tail
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session"""
+        with self._lock:
+            return self._session(session_id).count
+
+    def clear(self, session_id: str) -> None:
+        """Delete a session's history from memory and disk"""
+        with self._lock:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """
+        Drop sessions idle for longer than `idle_seconds` from memory.
+
+        Returns:
+            Number of sessions evicted
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        evicted = 0
+        with self._lock:
+            # Least recently used first, so stop at the first live session
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if session.last_seen > cutoff:
+                    break
+                del self._sessions[session_id]
+                evicted += 1
+        return evicted
+
+    def resident(self) -> Tuple[int, int]:
+        """(sessions, messages) currently held in memory"""
+        with self._lock:
+            return len(self._sessions), sum(len(session.tail) for session in self._sessions.values())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._sessions.clear()
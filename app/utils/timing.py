@@ -0,0 +1,51 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+import streamlit as st
+
+_DISABLED = nullcontext()
+
+
+class RerunTimer:
+    """
+    Accumulates wall time per named section of one Streamlit rerun.
+
+    When disabled, `section` hands back a shared no-op context manager, so
+    instrumented pages pay nothing beyond the call itself.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    def section(self, name: str):
+        """Context manager adding the block's duration to `name`"""
+        return self._timed(name) if self.enabled else _DISABLED
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def render(self, cache_stats: Optional[Dict[str, Any]] = None) -> None:
+        """Show the breakdown of this rerun, plus the query cache's counters, in a collapsed expander"""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        with st.expander(f"Rerun timings ({total * 1000:.1f} ms)"):
+            rows = [
+                {"section": name, "ms": round(seconds * 1000, 2), "share": f"{seconds / total:.0%}"}
+                for name, seconds in self.timings.items()
+            ]
+            other = total - sum(self.timings.values())
+            rows.append({"section": "other", "ms": round(other * 1000, 2), "share": f"{other / total:.0%}"})
+            st.table(rows)
+            if cache_stats:
+                st.caption(f"Query cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                           f"({cache_stats['hit_rate']:.0%}), {cache_stats['size']} entries, "
+                           f"{cache_stats['invalidations']} invalidations")
@@ -0,0 +1,294 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pymongo.collection import Collection
+
+from config import COLLECTIONS, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Only the fields the analytics need are pulled from `restaurants`
+ANALYTICS_PROJECTION = {
+    "_id": 0,
+    "restaurant_id": 1,
+    "address.zipcode": 1,
+    "updated_at": 1,
+    "critic_reviews.name": 1,
+    "critic_reviews.rating": 1,
+    "critic_reviews.sentiment_score": 1
+}
+
+# Stars mapped onto the sentiment scale: 1 -> -1, 3 -> 0, 5 -> 1
+RATING_MIDPOINT = 3.0
+RATING_HALF_RANGE = 2.0
+
+COLUMNS = {
+    "restaurant": np.int32,
+    "critic": np.int32,
+    "rating": np.float32,
+    "sentiment": np.float32,
+    "timestamp": np.int64,
+    "valid": np.bool_
+}
+
+
+def _timestamp(value: Any) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return 0
+
+
+class ReviewColumns:
+    """
+    Columnar, append-only store of critic reviews.
+
+    Columns grow by doubling. Rows replaced by a later write are masked out
+    through `valid` and reclaimed by `compact`.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+        self.restaurant_ids: List[str] = []
+        self.restaurant_index: Dict[str, int] = {}
+        self.restaurant_zipcode: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.zipcodes: List[str] = []
+        self.zipcode_index: Dict[str, int] = {}
+        self.critics: List[str] = []
+        self.critic_index: Dict[str, int] = {}
+        self.rows_by_restaurant: Dict[int, np.ndarray] = {}
+        self.dead_rows = 0
+
+    def __len__(self) -> int:
+        return int(self.columns["valid"][:self.size].sum())
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the filled part of a column (a view, not a copy)."""
+        return self.columns[name][:self.size]
+
+    def _intern(self, values: List[str], index: Dict[str, int], value: str) -> int:
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(values)
+            values.append(value)
+        return position
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        capacity = len(self.columns["valid"])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def _restaurant(self, restaurant_id: str, zipcode: Optional[str]) -> int:
+        position = self._intern(self.restaurant_ids, self.restaurant_index, restaurant_id)
+        if position >= len(self.restaurant_zipcode):
+            grown = np.full(max(16, 2 * len(self.restaurant_zipcode)), -1, dtype=np.int32)
+            grown[:len(self.restaurant_zipcode)] = self.restaurant_zipcode
+            self.restaurant_zipcode = grown
+        self.restaurant_zipcode[position] = (
+            self._intern(self.zipcodes, self.zipcode_index, zipcode) if zipcode else -1
+        )
+        return position
+
+    def upsert_restaurant(self, doc: Dict[str, Any]) -> None:
+        """
+        Replace all rows of a restaurant with its current reviews.
+
+        Args:
+            doc: Restaurant document (full or `ANALYTICS_PROJECTION`)
+        """
+        restaurant = self._restaurant(str(doc["restaurant_id"]), (doc.get("address") or {}).get("zipcode"))
+        self.remove_restaurant(str(doc["restaurant_id"]))
+        reviews = doc.get("critic_reviews") or []
+        if not reviews:
+            return
+
+        count = len(reviews)
+        self._reserve(count)
+        rows = slice(self.size, self.size + count)
+        self.columns["restaurant"][rows] = restaurant
+        self.columns["critic"][rows] = [
+            self._intern(self.critics, self.critic_index, str(review.get("name", ""))) for review in reviews
+        ]
+        self.columns["rating"][rows] = [float(review.get("rating") or 0.0) for review in reviews]
+        self.columns["sentiment"][rows] = [
+            np.nan if review.get("sentiment_score") is None else float(review["sentiment_score"])
+            for review in reviews
+        ]
+        self.columns["timestamp"][rows] = _timestamp(doc.get("updated_at"))
+        self.columns["valid"][rows] = True
+        self.rows_by_restaurant[restaurant] = np.arange(rows.start, rows.stop)
+        self.size += count
+
+    def remove_restaurant(self, restaurant_id: str) -> None:
+        """Mask out every row of a restaurant."""
+        restaurant = self.restaurant_index.get(restaurant_id)
+        rows = self.rows_by_restaurant.pop(restaurant, None) if restaurant is not None else None
+        if rows is not None:
+            self.columns["valid"][rows] = False
+            self.dead_rows += len(rows)
+
+    def compact(self) -> None:
+        """Drop masked rows so scans only touch live reviews."""
+        keep = np.flatnonzero(self.column("valid"))
+        for name in self.columns:
+            self.columns[name][:len(keep)] = self.columns[name][keep]
+        self.columns["valid"][len(keep):self.size] = False
+        self.size = len(keep)
+        self.dead_rows = 0
+        restaurants = self.column("restaurant")
+        order = np.argsort(restaurants, kind="stable")
+        boundaries = np.flatnonzero(np.diff(restaurants[order])) + 1
+        self.rows_by_restaurant = {
+            int(restaurants[group[0]]): group
+            for group in np.split(order, boundaries) if len(group)
+        }
+
+
+class ReviewAnalytics:
+    """Vectorized rating and sentiment aggregates over `ReviewColumns`."""
+
+    def __init__(self):
+        self.columns = ReviewColumns()
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self, restaurants: Collection) -> int:
+        """
+        Load every review into columnar arrays.
+
+        Args:
+            restaurants: The `restaurants` collection
+
+        Returns:
+            Number of reviews loaded
+        """
+        with self._lock:
+            self.columns = ReviewColumns()
+            for doc in restaurants.find({}, ANALYTICS_PROJECTION):
+                self.columns.upsert_restaurant(doc)
+            self.loaded = True
+            return len(self.columns)
+
+    def on_write(self, event: Dict[str, Any]) -> None:
+        """
+        Write listener refreshing the rows of every restaurant the write touched.
+
+        Args:
+            event: Write event (see `events.py`)
+        """
+        if not self.loaded or event.get("collection") != COLLECTIONS['RESTAURANTS']:
+            return
+        with self._lock:
+            after_ids = set()
+            for doc in event.get("after", []):
+                if "restaurant_id" in doc:
+                    after_ids.add(str(doc["restaurant_id"]))
+                    self.columns.upsert_restaurant(doc)
+            for doc in event.get("before", []):
+                if "restaurant_id" in doc and str(doc["restaurant_id"]) not in after_ids:
+                    self.columns.remove_restaurant(str(doc["restaurant_id"]))
+            if self.columns.dead_rows > self.columns.size // 4:
+                self.columns.compact()
+
+    def _live(self, *names: str) -> List[np.ndarray]:
+        valid = self.columns.column("valid")
+        return [self.columns.column(name)[valid] for name in names]
+
+    def rating_histogram(self) -> Dict[int, int]:
+        """Number of reviews per (rounded) star rating."""
+        with self._lock:
+            (rating,) = self._live("rating")
+            counts = np.bincount(np.clip(np.rint(rating), 0, 5).astype(np.int64), minlength=6)
+            return {stars: int(count) for stars, count in enumerate(counts)}
+
+    def rating_sentiment_correlation(self) -> Optional[float]:
+        """Pearson correlation between star rating and `sentiment_score`."""
+        with self._lock:
+            rating, sentiment = self._live("rating", "sentiment")
+            scored = ~np.isnan(sentiment)
+            if scored.sum() < 2:
+                return None
+            return float(np.corrcoef(rating[scored], sentiment[scored])[0, 1])
+
+    def disagreement(self, threshold: float = 1.0) -> Dict[str, Any]:
+        """
+        Reviews whose stars and text sentiment disagree.
+
+        Args:
+            threshold: Minimum gap between the rating (mapped to [-1, 1]) and sentiment
+
+        Returns:
+            Share of disagreeing reviews and their count per restaurant
+        """
+        with self._lock:
+            restaurant, rating, sentiment = self._live("restaurant", "rating", "sentiment")
+            scored = ~np.isnan(sentiment)
+            gap = np.abs((rating[scored] - RATING_MIDPOINT) / RATING_HALF_RANGE - sentiment[scored])
+            disagreeing = gap >= threshold
+            per_restaurant = np.bincount(restaurant[scored][disagreeing],
+                                         minlength=len(self.columns.restaurant_ids))
+            return {
+                "share": float(disagreeing.mean()) if len(disagreeing) else 0.0,
+                "by_restaurant": {
+                    self.columns.restaurant_ids[i]: int(per_restaurant[i]) for i in np.flatnonzero(per_restaurant)
+                }
+            }
+
+    def zipcode_means(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Mean rating and mean sentiment per zipcode."""
+        with self._lock:
+            restaurant, rating, sentiment = self._live("restaurant", "rating", "sentiment")
+            zipcode = self.columns.restaurant_zipcode[restaurant]
+            known = zipcode >= 0
+            zipcode, rating, sentiment = zipcode[known], rating[known], sentiment[known]
+            buckets = len(self.columns.zipcodes)
+            counts = np.bincount(zipcode, minlength=buckets)
+            rating_sums = np.bincount(zipcode, weights=rating, minlength=buckets)
+            scored = ~np.isnan(sentiment)
+            sentiment_counts = np.bincount(zipcode[scored], minlength=buckets)
+            sentiment_sums = np.bincount(zipcode[scored], weights=sentiment[scored], minlength=buckets)
+            return {
+                self.columns.zipcodes[i]: {
+                    "reviews": int(counts[i]),
+                    "mean_rating": float(rating_sums[i] / counts[i]),
+                    "mean_sentiment": float(sentiment_sums[i] / sentiment_counts[i]) if sentiment_counts[i] else None
+                }
+                for i in np.flatnonzero(counts)
+            }
+
+
+_analytics: Optional[ReviewAnalytics] = None
+_analytics_lock = threading.Lock()
+
+
+def get_review_analytics() -> ReviewAnalytics:
+    """Return the process-wide analytics engine, loading it on first use."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = ReviewAnalytics()
+        if not _analytics.loaded:
+            count = _analytics.load(get_db()[COLLECTIONS['RESTAURANTS']])
+            logger.info(f"Loaded {count} reviews for analytics")
+        return _analytics
+
+
+def analytics_listener(event: Dict[str, Any]) -> None:
+    """Forward write events to the analytics engine once it has been loaded."""
+    if _analytics is not None:
+        _analytics.on_write(event)
@@ -0,0 +1,345 @@
+import atexit
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from audit_store import encode_audit_doc
+from config import (
+    COLLECTIONS, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_JOURNAL_DIR, AUDIT_STORAGE, get_db
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Restaurant fields that are bookkeeping rather than audited content
+UNAUDITED_FIELDS = {"_id", "restaurant_id", "created_at", "updated_at"}
+
+
+def _audit_doc(key: str, value: Any, restaurant_id: str, action_by: str, action: str,
+               time_of_action: datetime) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(),
+        "key": key,
+        "value": value,
+        "restaurant_id": str(restaurant_id),
+        "action_by": action_by,
+        "action": action,
+        "time_of_action": time_of_action
+    }
+
+
+def _review_changes(old_reviews: List[Dict], new_reviews: List[Dict]) -> Iterable[tuple]:
+    """Yield (action, review, previous review) turning one critic_reviews list into another."""
+    old_by_critic = {review.get("name"): review for review in old_reviews or []}
+    new_by_critic = {review.get("name"): review for review in new_reviews or []}
+    for critic, review in new_by_critic.items():
+        if critic not in old_by_critic:
+            yield "insert", review, None
+        elif old_by_critic[critic] != review:
+            yield "update", review, old_by_critic[critic]
+    for critic, review in old_by_critic.items():
+        if critic not in new_by_critic:
+            yield "delete", review, None
+
+
+def _field_changes(restaurant_id: str, old_doc: Dict, new_doc: Dict, keys: Iterable[str],
+                   action_by: str, when: datetime) -> List[tuple]:
+    changes = []
+    for key in keys:
+        if key in UNAUDITED_FIELDS:
+            continue
+        if key == "critic_reviews":
+            for action, review, previous in _review_changes(old_doc.get(key), new_doc.get(key)):
+                changes.append((_audit_doc("user_reviews", review, restaurant_id, action_by, action, when), previous))
+        elif key not in new_doc:
+            if key in old_doc:
+                changes.append((_audit_doc(key, old_doc[key], restaurant_id, action_by, "delete", when), None))
+        elif key not in old_doc:
+            changes.append((_audit_doc(key, new_doc[key], restaurant_id, action_by, "insert", when), None))
+        elif old_doc[key] != new_doc[key]:
+            changes.append((_audit_doc(key, new_doc[key], restaurant_id, action_by, "update", when), old_doc[key]))
+    return changes
+
+
+def audit_documents(event: Dict[str, Any], storage: str = AUDIT_STORAGE) -> List[Dict[str, Any]]:
+    """
+    Translate a restaurant write event into audit documents.
+
+    One document is produced per changed field and per inserted, updated or
+    deleted critic review, in the shape of `db-setup/data/audit_data.json`.
+    With compact storage, values are delta-encoded and compressed (see
+    `audit_store.encode_audit_doc`).
+
+    Args:
+        event: Write event (see `events.py`)
+        storage: 'full' or 'compact'
+
+    Returns:
+        Audit documents ready to insert
+    """
+    if event.get("collection") != COLLECTIONS['RESTAURANTS']:
+        return []
+    action_by = event.get("actor") or "system"
+    when = event.get("timestamp") or datetime.now(timezone.utc)
+    before = {doc.get("_id"): doc for doc in event.get("before", [])}
+    after = {doc.get("_id"): doc for doc in event.get("after", [])}
+
+    changes: List[tuple] = []
+    for doc_id in before.keys() | after.keys():
+        old_doc, new_doc = before.get(doc_id, {}), after.get(doc_id, {})
+        restaurant_id = new_doc.get("restaurant_id", old_doc.get("restaurant_id"))
+        if restaurant_id is None:
+            continue
+        if event.get("operation") == "update":
+            keys = event.get("changes", {}).keys()
+        else:
+            keys = old_doc.keys() | new_doc.keys()
+        changes.extend(_field_changes(restaurant_id, old_doc, new_doc, keys, action_by, when))
+    if storage == "compact":
+        return [encode_audit_doc(doc, previous) for doc, previous in changes]
+    return [doc for doc, _ in changes]
+
+
+class AuditWriter:
+    """
+    Asynchronous, batched writer for the `audit` collection.
+
+    Callers only append to a local journal and an in-process queue; a
+    background thread flushes batches with unordered `insert_many`. Flushed
+    progress is checkpointed, giving at-least-once delivery.
+
+    Every writer (one per collection per process) has its own journal and
+    checkpoint, and holds an exclusive flock on the journal while it runs.
+    On start a writer adopts the journals of writers that are gone: any
+    journal for its collection whose lock it can take is re-journaled and
+    queued from its checkpoint on, then removed. Each document carries its `_id`
+    from emit time, so a replayed duplicate is rejected by the server and
+    ignored here. Documents the server rejects for any other reason (a
+    failed validator, say) would fail every retry, so they are logged and
+    moved to a dead-letter file next to the journal instead.
+    """
+
+    def __init__(self, collection: Collection, journal_dir: str = AUDIT_JOURNAL_DIR,
+                 batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_dir = Path(journal_dir)
+        # Unique per writer, so pid reuse (e.g. pid 1 in containers) never shares a journal
+        self.writer_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.journal_path = self.journal_dir / f"{collection.name}.{self.writer_id}.journal"
+        self.checkpoint_path = self.journal_path.with_suffix(".checkpoint")
+        self.dead_letter_path = self.journal_dir / f"{collection.name}.deadletter"
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._seq = 0
+        self._flushed_seq = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Adopt orphaned journals and start the background flusher."""
+        if self._thread is not None:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._journal = self.journal_path.open("a", encoding="utf-8")
+        fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._adopt_orphans()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _adopt_orphans(self) -> None:
+        # `<collection>.journal` is the shared journal written before journals were per writer
+        for path in sorted(self.journal_dir.glob(f"{self.collection.name}.*journal")):
+            if path == self.journal_path:
+                continue
+            try:
+                orphan = path.open("r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with orphan:
+                try:
+                    fcntl.flock(orphan.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Its writer is still running
+                    continue
+                if not path.exists():
+                    # Adopted by another writer between our open and our lock
+                    continue
+                checkpoint_path = path.with_suffix(".checkpoint")
+                flushed_seq = int(checkpoint_path.read_text() or 0) if checkpoint_path.exists() else 0
+                docs = []
+                for line in orphan:
+                    try:
+                        entry = json_util.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        continue
+                    if entry["seq"] > flushed_seq:
+                        docs.append(entry["doc"])
+                # Journaled as ours before the orphan is removed, so a crash here only duplicates
+                self._append(docs)
+                checkpoint_path.unlink(missing_ok=True)
+                path.unlink()
+            if docs:
+                logger.info(f"Recovered {len(docs)} unflushed audit events from {path.name}")
+
+    def emit(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Journal and enqueue audit documents without waiting for the database.
+
+        Args:
+            docs: Audit documents
+        """
+        if not docs:
+            return
+        if self._thread is None:
+            self.start()
+        self._append(docs)
+
+    def _append(self, docs: List[Dict[str, Any]]) -> None:
+        if not docs:
+            return
+        with self._lock:
+            lines = []
+            for doc in docs:
+                self._seq += 1
+                lines.append(json_util.dumps({"seq": self._seq, "doc": doc}) + "\n")
+                self._queue.put((self._seq, doc))
+            self._journal.write("".join(lines))
+            self._journal.flush()
+
+    def _next_batch(self) -> List[tuple]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, docs: List[Dict[str, Any]]) -> None:
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as bwe:
+            if bwe.details.get("writeConcernErrors"):
+                raise
+            # Unordered: every other document was inserted, only these were refused
+            rejected = [error for error in bwe.details.get("writeErrors", [])
+                        if error.get("code") != DUPLICATE_KEY_ERROR]
+            if rejected:
+                self._dead_letter([(docs[error["index"]], error) for error in rejected])
+
+    def _dead_letter(self, rejected: List[tuple]) -> None:
+        lines = [json_util.dumps({"doc": doc, "code": error.get("code"), "error": error.get("errmsg")}) + "\n"
+                 for doc, error in rejected]
+        with self.dead_letter_path.open("a", encoding="utf-8") as dead_letter:
+            dead_letter.write("".join(lines))
+        logger.error(f"{len(rejected)} audit events rejected by {self.collection.name} "
+                     f"(first: code {rejected[0][1].get('code')}, {rejected[0][1].get('errmsg')}), "
+                     f"moved to {self.dead_letter_path}")
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            while True:
+                try:
+                    self._insert([doc for _, doc in batch])
+                    break
+                except Exception as e:
+                    logger.error(f"Error flushing {len(batch)} audit events, retrying: {str(e)}")
+                    if self._stop.wait(1.0):
+                        # Leave the batch in the journal for the next start
+                        return
+            self._checkpoint(max(seq for seq, _ in batch))
+
+    def _checkpoint(self, seq: int) -> None:
+        with self._lock:
+            self._flushed_seq = max(self._flushed_seq, seq)
+            tmp_path = self.checkpoint_path.with_suffix(".tmp")
+            tmp_path.write_text(str(self._flushed_seq))
+            os.replace(tmp_path, self.checkpoint_path)
+            # Everything journaled is in the database: start a fresh journal
+            if self._flushed_seq == self._seq and self._queue.empty():
+                self._journal.truncate(0)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what is queued and stop the background thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        if self._journal is not None:
+            if self._flushed_seq == self._seq:
+                # Nothing left to replay: remove while still holding the lock
+                self.journal_path.unlink(missing_ok=True)
+                self.checkpoint_path.unlink(missing_ok=True)
+            # Closing releases the lock, leaving any unflushed journal to the next writer to start
+            self._journal.close()
+            self._journal = None
+
+
+_writers: Dict[str, AuditWriter] = {}
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer(collection_name: str = COLLECTIONS['AUDIT']) -> AuditWriter:
+    """Return the process-wide writer for an audit collection, starting it on first use."""
+    with _writer_lock:
+        writer = _writers.get(collection_name)
+        if writer is None:
+            writer = _writers[collection_name] = AuditWriter(get_db()[collection_name])
+            writer.start()
+            atexit.register(writer.stop)
+        return writer
+
+
+def audit_listener(event: Dict[str, Any]) -> None:
+    """Write listener feeding restaurant mutations into the audit pipeline."""
+    docs = audit_documents(event)
+    if docs:
+        get_audit_writer().emit(docs)
+
+
+def record_activity(username: str, action: str, details: Dict[str, Any]) -> None:
+    """
+    Audit a user activity logged by the API.
+
+    Activity is not restaurant state, so it goes to its own collection and
+    never reaches restaurant history or snapshots.
+
+    Args:
+        username: User's identifier
+        action: Type of action performed
+        details: Additional information about the action
+    """
+    get_audit_writer(COLLECTIONS['ACTIVITY_AUDIT']).emit([_audit_doc(
+        f"activity.{action}",
+        details,
+        details.get("restaurant_id", ""),
+        username,
+        "insert",
+        datetime.now(timezone.utc)
+    )])
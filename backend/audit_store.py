@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import logging
+import mmap
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from bson import Binary, json_util
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from config import (
+    COLLECTIONS, AUDIT_ARCHIVE_DIR, AUDIT_COMPRESS_MIN_BYTES, AUDIT_COLD_AFTER_DAYS, get_db
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Value encodings recorded in an audit document's `encoding` field
+DELTA = "delta"
+ZLIB = "zlib"
+
+# Segment layout: header, zlib-compressed JSON records, then a fixed-width index
+# sorted by time. Index entries are (time_ms, restaurant hash, offset, length).
+SEGMENT_MAGIC = b"AUDSEG1\0"
+HEADER = struct.Struct("<8sQQ")
+INDEX_ENTRY = struct.Struct("<qQQI")
+
+
+# ---------------------------------------------------------------------------
+# Value codecs
+# ---------------------------------------------------------------------------
+
+def value_delta(old: Any, new: Any, keep: tuple = ()) -> Optional[Dict[str, Any]]:
+    """
+    Field-level delta between two dict values.
+
+    Args:
+        old: Previous value
+        new: New value
+        keep: Fields always carried in the delta (e.g. a review's critic name)
+
+    Returns:
+        {"set": {...}, "unset": [...]}, or None when the values are not dicts
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None
+    return {
+        "set": {key: value for key, value in new.items() if key in keep or old.get(key, object()) != value},
+        "unset": [key for key in old if key not in new]
+    }
+
+
+def apply_delta(old: Any, delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a value from its predecessor and a `value_delta` result."""
+    value = dict(old) if isinstance(old, dict) else {}
+    for key in delta.get("unset", []):
+        value.pop(key, None)
+    value.update(delta.get("set", {}))
+    return value
+
+
+def encode_audit_doc(doc: Dict[str, Any], previous: Any = None,
+                     min_compress_bytes: int = AUDIT_COMPRESS_MIN_BYTES) -> Dict[str, Any]:
+    """
+    Store an audit document compactly.
+
+    Updates of dict values keep only the changed fields, and values still
+    larger than `min_compress_bytes` once serialized are zlib-compressed.
+
+    Args:
+        doc: Audit document with the full `value`
+        previous: Value before the change, if known
+        min_compress_bytes: Compression threshold
+
+    Returns:
+        The document, with `value` replaced and `encoding` set when encoded
+    """
+    encodings = []
+    value = doc["value"]
+    if doc["action"] == "update" and previous is not None:
+        keep = ("name",) if doc["key"] == "user_reviews" else ()
+        delta = value_delta(previous, value, keep)
+        if delta is not None:
+            value = delta
+            encodings.append(DELTA)
+    if isinstance(value, (dict, list)):
+        serialized = json_util.dumps(value).encode("utf-8")
+        if len(serialized) >= min_compress_bytes:
+            value = Binary(zlib.compress(serialized))
+            encodings.append(ZLIB)
+    if encodings:
+        doc = dict(doc, value=value, encoding="+".join(encodings))
+    return doc
+
+
+def decode_value(doc: Dict[str, Any], previous: Any = None) -> Any:
+    """
+    Return the full value of an audit document.
+
+    Args:
+        doc: Audit document as stored
+        previous: Value before the change, needed for delta-encoded documents
+
+    Returns:
+        The decoded value
+    """
+    encodings = doc.get("encoding", "").split("+") if doc.get("encoding") else []
+    value = doc.get("value")
+    if ZLIB in encodings:
+        value = json_util.loads(zlib.decompress(bytes(value)).decode("utf-8"))
+    if DELTA in encodings:
+        value = apply_delta(previous, value)
+    return value
+
+
+def is_delta(doc: Dict[str, Any]) -> bool:
+    """Whether the document's value only makes sense against the previous value."""
+    return DELTA in (doc.get("encoding") or "").split("+")
+
+
+# ---------------------------------------------------------------------------
+# Cold segments
+# ---------------------------------------------------------------------------
+
+def _to_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _restaurant_hash(restaurant_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(str(restaurant_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_segment(path: Path, docs: List[Dict[str, Any]]) -> int:
+    """
+    Write audit documents, sorted by `time_of_action`, to a segment file.
+
+    Args:
+        path: Segment file path
+        docs: Audit documents sorted by time
+
+    Returns:
+        Bytes written
+    """
+    tmp_path = path.with_suffix(".tmp")
+    index = []
+    with tmp_path.open("wb") as segment:
+        segment.write(HEADER.pack(SEGMENT_MAGIC, 0, 0))
+        for doc in docs:
+            record = zlib.compress(json_util.dumps(doc).encode("utf-8"))
+            index.append(INDEX_ENTRY.pack(
+                _to_ms(doc["time_of_action"]), _restaurant_hash(doc["restaurant_id"]), segment.tell(), len(record)
+            ))
+            segment.write(record)
+        index_offset = segment.tell()
+        segment.write(b"".join(index))
+        size = segment.tell()
+        segment.seek(0)
+        segment.write(HEADER.pack(SEGMENT_MAGIC, len(docs), index_offset))
+    tmp_path.replace(path)
+    return size
+
+
+class Segment:
+    """Read-only, memory-mapped view of one segment file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as segment:
+            self._mmap = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.index_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"Not an audit segment: {path}")
+        self.start_ms = self._entry(0)[0] if self.count else 0
+        self.end_ms = self._entry(self.count - 1)[0] if self.count else 0
+        self._restaurant_ids: Optional[Set[str]] = None
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _entry(self, position: int) -> tuple:
+        return INDEX_ENTRY.unpack_from(self._mmap, self.index_offset + position * INDEX_ENTRY.size)
+
+    def _lower_bound(self, time_ms: int) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < time_ms:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, restaurant_id: Optional[str] = None, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield documents in [start_ms, end_ms], decompressing only matching records."""
+        position = self._lower_bound(start_ms) if start_ms is not None else 0
+        wanted_hash = _restaurant_hash(restaurant_id) if restaurant_id is not None else None
+        while position < self.count:
+            time_ms, rid_hash, offset, length = self._entry(position)
+            position += 1
+            if end_ms is not None and time_ms > end_ms:
+                break
+            if wanted_hash is not None and rid_hash != wanted_hash:
+                continue
+            doc = json_util.loads(zlib.decompress(self._mmap[offset:offset + length]).decode("utf-8"))
+            if restaurant_id is None or doc["restaurant_id"] == str(restaurant_id):
+                yield doc
+
+    def restaurant_ids(self) -> Set[str]:
+        """Every restaurant with a document in this segment (the index only holds hashes, so read once and kept)."""
+        if self._restaurant_ids is None:
+            self._restaurant_ids = {doc["restaurant_id"] for doc in self.find()}
+        return self._restaurant_ids
+
+
+class AuditArchive:
+    """Directory of cold audit segments, queryable by restaurant and time range."""
+
+    def __init__(self, directory: str = AUDIT_ARCHIVE_DIR):
+        self.directory = Path(directory)
+        self._segments: Dict[Path, Segment] = {}
+
+    def segments(self) -> List[Segment]:
+        """Open (and cache) every segment, ordered by start time."""
+        if self.directory.exists():
+            for path in self.directory.glob("audit-*.seg"):
+                if path not in self._segments:
+                    self._segments[path] = Segment(path)
+        return sorted(self._segments.values(), key=lambda segment: segment.start_ms)
+
+    def latest(self) -> Optional[Segment]:
+        """
+        The segment written last: the only one whose documents can still be in
+        Mongo, if the archiver stopped between writing it and deleting them.
+        """
+        segments = self.segments()
+        return max(segments, key=lambda segment: segment.path.stat().st_mtime) if segments else None
+
+    def find(self, restaurant_id: Optional[str] = None, start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """Yield archived documents in time order, skipping segments outside the range."""
+        start_ms = _to_ms(start) if start is not None else None
+        end_ms = _to_ms(end) if end is not None else None
+        for segment in self.segments():
+            if not segment.count:
+                continue
+            if (start_ms is not None and segment.end_ms < start_ms) or (end_ms is not None and segment.start_ms > end_ms):
+                continue
+            yield from segment.find(restaurant_id, start_ms, end_ms)
+
+    def restaurant_ids(self) -> Set[str]:
+        """Every restaurant with an archived document."""
+        restaurant_ids: Set[str] = set()
+        for segment in self.segments():
+            restaurant_ids |= segment.restaurant_ids()
+        return restaurant_ids
+
+    def archive(self, audit: Collection, older_than: datetime, batch_size: int = 100_000) -> int:
+        """
+        Move audit documents older than `older_than` from Mongo into segments.
+
+        Each segment is fully written before its documents are deleted from
+        the collection, so a crash can duplicate but never lose events. A run
+        first finishes the previous one, deleting whatever the last segment
+        holds that is still in Mongo, so documents are never archived twice.
+
+        Args:
+            audit: The `audit` collection
+            older_than: Cutoff time
+            batch_size: Documents per segment
+
+        Returns:
+            Number of documents archived
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        latest = self.latest()
+        if latest is not None:
+            leftover = audit.delete_many({"_id": {"$in": [doc["_id"] for doc in latest.find()]}}).deleted_count
+            if leftover:
+                logger.info(f"Removed {leftover} audit documents already archived in {latest.path.name}")
+        archived = 0
+        while True:
+            docs = list(audit.find({"time_of_action": {"$lt": older_than}})
+                        .sort([("time_of_action", ASCENDING), ("_id", ASCENDING)])
+                        .limit(batch_size))
+            if not docs:
+                return archived
+            first, last = _to_ms(docs[0]["time_of_action"]), _to_ms(docs[-1]["time_of_action"])
+            path = self.directory / f"audit-{first}-{last}-{docs[-1]['_id']}.seg"
+            size = write_segment(path, docs)
+            audit.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            archived += len(docs)
+            logger.info(f"Archived {len(docs)} audit documents to {path.name} ({size} bytes)")
+
+
+class AuditStore:
+    """Single query API over hot (Mongo) and cold (segment) audit data."""
+
+    def __init__(self, audit: Collection, archive: Optional[AuditArchive] = None):
+        self.audit = audit
+        self.archive = archive or AuditArchive()
+
+    def find(self, restaurant_id: Optional[str] = None, start: Optional[datetime] = None,
+             end: Optional[datetime] = None, start_exclusive: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yield audit documents in time order across cold and hot storage.
+
+        Args:
+            restaurant_id: Restrict to one restaurant
+            start: Earliest `time_of_action`
+            end: Latest `time_of_action` (inclusive)
+            start_exclusive: Exclude documents exactly at `start`
+
+        Returns:
+            Iterator of audit documents as stored, each once even when an
+            interrupted archive left it in both places
+        """
+        latest = self.archive.latest()
+        in_latest = set()
+        for doc in self.archive.find(restaurant_id, start, end):
+            if start_exclusive and start is not None and _to_ms(doc["time_of_action"]) <= _to_ms(start):
+                continue
+            if latest is not None and latest.start_ms <= _to_ms(doc["time_of_action"]) <= latest.end_ms:
+                in_latest.add(doc["_id"])
+            yield doc
+
+        query: Dict[str, Any] = {}
+        if restaurant_id is not None:
+            query["restaurant_id"] = str(restaurant_id)
+        time_filter: Dict[str, Any] = {}
+        if start is not None:
+            time_filter["$gt" if start_exclusive else "$gte"] = start
+        if end is not None:
+            time_filter["$lte"] = end
+        if time_filter:
+            query["time_of_action"] = time_filter
+        for doc in self.audit.find(query).sort([("time_of_action", ASCENDING), ("_id", ASCENDING)]):
+            if doc["_id"] not in in_latest:
+                yield doc
+
+    def restaurant_ids(self) -> List[str]:
+        """Every restaurant with audit history in cold or hot storage, sorted."""
+        return sorted(self.archive.restaurant_ids() | set(self.audit.distinct("restaurant_id")))
+
+
+def get_audit_store() -> AuditStore:
+    """Return an audit store over the configured collection and archive directory."""
+    return AuditStore(get_db()[COLLECTIONS['AUDIT']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive cold audit data into local segment files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    archive_parser = subparsers.add_parser("archive", help="Move old audit documents into segments")
+    archive_parser.add_argument("--older-than-days", type=int, default=AUDIT_COLD_AFTER_DAYS)
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+        count = AuditArchive().archive(get_db()[COLLECTIONS['AUDIT']], cutoff)
+        print(f"Archived {count} audit documents older than {cutoff.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Peak memory and time-to-first-byte of exporting one heavy user's history.
+
+Seeds a sqlite activity store with `--events` records for one user, then
+fetches the whole history in a fresh process per variant, so each process's
+peak RSS belongs to that request alone:
+
+    list         GET /api/v1/activity/<user>          (one jsonify payload)
+    export       GET /api/v1/activity/<user>/export   (streamed NDJSON)
+    export-gzip  the same with Accept-Encoding: gzip
+
+Run from the backend directory:
+
+    python -m benchmarks.activity_export --events 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+USERNAME = "heavy-critic"
+VARIANTS = {
+    "list": (f"/api/v1/activity/{USERNAME}", {}),
+    "export": (f"/api/v1/activity/{USERNAME}/export", {}),
+    "export-gzip": (f"/api/v1/activity/{USERNAME}/export", {"Accept-Encoding": "gzip"})
+}
+
+
+def seed(path: str, events: int, batch_size: int = 50_000) -> None:
+    from stores import SQLITE_SCHEMA
+
+    connection = sqlite3.connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    details = json.dumps({"sql": "UPDATE restaurants SET (avg_rating = 4.5) WHERE name = 'Restaurant 42'",
+                          "sentiment": 0.42, "result": {"modified_count": 1}})
+    with connection:
+        for start in range(0, events, batch_size):
+            connection.executemany(
+                "INSERT INTO activity (username, action, timestamp, details) VALUES (?, ?, ?, ?)",
+                ((USERNAME, "modify", f"2024-01-01T00:00:00.{i:06d}", details)
+                 for i in range(start, min(start + batch_size, events)))
+            )
+        connection.execute("INSERT INTO activity (username, action, timestamp, details) VALUES (?, ?, ?, ?)",
+                           ("someone-else", "insert", "2024-01-01T00:00:00", details))
+    connection.close()
+
+
+def child(variant: str, path: str) -> Dict:
+    from flask import Flask
+
+    import stores
+    from routes.activity import activity_bp
+
+    stores._store = stores.SqliteActivityStore(path)
+    app = Flask(__name__)
+    app.register_blueprint(activity_bp)
+    client = app.test_client()
+    url, headers = VARIANTS[variant]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    first_byte_s, size = None, 0
+    for chunk in response.response:
+        if first_byte_s is None and chunk:
+            first_byte_s = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    return {
+        "variant": variant,
+        "status": response.status_code,
+        "ttfb_s": first_byte_s,
+        "total_s": time.perf_counter() - started,
+        "bytes": size,
+        "baseline_rss_mb": baseline_kb / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.db)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "activity.sqlite3")
+        started = time.perf_counter()
+        seed(path, args.events)
+        print(f"seeded {args.events} events in {time.perf_counter() - started:.1f}s")
+        print(f"{'variant':<12} {'status':>6} {'ttfb ms':>9} {'total s':>8} {'MB sent':>8} "
+              f"{'base RSS':>9} {'peak RSS':>9}")
+        for variant in args.variants:
+            output = subprocess.run([sys.executable, "-m", "benchmarks.activity_export", "--child", variant,
+                                     "--db", path], capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{variant:<12} {result['status']:>6} {result['ttfb_s'] * 1000:>9.1f} {result['total_s']:>8.2f} "
+                  f"{result['bytes'] / 2 ** 20:>8.1f} {result['baseline_rss_mb']:>9.1f} "
+                  f"{result['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
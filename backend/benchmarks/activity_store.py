@@ -0,0 +1,79 @@
+"""
+Append and read throughput of the activity store with 1 versus 8 processes.
+
+Each process appends `--appends` activity records spread over `--users`
+users, then reads the full history of random users `--reads` times. Run
+from the backend directory:
+
+    python -m benchmarks.activity_store --store sqlite --workers 1 8
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.activity_store --store mongo
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+
+def _worker(kind: str, path: str, worker: int, appends: int, reads: int, users: int, barrier) -> Dict:
+    from stores import MongoActivityStore, SqliteActivityStore
+    from config import get_db
+
+    store = SqliteActivityStore(path) if kind == "sqlite" else MongoActivityStore(get_db())
+    rng = random.Random(worker)
+    barrier.wait()
+
+    started = time.perf_counter()
+    for i in range(appends):
+        store.append_activity(f"bench-user-{rng.randrange(users)}", "chat", {"worker": worker, "i": i})
+    store.flush()
+    append_s = time.perf_counter() - started
+
+    barrier.wait()
+    started = time.perf_counter()
+    for _ in range(reads):
+        store.activities(f"bench-user-{rng.randrange(users)}", limit=50)
+    read_s = time.perf_counter() - started
+    store.close()
+    return {"append_s": append_s, "read_s": read_s}
+
+
+def run(kind: str, workers: int, appends: int, reads: int, users: int) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "activity.sqlite3")
+        if kind == "mongo":
+            from config import COLLECTIONS, get_db
+            for name in ("ACTIVITY", "CHAT_HISTORY"):
+                get_db()[COLLECTIONS[name]].delete_many({"username": {"$regex": "^bench-user-"}})
+        barrier = context.Manager().Barrier(workers)
+        with context.Pool(workers) as pool:
+            results = pool.starmap(_worker, [(kind, path, worker, appends, reads, users, barrier)
+                                             for worker in range(workers)])
+    # Throughput over the slowest worker: all of them ran concurrently
+    return {
+        "workers": workers,
+        "appends_per_sec": workers * appends / max(r["append_s"] for r in results),
+        "reads_per_sec": workers * reads / max(r["read_s"] for r in results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--appends", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'store':<7} {'workers':>8} {'appends/s':>11} {'reads/s':>9}")
+    for workers in args.workers:
+        r = run(args.store, workers, args.appends, args.reads, args.users)
+        print(f"{args.store:<7} {r['workers']:>8} {r['appends_per_sec']:>11.0f} {r['reads_per_sec']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Database load of live activity viewers: polling the feed versus streaming.
+
+`--viewers` viewers each watch one user's activity while a writer logs
+`--writes-per-sec` activities across those users, for `--seconds`:
+
+    polling    every viewer re-reads its user's whole feed every
+               `--poll-interval` seconds, as the Past Activity section did
+    streaming  every viewer loads its feed once when it connects, then holds
+               an ActivityHub subscription (one thread each, like an SSE
+               response)
+
+Reported per variant: feed queries, rows read and time spent in them,
+and staleness (write to viewer) percentiles. Run from the backend directory:
+
+    python -m benchmarks.activity_stream --viewers 1000 --seconds 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from hub import ActivityHub
+from stores import ActivityStore, MemoryActivityStore, SqliteActivityStore
+
+
+class Load:
+    """Feed reads issued and staleness observed by viewers"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.busy_s = 0.0
+        self.staleness: List[float] = []
+        self._lock = threading.Lock()
+
+    def read_feed(self, store: ActivityStore, user: str) -> List[Dict]:
+        started = time.perf_counter()
+        records = store.activities(user)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.queries += 1
+            self.rows += len(records)
+            self.busy_s += elapsed
+        return records
+
+
+def write_load(store: ActivityStore, hub: ActivityHub, users: List[str], rate: float, stop: threading.Event) -> None:
+    """Log activities at a steady rate, as log_activity does"""
+    rng = random.Random(1)
+    due = time.perf_counter()
+    while not stop.is_set():
+        user = rng.choice(users)
+        timestamp = datetime.utcnow()
+        details = {"t": time.time()}
+        store.append_activity(user, "chat", details, timestamp)
+        if hub is not None:
+            hub.publish({"username": user, "action": "chat", "timestamp": timestamp.isoformat(), "details": details})
+        due += 1 / rate
+        time.sleep(max(0.0, due - time.perf_counter()))
+
+
+def polling(store: ActivityStore, users: List[str], args: argparse.Namespace) -> Load:
+    load = Load()
+    last_seen = {user: time.time() for user in users}
+    stop = threading.Event()
+    writer = threading.Thread(target=write_load, args=(store, None, users, args.writes_per_sec, stop))
+    writer.start()
+    # One poller works through the viewers' schedule, spreading polls evenly over the interval
+    spacing = args.poll_interval / len(users)
+    started = due = time.perf_counter()
+    polls = 0
+    while time.perf_counter() - started < args.seconds:
+        time.sleep(max(0.0, due - time.perf_counter()))
+        user = users[polls % len(users)]
+        records = load.read_feed(store, user)
+        now = time.time()
+        newest = last_seen[user]
+        for record in reversed(records):
+            written = record["details"].get("t")
+            if written is None or written <= last_seen[user]:
+                break
+            load.staleness.append(now - written)
+            newest = max(newest, written)
+        last_seen[user] = newest
+        polls += 1
+        due += spacing
+    stop.set()
+    writer.join()
+    return load
+
+
+def streaming(store: ActivityStore, users: List[str], args: argparse.Namespace) -> Dict:
+    load = Load()
+    hub = ActivityHub(buffer_size=args.buffer)
+    stop = threading.Event()
+
+    def viewer(subscription) -> None:
+        while not stop.is_set():
+            batch = subscription.next_batch(0.5) or []
+            now = time.time()
+            load.staleness.extend(now - data["details"]["t"] for _, kind, data in batch if kind == "activity")
+        hub.unsubscribe(subscription)
+
+    subscriptions = []
+    for user in users:
+        load.read_feed(store, user)
+        subscriptions.append(hub.subscribe(user))
+    viewers = [threading.Thread(target=viewer, args=(subscription,), daemon=True) for subscription in subscriptions]
+    for thread in viewers:
+        thread.start()
+    writer = threading.Thread(target=write_load, args=(store, hub, users, args.writes_per_sec, stop))
+    writer.start()
+    time.sleep(args.seconds)
+    stop.set()
+    writer.join()
+    for thread in viewers:
+        thread.join()
+    return {"load": load, "stats": hub.get_stats()}
+
+
+def seed(store: ActivityStore, users: List[str], history: int) -> None:
+    for i in range(history):
+        for user in users:
+            store.append_activity(user, "chat", {"seed": i})
+    store.flush()
+
+
+def report(label: str, load: Load, seconds: float, extra: str = "") -> None:
+    staleness = np.array(load.staleness or [0.0]) * 1000
+    print(f"{label:<10} {load.queries:>8} {load.queries / seconds:>9.1f} {load.rows:>10} {load.busy_s:>8.2f} "
+          f"{len(load.staleness):>9} {np.percentile(staleness, 50):>8.0f} {np.percentile(staleness, 99):>8.0f}"
+          f"{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--writes-per-sec", type=float, default=50.0)
+    parser.add_argument("--history", type=int, default=100, help="Activities per user before the run")
+    parser.add_argument("--buffer", type=int, default=256, help="Events buffered per streaming viewer")
+    parser.add_argument("--store", choices=("sqlite", "memory"), default="sqlite")
+    args = parser.parse_args()
+
+    users = [f"critic-{i}" for i in range(args.viewers)]
+    print(f"{args.viewers} viewers, {args.writes_per_sec:.0f} writes/s, {args.history} activities per user, "
+          f"{args.store} store, {args.seconds:.0f}s per variant")
+    print(f"{'variant':<10} {'queries':>8} {'queries/s':>9} {'rows read':>10} {'db s':>8} {'delivered':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for variant in ("polling", "streaming"):
+            if args.store == "sqlite":
+                store: ActivityStore = SqliteActivityStore(os.path.join(directory, f"{variant}.sqlite3"))
+            else:
+                store = MemoryActivityStore()
+            seed(store, users, args.history)
+            if variant == "polling":
+                report(variant, polling(store, users, args), args.seconds)
+            else:
+                result = streaming(store, users, args)
+                stats = result["stats"]
+                report(variant, result["load"], args.seconds,
+                       f"  (feed loaded once per viewer; {stats['published']} published, "
+                       f"{stats['overflows']} overflows)")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Vectorized review analytics versus Python loops and Mongo aggregation.
+
+Computes per-zipcode mean rating and sentiment plus the rating histogram
+three ways. The Mongo variant needs a MongoDB at MONGODB_URI and is skipped
+with --skip-mongo. Run from the backend directory:
+
+    python -m benchmarks.analytics --reviews 1000000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+from analytics import ReviewAnalytics
+from config import MONGODB_URI, COLLECTIONS
+
+ZIPCODES = [f"474{i:02d}" for i in range(50)]
+
+MONGO_PIPELINE = [
+    {"$unwind": "$critic_reviews"},
+    {"$group": {
+        "_id": "$address.zipcode",
+        "reviews": {"$sum": 1},
+        "mean_rating": {"$avg": "$critic_reviews.rating"},
+        "mean_sentiment": {"$avg": "$critic_reviews.sentiment_score"}
+    }}
+]
+
+
+def make_restaurants(reviews: int, per_restaurant: int, rng: random.Random) -> List[Dict]:
+    restaurants = []
+    for i in range(reviews // per_restaurant):
+        restaurants.append({
+            "restaurant_id": str(i),
+            "address": {"zipcode": rng.choice(ZIPCODES)},
+            "critic_reviews": [
+                {"name": f"Critic {rng.randrange(5000)}", "rating": float(rng.randint(1, 5)),
+                 "sentiment_score": rng.uniform(-1, 1)}
+                for _ in range(per_restaurant)
+            ]
+        })
+    return restaurants
+
+
+def python_loops(restaurants: List[Dict]) -> Dict:
+    sums = defaultdict(lambda: [0, 0.0, 0.0])
+    histogram = [0] * 6
+    for doc in restaurants:
+        bucket = sums[doc["address"]["zipcode"]]
+        for review in doc["critic_reviews"]:
+            bucket[0] += 1
+            bucket[1] += review["rating"]
+            bucket[2] += review["sentiment_score"]
+            histogram[int(round(review["rating"]))] += 1
+    return {zipcode: (count, rating / count, sentiment / count) for zipcode, (count, rating, sentiment) in sums.items()}
+
+
+def timed(label: str, func) -> None:
+    start = time.perf_counter()
+    func()
+    print(f"{label:<22} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--per-restaurant", type=int, default=10)
+    parser.add_argument("--database", default="food-critic-reviews-bench")
+    parser.add_argument("--skip-mongo", action="store_true")
+    args = parser.parse_args()
+
+    restaurants = make_restaurants(args.reviews, args.per_restaurant, random.Random(42))
+    analytics = ReviewAnalytics()
+    start = time.perf_counter()
+    for doc in restaurants:
+        analytics.columns.upsert_restaurant(doc)
+    analytics.loaded = True
+    print(f"Loaded {len(analytics.columns)} reviews into columns in {time.perf_counter() - start:.1f}s")
+
+    timed("numpy zipcode means", analytics.zipcode_means)
+    timed("numpy histogram", analytics.rating_histogram)
+    timed("numpy correlation", analytics.rating_sentiment_correlation)
+    timed("python loops", lambda: python_loops(restaurants))
+
+    update = dict(restaurants[0], critic_reviews=restaurants[0]["critic_reviews"][:-1])
+    timed("incremental refresh", lambda: analytics.on_write({
+        "collection": COLLECTIONS['RESTAURANTS'], "before": [restaurants[0]], "after": [update]
+    }))
+
+    if not args.skip_mongo:
+        collection = MongoClient(MONGODB_URI)[args.database][COLLECTIONS['RESTAURANTS']]
+        collection.drop()
+        collection.insert_many([dict(doc) for doc in restaurants], ordered=False)
+        timed("mongo aggregation", lambda: list(collection.aggregate(MONGO_PIPELINE, allowDiskUse=True)))
+
+
+if __name__ == "__main__":
+    main()
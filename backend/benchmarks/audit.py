@@ -0,0 +1,89 @@
+"""
+Review write latency with audit off, audited asynchronously, and audited inline.
+
+Needs a MongoDB reachable at MONGODB_URI (e.g. a local mongod) and uses a
+scratch database. Run from the backend directory:
+
+    python -m benchmarks.audit --writes 5000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from pymongo import MongoClient, ASCENDING, DESCENDING
+
+from audit import AuditWriter, audit_documents
+from config import MONGODB_URI, COLLECTIONS
+
+
+def write_event(restaurant: Dict, rating: float) -> Dict:
+    after = dict(restaurant, avg_rating=rating)
+    return {
+        "collection": COLLECTIONS['RESTAURANTS'],
+        "operation": "update",
+        "changes": {"avg_rating": rating},
+        "before": [restaurant],
+        "after": [after],
+        "actor": "benchmark",
+        "timestamp": datetime.now(timezone.utc)
+    }
+
+
+def run(db, writes: int, audit: Callable[[Dict], None]) -> List[float]:
+    restaurants = db[COLLECTIONS['RESTAURANTS']]
+    restaurant = restaurants.find_one({"restaurant_id": "1"})
+    samples = []
+    for i in range(writes):
+        rating = float(i % 5)
+        start = time.perf_counter()
+        restaurants.update_one({"_id": restaurant["_id"]}, {"$set": {"avg_rating": rating}})
+        audit(write_event(restaurant, rating))
+        samples.append((time.perf_counter() - start) * 1000)
+        restaurant["avg_rating"] = rating
+    return samples
+
+
+def report(label: str, samples: List[float]) -> None:
+    samples = sorted(samples)
+    print(f"{label:<10} mean {statistics.mean(samples):7.3f} ms   "
+          f"p50 {samples[len(samples) // 2]:7.3f} ms   p99 {samples[int(len(samples) * 0.99)]:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--database", default="food-critic-reviews-bench")
+    args = parser.parse_args()
+
+    db = MongoClient(MONGODB_URI)[args.database]
+    db[COLLECTIONS['RESTAURANTS']].drop()
+    db[COLLECTIONS['AUDIT']].drop()
+    db[COLLECTIONS['AUDIT']].create_index([("restaurant_id", ASCENDING), ("time_of_action", DESCENDING)])
+    db[COLLECTIONS['RESTAURANTS']].insert_one({
+        "restaurant_id": "1", "name": "Benchmark Bistro", "avg_rating": 0.0, "critic_reviews": []
+    })
+
+    report("off", run(db, args.writes, lambda event: None))
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        writer = AuditWriter(db[COLLECTIONS['AUDIT']], journal_dir=journal_dir)
+        writer.start()
+        report("async", run(db, args.writes, lambda event: writer.emit(audit_documents(event))))
+        start = time.perf_counter()
+        writer.stop()
+        print(f"           drained in {time.perf_counter() - start:.2f}s, "
+              f"{db[COLLECTIONS['AUDIT']].count_documents({})} audit documents")
+
+    def inline(event: Dict) -> None:
+        docs = audit_documents(event)
+        if docs:
+            db[COLLECTIONS['AUDIT']].insert_many(docs)
+
+    report("inline", run(db, args.writes, inline))
+
+
+if __name__ == "__main__":
+    main()
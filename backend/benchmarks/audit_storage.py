@@ -0,0 +1,116 @@
+"""
+Audit storage footprint and hot versus cold query latency.
+
+Generates a synthetic audit trail, then reports BSON bytes per event for full
+and compact documents, bytes per event in cold segments, and the latency of a
+per-restaurant time-range query against Mongo (hot) and segments (cold).
+Hot queries need a MongoDB at MONGODB_URI; pass --skip-hot without one. Run
+from the backend directory:
+
+    python -m benchmarks.audit_storage --restaurants 1000 --updates 100
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import bson
+from pymongo import MongoClient, ASCENDING, DESCENDING
+
+from audit import audit_documents
+from audit_store import AuditArchive, AuditStore, write_segment
+from config import MONGODB_URI, COLLECTIONS
+
+
+def make_events(restaurants: int, updates: int, rng: random.Random) -> List[Dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for restaurant_id in range(restaurants):
+        doc = {
+            "_id": restaurant_id,
+            "restaurant_id": str(restaurant_id),
+            "name": f"Restaurant {restaurant_id}",
+            "address": {"building": str(rng.randint(1, 999)), "coord": [-86.5, 39.1],
+                        "street": "East Kirkwood Avenue", "zipcode": "47408"},
+            "avg_rating": 0.0,
+            "critic_reviews": []
+        }
+        events.append({"operation": "insert", "before": [], "after": [doc]})
+        for i in range(updates):
+            reviews = [dict(review) for review in doc["critic_reviews"]]
+            critic = f"Critic {rng.randrange(20)}"
+            existing = next((review for review in reviews if review["name"] == critic), None)
+            if existing:
+                existing["rating"] = rng.randint(1, 5)
+            else:
+                reviews.append({"name": critic, "rating": rng.randint(1, 5), "sentiment_score": rng.uniform(-1, 1),
+                                "review": "The seasonal menu was outstanding but service was slow. " * 3})
+            new_doc = dict(doc, critic_reviews=reviews,
+                           avg_rating=sum(review["rating"] for review in reviews) / len(reviews))
+            events.append({"operation": "update", "changes": {"critic_reviews": 1, "avg_rating": 1},
+                           "before": [doc], "after": [new_doc]})
+            doc = new_doc
+    for i, event in enumerate(events):
+        event.update(collection=COLLECTIONS['RESTAURANTS'], actor="benchmark",
+                     timestamp=start + timedelta(seconds=i))
+    return events
+
+
+def bson_bytes(docs: List[Dict]) -> float:
+    return sum(len(bson.encode(doc)) for doc in docs) / len(docs)
+
+
+def median_ms(func, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--database", default="food-critic-reviews-bench")
+    parser.add_argument("--skip-hot", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    events = make_events(args.restaurants, args.updates, rng)
+    full = [doc for event in events for doc in audit_documents(event, "full")]
+    compact = [doc for event in events for doc in audit_documents(event, "compact")]
+    compact.sort(key=lambda doc: (doc["time_of_action"], doc["restaurant_id"]))
+    print(f"{len(full)} audit events")
+    print(f"full    {bson_bytes(full):8.1f} bytes/event")
+    print(f"compact {bson_bytes(compact):8.1f} bytes/event")
+
+    restaurant_id = str(args.restaurants // 2)
+    window = [doc["time_of_action"] for doc in compact if doc["restaurant_id"] == restaurant_id]
+    start, end = window[len(window) // 4], window[3 * len(window) // 4]
+
+    with tempfile.TemporaryDirectory() as directory:
+        size = write_segment(Path(directory) / "audit-0-0-0.seg", compact)
+        print(f"cold    {size / len(compact):8.1f} bytes/event")
+        archive = AuditArchive(directory)
+        cold_ms = median_ms(lambda: list(archive.find(restaurant_id, start, end)), args.iterations)
+        print(f"cold query {cold_ms:8.3f} ms for {len(list(archive.find(restaurant_id, start, end)))} events")
+
+    if not args.skip_hot:
+        audit = MongoClient(MONGODB_URI)[args.database][COLLECTIONS['AUDIT']]
+        audit.drop()
+        audit.create_index([("restaurant_id", ASCENDING), ("time_of_action", DESCENDING)])
+        audit.insert_many(compact, ordered=False)
+        store = AuditStore(audit, AuditArchive(tempfile.mkdtemp()))
+        hot_ms = median_ms(lambda: list(store.find(restaurant_id, start, end)), args.iterations)
+        print(f"hot query  {hot_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-stage and end-to-end throughput of bulk review ingestion.
+
+Runs JSONL reviews through BulkReviewIngester against mongomock (or a real
+mongod with --mongo-uri), once with the configured batch sizes and once
+with every batch size set to 1, which is what one request per review would
+cost. Sentiment is the benchmark's tiny random-projection model, plus an
+optional fixed cost per predict call standing in for a real model's per-batch
+overhead. About 5% of lines are invalid or name unknown restaurants. Run
+from the backend directory:
+
+    python -m benchmarks.bulk_reviews --restaurants 10000 --reviews 20000
+    python -m benchmarks.bulk_reviews --sentiment-overhead-ms 5
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.pipeline import REVIEW_WORDS, TinySentiment, seed_restaurants
+from config import get_validators
+from ingest import BulkReviewIngester
+
+DATABASE = "food-critic-reviews-bench"
+
+
+class OverheadSentiment(TinySentiment):
+    """TinySentiment plus a fixed sleep per predict call."""
+
+    def __init__(self, overhead: float):
+        super().__init__()
+        self.overhead = overhead
+
+    def predict(self, texts: List[str]) -> List[float]:
+        if self.overhead:
+            time.sleep(self.overhead)
+        return super().predict(texts)
+
+
+def jsonl(restaurants: int, reviews: int, seed: int = 0) -> List[bytes]:
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(reviews):
+        restaurant = int(rng.integers(restaurants))
+        review = {"critic": f"critic-{rng.integers(200)}", "review": " ".join(rng.choice(REVIEW_WORDS, size=12)),
+                  "rating": int(rng.integers(1, 6))}
+        if i % 2:
+            review["restaurant_id"] = str(restaurant)
+        else:
+            review["restaurant"] = f"Restaurant {restaurant}"
+        if i % 40 == 0:
+            review["rating"] = 9
+        elif i % 40 == 1:
+            review["restaurant_id"] = "no-such-restaurant"
+        lines.append(json.dumps(review).encode() + b"\n")
+    return lines
+
+
+def run(restaurants: Any, model: Any, lines: List[bytes], batched: bool) -> Dict[str, Any]:
+    sizes = {} if batched else {"sentiment_batch": 1, "resolve_batch": 1, "write_batch": 1}
+    ingester = BulkReviewIngester(restaurants, model, validator=get_validators()["restaurants"],
+                                  actor="bench", **sizes)
+    results = list(ingester.ingest(lines))
+    assert len(results) == len(lines)
+    return ingester.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=10_000)
+    parser.add_argument("--reviews", type=int, default=20_000)
+    parser.add_argument("--sentiment-overhead-ms", type=float, default=0.0)
+    parser.add_argument("--mongo-uri", help="Use this mongod instead of mongomock")
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client: Optional[Any] = MongoClient(args.mongo_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    model = OverheadSentiment(args.sentiment_overhead_ms / 1000)
+    lines = jsonl(args.restaurants, args.reviews)
+
+    for label, batched in (("batched", True), ("unbatched", False)):
+        restaurants = client[DATABASE]["restaurants"]
+        seed_restaurants(restaurants, args.restaurants)
+        summary = run(restaurants, model, lines, batched)
+        print(f"{label}: {summary['lines']} lines, {summary['written']} written, {summary['failed']} failed, "
+              f"{summary['elapsed_s']:.2f}s, {summary['throughput']:.0f} lines/s end to end")
+        print(f"  {'stage':<10} {'items':>7} {'batches':>8} {'busy s':>8} {'items/s':>10}")
+        for stage, stats in summary["stages"].items():
+            print(f"  {stage:<10} {stats['items']:>7} {stats['batches']:>8} {stats['busy_s']:>8.2f} "
+                  f"{stats['throughput']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Critic profile query cost before and after the `critic_stats` rollup.
+
+"Before" computes one critic's profile with `$unwind` over `critic_reviews`,
+"after" is a single `_id` lookup on `critic_stats`. Needs a MongoDB reachable
+at MONGODB_URI (e.g. a local mongod) and seeds a scratch database. Run from
+the backend directory:
+
+    python -m benchmarks.critic_stats --reviews 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from pymongo import MongoClient, ASCENDING
+
+from config import MONGODB_URI, COLLECTIONS
+from critic_stats import backfill, critic_profile
+
+
+def seed(db, reviews: int, critics: int, per_restaurant: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    restaurants = db[COLLECTIONS['RESTAURANTS']]
+    restaurants.drop()
+    batch: List[Dict] = []
+    for restaurant in range(reviews // per_restaurant):
+        critic_reviews = [
+            {
+                "name": f"Critic {rng.randrange(critics)}",
+                "review": "Benchmark review",
+                "rating": float(rng.randint(1, 5)),
+                "sentiment_score": rng.uniform(-1, 1)
+            }
+            for _ in range(per_restaurant)
+        ]
+        batch.append({
+            "restaurant_id": str(restaurant),
+            "name": f"Restaurant {restaurant}",
+            "avg_rating": sum(r["rating"] for r in critic_reviews) / per_restaurant,
+            "critic_reviews": critic_reviews
+        })
+        if len(batch) == 1000:
+            restaurants.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        restaurants.insert_many(batch, ordered=False)
+    restaurants.create_index([("critic_reviews.name", ASCENDING)])
+
+
+def unwind_profile(db, name: str) -> Dict:
+    pipeline = [
+        {"$match": {"critic_reviews.name": name}},
+        {"$unwind": "$critic_reviews"},
+        {"$match": {"critic_reviews.name": name}},
+        {"$group": {
+            "_id": "$critic_reviews.name",
+            "review_count": {"$sum": 1},
+            "rating_sum": {"$sum": "$critic_reviews.rating"},
+            "sentiment_sum": {"$sum": "$critic_reviews.sentiment_score"},
+            "sentiment_count": {"$sum": 1},
+            "harshness_sum": {"$sum": {"$subtract": ["$critic_reviews.rating", "$avg_rating"]}}
+        }}
+    ]
+    return next(db[COLLECTIONS['RESTAURANTS']].aggregate(pipeline), None)
+
+
+def median_ms(func, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--critics", type=int, default=5000)
+    parser.add_argument("--per-restaurant", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--database", default="food-critic-reviews-bench")
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    db = MongoClient(MONGODB_URI)[args.database]
+    if not args.skip_seed:
+        print(f"Seeding {args.reviews} reviews...")
+        seed(db, args.reviews, args.critics, args.per_restaurant, 42)
+
+    start = time.perf_counter()
+    critics = backfill(db)
+    print(f"Backfill: {critics} critics in {time.perf_counter() - start:.1f}s")
+
+    name = "Critic 0"
+    stats = db[COLLECTIONS['CRITIC_STATS']]
+    restaurants_examined = db[COLLECTIONS['RESTAURANTS']].count_documents({"critic_reviews.name": name})
+    lookup_plan = stats.find({"_id": name}).explain()["executionStats"]
+
+    print(f"Profile: {critic_profile(stats.find_one({'_id': name}))}")
+    print(f"$unwind aggregation: {median_ms(lambda: unwind_profile(db, name), args.iterations):8.2f} ms median, "
+          f"{restaurants_examined} restaurant documents unwound")
+    print(f"critic_stats lookup: {median_ms(lambda: stats.find_one({'_id': name}), args.iterations):8.2f} ms median, "
+          f"{lookup_plan['totalDocsExamined']} document examined")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Lookup latency and recall of the near-duplicate review index.
+
+Builds a DedupeIndex over `--reviews` synthetic reviews (Zipf-distributed
+words from a large vocabulary, 20-80 words each), as `DedupeIndex.load`
+would from the collection, then queries it with:
+
+    near   copies of indexed reviews with a few words replaced, inserted or
+           dropped, so their true shingle Jaccard spreads around the threshold
+    fresh  new reviews that match nothing in the index
+
+Recall is the share of near copies at or above the threshold whose source
+is returned, also reported 0.05 above it since the 64-permutation estimate
+is noisy right at the cutoff; false positives are fresh queries that return
+anything. Latency is end to end per `find_duplicates` call (shingling,
+MinHash and LSH). Run from the backend directory:
+
+    python -m benchmarks.dedupe --reviews 1000000 --queries 2000
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from config import DEDUPE_BANDS, DEDUPE_NUM_PERM, DEDUPE_THRESHOLD
+from dedupe import DedupeIndex, shingle_hashes
+
+VOCABULARY = 20_000
+
+
+def make_review(rng: np.random.Generator) -> List[str]:
+    ranks = np.minimum(rng.zipf(1.2, size=int(rng.integers(20, 81))), VOCABULARY)
+    return [f"w{rank}" for rank in ranks]
+
+
+def perturb(rng: np.random.Generator, words: List[str]) -> List[str]:
+    words = list(words)
+    for _ in range(int(rng.integers(0, 5))):
+        position = int(rng.integers(len(words)))
+        edit = rng.integers(3)
+        if edit == 0:
+            words[position] = f"w{rng.integers(1, VOCABULARY)}"
+        elif edit == 1:
+            words.insert(position, f"w{rng.integers(1, VOCABULARY)}")
+        elif len(words) > 3:
+            del words[position]
+    return words
+
+
+def jaccard(a: str, b: str) -> float:
+    a_set, b_set = set(shingle_hashes(a).tolist()), set(shingle_hashes(b).tolist())
+    return len(a_set & b_set) / len(a_set | b_set)
+
+
+def percentiles(samples: List[float]) -> Tuple[float, float]:
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--threshold", type=float, default=DEDUPE_THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=DEDUPE_NUM_PERM)
+    parser.add_argument("--bands", type=int, default=DEDUPE_BANDS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    index = DedupeIndex(args.threshold, args.num_perm, args.bands)
+    picked = set(rng.choice(args.reviews, size=min(args.queries, args.reviews), replace=False).tolist())
+    sources = []
+    started = time.perf_counter()
+    batch = []
+    for i in range(args.reviews):
+        text = " ".join(make_review(rng))
+        batch.append((f"r{i % 50_000}", f"critic-{i % 5_000}", text))
+        if i in picked:
+            sources.append(batch[-1])
+        if len(batch) >= 20_000:
+            index._load_batch(batch)
+            batch = []
+    index._load_batch(batch)
+    index._rebuild()
+    index.loaded = True
+    build_s = time.perf_counter() - started
+    stats = index.stats()
+    print(f"built {len(index)} reviews in {build_s:.1f}s ({len(index) / build_s:.0f} reviews/s), "
+          f"index {stats['bytes'] / 2 ** 20:.0f} MB ({stats['bytes'] / len(index):.0f} bytes/review)")
+
+    near_latency, near = [], []
+    for restaurant_id, critic, text in sources:
+        query = " ".join(perturb(rng, text.split()))
+        started = time.perf_counter()
+        matches = index.find_duplicates(query, limit=5)
+        near_latency.append(time.perf_counter() - started)
+        hit = any(m["restaurant_id"] == restaurant_id and m["critic"] == critic for m in matches)
+        near.append((jaccard(query, text), hit))
+
+    fresh_latency, false_positives = [], 0
+    for _ in range(args.queries):
+        query = " ".join(make_review(rng))
+        started = time.perf_counter()
+        matches = index.find_duplicates(query, limit=5)
+        fresh_latency.append(time.perf_counter() - started)
+        false_positives += bool(matches)
+
+    add_latency = []
+    for _ in range(args.queries):
+        review = ("r-new", "critic-new", " ".join(make_review(rng)))
+        started = time.perf_counter()
+        index.add_many([review])
+        add_latency.append(time.perf_counter() - started)
+
+    print(f"{'query':<8} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}  result")
+    p50, p99 = percentiles(near_latency)
+    recall = []
+    for cutoff in (args.threshold, args.threshold + 0.05):
+        hits = [hit for similarity, hit in near if similarity >= cutoff]
+        recall.append(f"recall {sum(hits) / max(len(hits), 1):.3f} at Jaccard >= {cutoff:.2f} ({len(hits)})")
+    print(f"{'near':<8} {len(sources):>7} {p50 * 1000:>8.3f} {p99 * 1000:>8.3f}  {', '.join(recall)}")
+    p50, p99 = percentiles(fresh_latency)
+    print(f"{'fresh':<8} {args.queries:>7} {p50 * 1000:>8.3f} {p99 * 1000:>8.3f}  "
+          f"false positives {false_positives / args.queries:.4f}")
+    p50, p99 = percentiles(add_latency)
+    print(f"{'add':<8} {args.queries:>7} {p50 * 1000:>8.3f} {p99 * 1000:>8.3f}  "
+          f"{index.stats()['pending']} pending after inserts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+As-of reconstruction latency versus history length, with and without snapshots.
+
+Replays synthetic audit histories in memory; the number of audit documents a
+reconstruction has to read from Mongo scales the same way as the replay. Run
+from the backend directory:
+
+    python -m benchmarks.history --lengths 100 1000 10000 100000
+"""
+import argparse
+import bisect
+import copy
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from history import apply_event, replay, to_audit_time
+
+
+def make_history(length: int, critics: int, rng: random.Random) -> List[Dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    events = [
+        {"key": "name", "value": "Benchmark Bistro", "action": "insert", "time_of_action": to_audit_time(start)},
+        {"key": "address", "value": {"building": "1", "coord": [-86.5, 39.1], "street": "Main", "zipcode": "47408"},
+         "action": "insert", "time_of_action": to_audit_time(start)}
+    ]
+    for i in range(length - len(events)):
+        critic = f"Critic {rng.randrange(critics)}"
+        events.append({
+            "key": "user_reviews",
+            "value": {"name": critic, "review": f"Visit {i}", "rating": rng.randint(1, 5), "sentiment_score": 0.5},
+            "action": rng.choice(["insert", "update", "update", "delete"]),
+            "time_of_action": to_audit_time(start + timedelta(minutes=i + 1))
+        })
+    return events
+
+
+def make_snapshots(events: List[Dict], every: int) -> List[Dict]:
+    state, snapshots = {}, []
+    for i, event in enumerate(events, start=1):
+        apply_event(state, event)
+        if i % every == 0:
+            snapshots.append({"as_of": event["time_of_action"], "index": i, "state": copy.deepcopy(state)})
+    return snapshots
+
+
+def median_ms(func, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--critics", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'events':>8} {'full replay ms':>15} {'snapshot ms':>12} {'events replayed':>16}")
+    for length in args.lengths:
+        events = make_history(length, args.critics, rng)
+        snapshots = make_snapshots(events, args.every)
+        snapshot_times = [snapshot["as_of"] for snapshot in snapshots]
+        # Ask for a time between two snapshots, the typical case
+        target = max(0, length - args.every // 2 - 1)
+        when = events[target]["time_of_action"]
+
+        def with_snapshot():
+            position = bisect.bisect_right(snapshot_times, when) - 1
+            snapshot = snapshots[position] if position >= 0 else {"index": 0, "state": {}}
+            return replay(copy.deepcopy(snapshot["state"]), events[snapshot["index"]:target + 1])
+
+        _, replayed = with_snapshot()
+        print(f"{length:>8} {median_ms(lambda: replay({}, events[:target + 1]), args.iterations):>15.3f} "
+              f"{median_ms(with_snapshot, args.iterations):>12.3f} {replayed:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Leaderboard read latency and update cost versus number of restaurants.
+
+Compares the incrementally maintained boards with sorting every restaurant on
+each request. Runs fully in memory; run from the backend directory:
+
+    python -m benchmarks.leaderboard --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from leaderboard import LeaderboardService
+
+ZIPCODES = [f"474{i:02d}" for i in range(50)]
+
+
+def make_restaurants(count: int, rng: random.Random) -> List[Dict]:
+    return [
+        {
+            "restaurant_id": str(i),
+            "name": f"Restaurant {i}",
+            "address": {"zipcode": rng.choice(ZIPCODES)},
+            "avg_rating": round(rng.uniform(1, 5), 2),
+            "review_count": rng.randint(0, 200)
+        }
+        for i in range(count)
+    ]
+
+
+def per_call_us(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(size: int, iterations: int, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    restaurants = make_restaurants(size, rng)
+    service = LeaderboardService()
+
+    start = time.perf_counter()
+    for doc in restaurants:
+        service.update_restaurant(doc)
+    build_s = time.perf_counter() - start
+
+    zipcode = ZIPCODES[0]
+
+    def sort_per_request():
+        ranked = sorted(
+            (doc for doc in restaurants if doc["address"]["zipcode"] == zipcode),
+            key=lambda doc: (-doc["avg_rating"], -doc["review_count"])
+        )
+        return ranked[:service.size]
+
+    def update():
+        doc = restaurants[rng.randrange(size)]
+        doc["avg_rating"] = round(rng.uniform(1, 5), 2)
+        doc["review_count"] += 1
+        service.update_restaurant(doc)
+
+    return {
+        "restaurants": size,
+        "build_s": build_s,
+        "read_us": per_call_us(lambda: service.top("top_rated", zipcode), iterations),
+        "sort_read_us": per_call_us(sort_per_request, max(1, iterations // 100)),
+        "update_us": per_call_us(update, iterations)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'restaurants':>12} {'build s':>9} {'read us':>9} {'sort us':>11} {'update us':>10}")
+    for size in args.sizes:
+        r = run(size, args.iterations, args.seed)
+        print(f"{r['restaurants']:>12} {r['build_s']:>9.2f} {r['read_us']:>9.1f} "
+              f"{r['sort_read_us']:>11.1f} {r['update_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Upstream calls and latency of LLM requests under a bursty replay.
+
+Replays `--requests` chat requests against a FakeLLMServer (lognormal
+latency, a share of multi-second stragglers and 503s). Requests arrive in
+bursts, and `--duplicate-ratio` of them repeat a prompt sent within the last
+second, as double-clicks and client retries do. Two variants:
+
+    naive   each request builds its own HTTP client (a new connection) and
+            retries 503s with backoff, as a bare SDK call per request would
+    client  the shared LLMClient: reused connections, single-flight
+            coalescing, token bucket, hedging after `--hedge-after` seconds
+
+Latency is measured from each request's scheduled arrival. Run from the
+backend directory:
+
+    python -m benchmarks.llm_client --requests 2000
+    python -m benchmarks.llm_client --tail-ratio 0.05 --hedge-after 0.5
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from llm import FakeLLMServer, HttpTransport, LLMClient, LLMError, UpstreamError
+
+
+def bursty_trace(requests: int, duplicate_ratio: float, mean_burst: int, mean_gap: float,
+                 seed: int = 0) -> List[Tuple[float, str]]:
+    """(arrival offset in seconds, prompt) pairs"""
+    rng = random.Random(seed)
+    trace: List[Tuple[float, str]] = []
+    now = 0.0
+    while len(trace) < requests:
+        now += rng.expovariate(1 / mean_gap)
+        for _ in range(min(max(1, int(rng.expovariate(1 / mean_burst))), requests - len(trace))):
+            arrival = now + rng.uniform(0, 0.05)
+            recent = [prompt for offset, prompt in trace[-200:] if arrival - offset < 1.0]
+            if recent and rng.random() < duplicate_ratio:
+                prompt = rng.choice(recent)
+            else:
+                prompt = f"Review {len(trace)}: the tacos were {rng.choice(('crispy', 'soggy', 'perfect'))}"
+            trace.append((arrival, prompt))
+    return sorted(trace)
+
+
+def naive_call(url: str, attempts: int = 3, backoff: float = 0.2) -> Callable[[str], str]:
+    def call(prompt: str) -> str:
+        delay = backoff
+        for attempt in range(attempts):
+            try:
+                return HttpTransport(url).generate(prompt, timeout=30.0)
+            except UpstreamError as e:
+                if not e.retryable or attempt == attempts - 1:
+                    raise
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay *= 2
+    return call
+
+
+def replay(trace: List[Tuple[float, str]], call: Callable[[str], str]) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(due: float, prompt: str) -> None:
+        nonlocal errors
+        try:
+            call(prompt)
+            ok = True
+        except LLMError:
+            ok = False
+        with lock:
+            if ok:
+                latencies.append(time.perf_counter() - due)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=512) as pool:
+        for offset, prompt in trace:
+            due = started + offset
+            time.sleep(max(0.0, due - time.perf_counter()))
+            pool.submit(run, due, prompt)
+    samples = np.array(latencies or [0.0]) * 1000
+    return {"ok": len(latencies), "errors": errors, "p50": np.percentile(samples, 50),
+            "p99": np.percentile(samples, 99), "max": samples.max(), "elapsed_s": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3)
+    parser.add_argument("--mean-burst", type=int, default=20, help="Requests per burst, on average")
+    parser.add_argument("--mean-gap", type=float, default=0.25, help="Seconds between bursts, on average")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--tail-ms", type=float, default=2000.0)
+    parser.add_argument("--tail-ratio", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--hedge-after", type=float, default=0.4)
+    parser.add_argument("--rate", type=float, default=200.0, help="Client token bucket, calls per second")
+    parser.add_argument("--burst", type=int, default=100)
+    args = parser.parse_args()
+
+    trace = bursty_trace(args.requests, args.duplicate_ratio, args.mean_burst, args.mean_gap)
+    print(f"{len(trace)} requests over {trace[-1][0]:.1f}s, {len({prompt for _, prompt in trace})} distinct prompts; "
+          f"upstream {args.latency_ms:.0f} ms, {args.tail_ratio:.0%} stragglers +{args.tail_ms:.0f} ms, "
+          f"{args.error_rate:.0%} errors")
+    print(f"{'variant':<8} {'upstream':>9} {'conns':>6} {'peak':>5} {'ok':>6} {'errors':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for variant in ("naive", "client"):
+        with FakeLLMServer(latency_ms=args.latency_ms, tail_ms=args.tail_ms, tail_ratio=args.tail_ratio,
+                           error_rate=args.error_rate) as server:
+            if variant == "naive":
+                result = replay(trace, naive_call(server.url))
+                extra = ""
+            else:
+                client = LLMClient(HttpTransport(server.url), rate=args.rate, burst=args.burst,
+                                   hedge_after=args.hedge_after, max_concurrency=256)
+                result = replay(trace, client.generate)
+                stats = client.get_stats()
+                client.close()
+                extra = f"  ({stats['coalesced']} coalesced, {stats['hedges']} hedges, {stats['retries']} retries)"
+            print(f"{variant:<8} {server.calls:>9} {server.connections:>6} {server.peak_concurrent:>5} "
+                  f"{result['ok']:>6} {result['errors']:>6} {result['p50']:>8.0f} {result['p99']:>8.0f} "
+                  f"{result['max']:>8.0f}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Overhead of the instrumentation layer.
+
+Times the chat and health endpoints through Flask's test client on an app
+with and without the request hooks, alternating rounds to cancel drift,
+and reports the cost of a single histogram observation and of one
+command-listener round trip. The target is under 2% on the chat endpoint.
+Run from the backend directory:
+
+    ACTIVITY_STORE=memory AUDIT_ENABLED=false python -m benchmarks.metrics --requests 5000
+"""
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+from flask import Flask
+
+from metrics import HTTP_LATENCY, MongoCommandMetrics, instrument_app
+from routes.chat import chat_bp
+from routes.health import health_bp
+
+
+def build_app(instrumented: bool) -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(chat_bp)
+    app.register_blueprint(health_bp)
+    if instrumented:
+        instrument_app(app)
+    return app
+
+
+def per_call_us(func: Callable[[], None], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def endpoint_overhead(path: str, requests: int, rounds: int) -> dict:
+    clients = {instrumented: build_app(instrumented).test_client() for instrumented in (False, True)}
+    payload = {"username": "bench", "input1": "pasta", "input2": "pizza"}
+
+    def call(client) -> Callable[[], None]:
+        if path == "/api/v1/chat":
+            return lambda: client.post(path, json=payload)
+        return lambda: client.get(path)
+
+    timings = {False: [], True: []}
+    for instrumented in (False, True):
+        per_call_us(call(clients[instrumented]), 200)  # warm up
+    for _ in range(rounds):
+        for instrumented in (False, True):
+            timings[instrumented].append(per_call_us(call(clients[instrumented]), requests // rounds))
+    plain, instrumented = statistics.median(timings[False]), statistics.median(timings[True])
+    return {"path": path, "plain_us": plain, "instrumented_us": instrumented,
+            "overhead": (instrumented - plain) / plain}
+
+
+def listener_us(calls: int) -> float:
+    listener = MongoCommandMetrics(slow_ms=float("inf"), explain=False)
+    started = SimpleNamespace(command_name="find", command={"find": "restaurants", "filter": {"restaurant_id": "1"}},
+                              connection_id=("localhost", 27017), request_id=1, database_name="bench")
+    succeeded = SimpleNamespace(command_name="find", connection_id=("localhost", 27017), request_id=1,
+                                duration_micros=800)
+
+    def round_trip() -> None:
+        listener.started(started)
+        listener.succeeded(succeeded)
+    return per_call_us(round_trip, calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<16} {'plain us':>9} {'instr. us':>10} {'overhead':>9}")
+    for path in ("/api/v1/chat", "/healthz"):
+        r = endpoint_overhead(path, args.requests, args.rounds)
+        print(f"{r['path']:<16} {r['plain_us']:>9.1f} {r['instrumented_us']:>10.1f} {r['overhead']:>9.2%}")
+    observe = per_call_us(lambda: HTTP_LATENCY.observe(0.003, blueprint="bench", endpoint="bench.x",
+                                                       method="GET", status=200), 100_000)
+    print(f"histogram observe: {observe:.2f} us, command listener round trip: {listener_us(100_000):.2f} us")
+
+
+if __name__ == "__main__":
+    main()
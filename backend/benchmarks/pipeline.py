@@ -0,0 +1,300 @@
+"""
+End-to-end benchmark of the review pipeline with offline stand-ins.
+
+Every operation runs the full path a chat message takes:
+
+    chat text -> parameter extraction (LLM) -> SQL generation (LLM)
+      -> sentiment -> MongoSQLParser.execute_query -> activity write/fetch
+
+The LLM is a deterministic fake with configurable latency, sentiment is a
+tiny random-projection model, and Mongo is mongomock unless --mongo-uri
+points at a real mongod. The app's parser and prompts are loaded from
+../app by file path. Per-stage throughput and p50/p95/p99 are written as
+JSON. With --baseline the run is also a regression gate: it fails (exit
+code 1) when a stage's p95 or the overall throughput regresses past
+--tolerance against that earlier result. Timings are only comparable on
+the same host, so results record the host (OS, machine, processor, CPU
+count, Python) and the check is skipped when the baseline was taken on a
+different one. Save the baseline on the machine that runs the gate.
+Run from the backend directory:
+
+    python -m benchmarks.pipeline --scenario 1k --ops 2000
+    python -m benchmarks.pipeline --scenario 1k --save-baseline /tmp/pipeline-1k-main.json
+    python -m benchmarks.pipeline --scenario 1k --baseline /tmp/pipeline-1k-main.json
+    python -m benchmarks.pipeline --scenario 1m --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from pymongo import ASCENDING
+
+from stores import SqliteActivityStore
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+APP_UTILS_DIR = BACKEND_DIR.parent / "app" / "utils"
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+SCENARIOS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+STAGES = ("extract", "sql", "sentiment", "execute", "activity_write", "activity_fetch", "total")
+DATABASE = "food-critic-reviews-bench"
+
+REVIEW_WORDS = ("fresh", "bland", "crispy", "soggy", "friendly", "rude", "cozy", "loud", "perfect", "cold",
+                "delicious", "overpriced", "generous", "tiny", "amazing", "awful", "pasta", "tacos", "service")
+
+
+def load_module(name: str, path: Path) -> Any:
+    """Import a module from a file path (the app is not an installed package)."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for the chat model.
+
+    Parameter extraction reads the fields back out of the synthetic chat
+    text, and SQL generation renders them in the dialect MongoSQLParser
+    accepts. Each call sleeps for `latency` seconds to model the network.
+    """
+
+    MESSAGE = re.compile(
+        r"^(?P<action>insert|modify|delete) (?P<name>Restaurant \d+): (?P<review>.*) \((?P<rating>[\d.]+) stars\)$"
+    )
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate(self, prompt: str, text: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if prompt.lstrip().startswith("You are an expert in the extracting"):
+            match = self.MESSAGE.match(text)
+            params = {"resturant_name": match["name"], "action": match["action"],
+                      "review": match["review"], "rating": float(match["rating"])}
+            return f"```json\n{json.dumps(params)}\n```"
+        params = json.loads(text)
+        name = params["resturant_name"]
+        if params["action"] == "insert":
+            restaurant_id = hashlib.blake2b(name.encode(), digest_size=6).hexdigest()
+            sql = f"INSERT INTO restaurants (name, restaurant_id, avg_rating) VALUES ('{name} II', '{restaurant_id}', {params['rating']})"
+        elif params["action"] == "delete":
+            sql = f"DELETE FROM restaurants WHERE name = '{name} II'"
+        else:
+            sql = f"UPDATE restaurants SET (avg_rating = {params['rating']}) WHERE name = '{name}'"
+        return f"```sql\n{sql}\n```"
+
+
+def fenced(response: str) -> str:
+    """Body of the first ``` fenced block of an LLM response."""
+    return response.split("```", 2)[1].split("\n", 1)[1].strip()
+
+
+class TinySentiment:
+    """Random projection of hashed tokens squashed to [-1, 1]; cheap and deterministic."""
+
+    def __init__(self, dimensions: int = 1024, seed: int = 0):
+        self.dimensions = dimensions
+        self.weights = np.random.default_rng(seed).normal(size=dimensions)
+
+    def predict(self, texts: List[str]) -> List[float]:
+        features = np.zeros((len(texts), self.dimensions))
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                features[row, int(hashlib.blake2b(token.encode(), digest_size=4).hexdigest(), 16) % self.dimensions] += 1
+        return np.tanh(features @ self.weights / 4).tolist()
+
+
+def seed_restaurants(collection: Any, count: int, batch_size: int = 10_000) -> None:
+    """Insert `count` synthetic restaurants, indexed on name like a real deployment."""
+    rng = np.random.default_rng(count)
+    collection.drop()
+    for start in range(0, count, batch_size):
+        ratings = rng.uniform(1, 5, min(batch_size, count - start))
+        collection.insert_many([
+            {
+                "restaurant_id": str(start + i),
+                "name": f"Restaurant {start + i}",
+                "address": {"building": str(start + i), "coord": [-86.5, 39.1], "street": "Kirkwood Avenue",
+                            "zipcode": f"474{(start + i) % 100:02d}"},
+                "avg_rating": float(rating),
+                "critic_reviews": []
+            }
+            for i, rating in enumerate(ratings)
+        ])
+    collection.create_index([("name", ASCENDING)])
+
+
+def workload(restaurants: int, ops: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Synthetic chat messages: mostly modifications, with inserts and deletes."""
+    rng = np.random.default_rng(seed)
+    messages = []
+    for _ in range(ops):
+        action = rng.choice(["modify", "insert", "delete"], p=[0.8, 0.1, 0.1])
+        review = " ".join(rng.choice(REVIEW_WORDS, size=8))
+        messages.append({
+            "username": f"critic-{rng.integers(200)}",
+            "text": f"{action} Restaurant {rng.integers(restaurants)}: {review} ({rng.integers(1, 6)}.0 stars)"
+        })
+    return messages
+
+
+def run(scenario: str, ops: int, llm_latency: float, mongo_uri: Optional[str]) -> Dict[str, Any]:
+    parsers = load_module("parsers", APP_UTILS_DIR / "parsers.py")
+    prompts = load_module("prompts", APP_UTILS_DIR / "prompts.py")
+    parser = parsers.MongoSQLParser(mongo_uri or "mongodb://localhost:27017", DATABASE)
+    if mongo_uri is None:
+        import mongomock
+
+        # MongoClient connects lazily, so swapping the handle before any query is enough
+        parser.client = mongomock.MongoClient()
+        parser.db = parser.client[DATABASE]
+
+    restaurants = SCENARIOS[scenario]
+    started = time.perf_counter()
+    seed_restaurants(parser.db["restaurants"], restaurants)
+    seed_s = time.perf_counter() - started
+
+    llm = FakeLLM(llm_latency)
+    sentiment = TinySentiment()
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def timed(stage: str, func: Callable[[], Any]) -> Any:
+        stage_started = time.perf_counter()
+        result = func()
+        timings[stage].append(time.perf_counter() - stage_started)
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqliteActivityStore(str(Path(directory) / "activity.sqlite3"))
+        run_started = time.perf_counter()
+        for message in workload(restaurants, ops):
+            op_started = time.perf_counter()
+            params = json.loads(fenced(timed("extract", lambda: llm.generate(prompts.fetch_parameters, message["text"]))))
+            sql = fenced(timed("sql", lambda: llm.generate(prompts.sql_query_generator, json.dumps(params))))
+            score = timed("sentiment", lambda: sentiment.predict([params["review"]])[0])
+            result = timed("execute", lambda: parser.execute_query(sql, actor=message["username"]))
+            timed("activity_write", lambda: store.append_activity(
+                message["username"], params["action"], {"sql": sql, "sentiment": score, "result": result}
+            ))
+            timed("activity_fetch", lambda: store.activities(message["username"], limit=20))
+            timings["total"].append(time.perf_counter() - op_started)
+        elapsed = time.perf_counter() - run_started
+        store.close()
+
+    return {
+        "scenario": scenario,
+        "restaurants": restaurants,
+        "ops": ops,
+        "llm_latency_ms": llm_latency * 1000,
+        "mongo": "mongod" if mongo_uri else "mongomock",
+        "seed_s": seed_s,
+        "throughput": ops / elapsed,
+        "stages": {
+            stage: {
+                "p50_ms": float(np.percentile(values, 50) * 1000),
+                "p95_ms": float(np.percentile(values, 95) * 1000),
+                "p99_ms": float(np.percentile(values, 99) * 1000),
+                "throughput": len(values) / sum(values) if sum(values) else 0.0
+            }
+            for stage, values in timings.items()
+        },
+        "environment": host()
+    }
+
+
+def host() -> Dict[str, Any]:
+    """What a baseline's timings depend on; results from different hosts are not compared."""
+    return {
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version()
+    }
+
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                min_delta_ms: float = 0.0) -> List[str]:
+    """
+    Stages whose p95 grew, or an overall throughput that fell, by more than `tolerance`.
+
+    A p95 must also grow by more than `min_delta_ms`, so the jitter of
+    stages that take microseconds does not count as a regression.
+    """
+    failures = []
+    for stage, stats in baseline["stages"].items():
+        current = result["stages"].get(stage)
+        if (current and current["p95_ms"] > stats["p95_ms"] * (1 + tolerance)
+                and current["p95_ms"] - stats["p95_ms"] > min_delta_ms):
+            failures.append(f"{stage} p95 {current['p95_ms']:.3f} ms > baseline {stats['p95_ms']:.3f} ms")
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        failures.append(f"throughput {result['throughput']:.1f}/s < baseline {baseline['throughput']:.1f}/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="1k")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--mongo-uri", help="Use this mongod instead of mongomock")
+    parser.add_argument("--output", help="Result JSON (default benchmarks/results/pipeline-<scenario>.json)")
+    parser.add_argument("--baseline", help="Fail on regressions against this earlier result JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Smallest p95 increase counted as a regression")
+    parser.add_argument("--save-baseline", help="Also write the result here, for later --baseline runs")
+    args = parser.parse_args()
+
+    result = run(args.scenario, args.ops, args.llm_latency_ms / 1000, args.mongo_uri)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"pipeline-{args.scenario}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(result, indent=2))
+
+    print(f"{result['restaurants']} restaurants on {result['mongo']}, seeded in {result['seed_s']:.1f}s, "
+          f"{result['throughput']:.1f} ops/s")
+    print(f"{'stage':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<16} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+              f"{stats['throughput']:>10.1f}")
+    print(f"results written to {output}")
+
+    if not args.baseline:
+        return
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        sys.exit(f"Baseline not found: {baseline_path}")
+    baseline = json.loads(baseline_path.read_text())
+    if (baseline["scenario"], baseline["mongo"]) != (result["scenario"], result["mongo"]):
+        sys.exit(f"Baseline {baseline_path} is for {baseline['scenario']} on {baseline['mongo']}, "
+                 f"not {result['scenario']} on {result['mongo']}")
+    if baseline.get("environment") != result["environment"]:
+        print(f"Baseline {baseline_path} was taken on another host ({baseline.get('environment')}), "
+              f"skipping the regression check")
+        return
+    failures = regressions(result, baseline, args.tolerance, args.min_delta_ms)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"no regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
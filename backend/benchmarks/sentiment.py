@@ -0,0 +1,85 @@
+"""
+fp32 versus dynamic int8 sentiment inference on CPU.
+
+Reports accuracy on a fixed labeled set, the largest score change relative
+to fp32, and latency/throughput for both modes. Run from the backend
+directory:
+
+    python -m benchmarks.sentiment --threads 4 --repeat 20
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+from sentiment import SentimentModel
+
+# (text, is_positive)
+LABELED_REVIEWS: List[Tuple[str, bool]] = [
+    ("Amazing farm-to-table experience! The seasonal menu was outstanding.", True),
+    ("Best brunch spot in Bloomington! Love their eggs benedict.", True),
+    ("The burgers were juicy and the fries perfectly crisp.", True),
+    ("Friendly staff and a cozy atmosphere, we will be back.", True),
+    ("Incredible pasta, easily the best I've had in years.", True),
+    ("The dessert menu is a delight and the coffee is excellent.", True),
+    ("Great value for money and generous portions.", True),
+    ("A hidden gem with wonderful vegetarian options.", True),
+    ("Service was quick and the tacos were bursting with flavor.", True),
+    ("Lovely patio, fresh ingredients and a thoughtful wine list.", True),
+    ("The soup was cold and the bread was stale.", False),
+    ("We waited an hour for our food and it arrived wrong.", False),
+    ("Overpriced, bland and the waiter was rude.", False),
+    ("The kitchen clearly does not care about cleanliness.", False),
+    ("My steak was overcooked and tough as leather.", False),
+    ("Terrible experience, I got sick after eating here.", False),
+    ("Tiny portions and the music was far too loud.", False),
+    ("The pizza was soggy and tasted like cardboard.", False),
+    ("Disappointing sushi, the fish did not taste fresh.", False),
+    ("Never coming back, the manager ignored our complaint.", False),
+]
+
+
+def evaluate(mode: str, threads: int, repeat: int, batch_size: int) -> dict:
+    model = SentimentModel(mode=mode, num_threads=threads)
+    start = time.perf_counter()
+    model.load()
+    load_s = time.perf_counter() - start
+
+    texts = [text for text, _ in LABELED_REVIEWS]
+    scores = model.predict(texts, batch_size=batch_size)
+    accuracy = sum((score > 0) == positive for score, (_, positive) in zip(scores, LABELED_REVIEWS)) / len(texts)
+
+    single = []
+    for text in texts:
+        start = time.perf_counter()
+        model.predict([text])
+        single.append((time.perf_counter() - start) * 1000)
+    single.sort()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(texts, batch_size=batch_size)
+    throughput = repeat * len(texts) / (time.perf_counter() - start)
+
+    return {"mode": mode, "load_s": load_s, "accuracy": accuracy, "scores": scores,
+            "p50_ms": single[len(single) // 2], "throughput": throughput}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    results = [evaluate(mode, args.threads, args.repeat, args.batch_size) for mode in ("fp32", "int8")]
+    fp32, int8 = results
+    print(f"{'mode':<6} {'load s':>7} {'accuracy':>9} {'p50 ms':>8} {'reviews/s':>10}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['load_s']:>7.2f} {r['accuracy']:>9.2%} {r['p50_ms']:>8.1f} {r['throughput']:>10.1f}")
+    delta = max(abs(a - b) for a, b in zip(fp32["scores"], int8["scores"]))
+    flips = sum((a > 0) != (b > 0) for a, b in zip(fp32["scores"], int8["scores"]))
+    print(f"accuracy delta {int8['accuracy'] - fp32['accuracy']:+.2%}, max score delta {delta:.4f}, label flips {flips}")
+
+
+if __name__ == "__main__":
+    main()
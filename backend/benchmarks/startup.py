@@ -0,0 +1,120 @@
+"""
+Cold-start time and per-worker memory of the Flask app.
+
+Measures, in fresh interpreters, how long `create_app()` takes with and
+without preloading the sentiment model. Then starts gunicorn with 4 workers
+that each hold the model, once loading it in every worker and once loading
+it in the master before forking, and reports per-worker RSS and PSS (PSS
+splits shared pages between the processes mapping them). Linux only. Run
+from the backend directory:
+
+    python -m benchmarks.startup --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+from main import create_app
+imported = time.perf_counter()
+create_app(preload_model={preload})
+ready = time.perf_counter()
+print(json.dumps({{"import_s": imported - started, "create_s": ready - imported,
+                   "torch_imported": "torch" in sys.modules}}))
+"""
+
+
+def cold_start(preload: bool) -> Dict:
+    """Time app import and creation in a fresh interpreter."""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START.format(preload=preload)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["total_s"] = time.perf_counter() - started
+    return result
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    memory = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        fields = line.split()
+        if fields[0] in ("Rss:", "Pss:"):
+            memory[fields[0][:-1].lower()] = int(fields[1])
+    return memory
+
+
+def _children(pid: int) -> List[int]:
+    return [int(child) for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+
+
+def _wait_ready(url: str, workers: int, timeout: float) -> None:
+    """Wait until `workers` consecutive readiness probes report a warm model."""
+    deadline = time.monotonic() + timeout
+    warm = 0
+    while warm < workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"workers not ready after {timeout}s")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                warm = warm + 1 if json.load(response)["model"] == "warm" else 0
+        except OSError:
+            warm = 0
+            time.sleep(0.5)
+
+
+def serve(workers: int, preload: bool, port: int, timeout: float) -> Dict:
+    """Start gunicorn, wait for every worker to be warm and sample memory."""
+    env = dict(os.environ, PRELOAD_MODEL="true", GUNICORN_PRELOAD=str(preload).lower(),
+               WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}/readyz", workers, timeout)
+        ready_s = time.perf_counter() - started
+        worker_memory = [_memory_kb(pid) for pid in _children(server.pid)]
+        return {"preload": preload, "ready_s": ready_s, "master": _memory_kb(server.pid), "workers": worker_memory}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'create_app':<22} {'import s':>9} {'create s':>9} {'total s':>8} {'torch':>6}")
+    for preload in (False, True):
+        r = cold_start(preload)
+        label = "preload_model=True" if preload else "preload_model=False"
+        print(f"{label:<22} {r['import_s']:>9.2f} {r['create_s']:>9.2f} {r['total_s']:>8.2f} "
+              f"{'yes' if r['torch_imported'] else 'no':>6}")
+
+    print()
+    print(f"{'gunicorn':<22} {'ready s':>8} {'worker RSS MB':>14} {'worker PSS MB':>14} {'total PSS MB':>13}")
+    for preload in (False, True):
+        r = serve(args.workers, preload, args.port, args.timeout)
+        rss = sum(w["rss"] for w in r["workers"]) / len(r["workers"]) / 1024
+        pss = sum(w["pss"] for w in r["workers"]) / len(r["workers"]) / 1024
+        total = (r["master"]["pss"] + sum(w["pss"] for w in r["workers"])) / 1024
+        label = "load in master" if preload else "load per worker"
+        print(f"{label:<22} {r['ready_s']:>8.1f} {rss:>14.1f} {pss:>14.1f} {total:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import importlib.util
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from pymongo.database import Database
+
+# Load environment variables
+load_dotenv()
+
+# Database Configuration
+CLUSTER_NAME = os.getenv('CLUSTER_NAME')
+DB_CONFIG = {
+    'username': os.getenv('DB_USERNAME'),
+    'password': os.getenv('DB_PASSWORD'),
+    'cluster_url': f'{CLUSTER_NAME}.z1l4e.mongodb.net',
+    'name': 'food-critic-reviews'
+}
+
+# MongoDB URI Construction for Atlas (MONGODB_URI overrides it, e.g. for a local mongod)
+MONGODB_URI = os.getenv('MONGODB_URI') or f"mongodb+srv://{DB_CONFIG['username']}:{DB_CONFIG['password']}@{DB_CONFIG['cluster_url']}/?retryWrites=true&w=majority&appName={CLUSTER_NAME}"
+
+# Collection Names
+COLLECTIONS = {
+    'RESTAURANTS': 'restaurants',
+    'AUDIT': 'audit',
+    'ACTIVITY_AUDIT': 'activity_audit',
+    'USERS': 'users',
+    'LEADERBOARDS': 'leaderboards',
+    'CRITIC_STATS': 'critic_stats',
+    'AUDIT_SNAPSHOTS': 'audit_snapshots',
+    'ACTIVITY': 'activity',
+    'ACTIVITY_VERSIONS': 'activity_versions',
+    'CHAT_HISTORY': 'chat_history'
+}
+
+# Leaderboard Configuration
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '10'))
+
+# Audit Configuration
+SNAPSHOT_EVERY = int(os.getenv('SNAPSHOT_EVERY', '100'))
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'true').lower() == 'true'
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.5'))
+AUDIT_JOURNAL_DIR = os.getenv('AUDIT_JOURNAL_DIR', '.audit-journal')
+AUDIT_STORAGE = os.getenv('AUDIT_STORAGE', 'full')  # 'full' or 'compact'
+AUDIT_COMPRESS_MIN_BYTES = int(os.getenv('AUDIT_COMPRESS_MIN_BYTES', '256'))
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR', '.audit-archive')
+AUDIT_COLD_AFTER_DAYS = int(os.getenv('AUDIT_COLD_AFTER_DAYS', '90'))
+
+# Sentiment Model Configuration
+SENTIMENT_MODE = os.getenv('SENTIMENT_MODE', 'fp32')  # 'fp32' or 'int8'
+SENTIMENT_THREADS = int(os.getenv('SENTIMENT_THREADS', '0'))  # 0 keeps torch's default
+SENTIMENT_CACHE_DIR = os.getenv('SENTIMENT_CACHE_DIR', '.model-cache')
+PRELOAD_MODEL = os.getenv('PRELOAD_MODEL', 'false').lower() == 'true'
+
+# Activity/Chat Store Configuration
+ACTIVITY_STORE = os.getenv('ACTIVITY_STORE', 'sqlite')  # 'sqlite', 'mongo' or 'memory'
+ACTIVITY_DB_PATH = os.getenv('ACTIVITY_DB_PATH', '.activity.sqlite3')
+ACTIVITY_BATCH_SIZE = int(os.getenv('ACTIVITY_BATCH_SIZE', '100'))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '0.2'))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))  # records per store query
+EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', '65536'))  # response chunk size before compression
+
+# Live Activity Stream Configuration
+ACTIVITY_STREAM_SOURCE = os.getenv('ACTIVITY_STREAM_SOURCE', 'auto')  # 'auto', 'change_stream' or 'local'
+ACTIVITY_STREAM_BUFFER = int(os.getenv('ACTIVITY_STREAM_BUFFER', '256'))  # events queued per viewer before resync
+ACTIVITY_STREAM_REPLAY = int(os.getenv('ACTIVITY_STREAM_REPLAY', '10000'))  # recent events kept for Last-Event-ID
+ACTIVITY_STREAM_HEARTBEAT = float(os.getenv('ACTIVITY_STREAM_HEARTBEAT', '15'))  # seconds between keep-alives
+ACTIVITY_STREAM_MAX_VIEWERS = int(os.getenv('ACTIVITY_STREAM_MAX_VIEWERS', '256'))  # per process, one thread each (gunicorn.conf.py)
+ACTIVITY_STREAM_ADMIN_TOKEN = os.getenv('ACTIVITY_STREAM_ADMIN_TOKEN', '')  # enables the all-users stream
+
+# LLM Configuration
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'simulated')  # 'simulated' (canned, bypasses the client), 'vertex' or 'http'
+PROJECT_ID = os.getenv('PROJECT_ID')
+LOCATION = os.getenv('LOCATION')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-1.5-flash-002')
+LLM_ENDPOINT = os.getenv('LLM_ENDPOINT', 'http://127.0.0.1:8081/v1/generate')  # for 'http', e.g. llm.py fake-server
+LLM_RATE = float(os.getenv('LLM_RATE', '10'))  # upstream calls per second, retries and hedges included
+LLM_BURST = int(os.getenv('LLM_BURST', '20'))
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '30'))  # seconds per request, including waits and retries
+LLM_HEDGE_AFTER = float(os.getenv('LLM_HEDGE_AFTER', '2'))  # seconds before a hedged second attempt, 0 disables
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))  # upstream calls in flight per process
+
+# Metrics Configuration
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_COMMAND_MS = float(os.getenv('SLOW_COMMAND_MS', '100'))
+SLOW_COMMAND_EXPLAIN = os.getenv('SLOW_COMMAND_EXPLAIN', 'true').lower() == 'true'
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')  # shared by a server's workers, see gunicorn.conf.py
+METRICS_SNAPSHOT_INTERVAL = float(os.getenv('METRICS_SNAPSHOT_INTERVAL', '5'))  # seconds between worker snapshots
+
+# Profiler Configuration (the endpoint is only registered when a token is set)
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))  # sampling runs off the request thread
+PROFILER_DIR = os.getenv('PROFILER_DIR', '.profiles')  # results, shared by the server's workers
+
+# Write Event Bridge Configuration (POST /api/v1/events is only registered when a token is set)
+EVENTS_TOKEN = os.getenv('EVENTS_TOKEN', '')  # shared with the app's EventForwarder
+
+# Bulk Review Ingestion Configuration
+BULK_QUEUE_SIZE = int(os.getenv('BULK_QUEUE_SIZE', '256'))  # items buffered between stages
+BULK_SENTIMENT_BATCH = int(os.getenv('BULK_SENTIMENT_BATCH', '32'))
+BULK_RESOLVE_BATCH = int(os.getenv('BULK_RESOLVE_BATCH', '200'))
+BULK_WRITE_BATCH = int(os.getenv('BULK_WRITE_BATCH', '500'))
+BULK_MAX_LINE_BYTES = int(os.getenv('BULK_MAX_LINE_BYTES', '65536'))
+
+# Near-duplicate Review Detection Configuration
+DEDUPE_MODE = os.getenv('DEDUPE_MODE', 'flag')  # 'off', 'flag' or 'reject' near-duplicates on bulk ingestion
+DEDUPE_THRESHOLD = float(os.getenv('DEDUPE_THRESHOLD', '0.8'))  # estimated Jaccard similarity of word 3-grams
+DEDUPE_NUM_PERM = int(os.getenv('DEDUPE_NUM_PERM', '64'))
+DEDUPE_BANDS = int(os.getenv('DEDUPE_BANDS', '16'))
+
+# Client-side validators compiled from db-setup's VALIDATION_SCHEMAS
+DB_SETUP_DIR = Path(__file__).resolve().parent.parent / 'db-setup'
+
+
+@lru_cache(maxsize=1)
+def get_db() -> Database:
+    """Return the shared database handle, connecting on first use."""
+    client = MongoClient(MONGODB_URI)
+    return client[DB_CONFIG['name']]
+
+
+def _load_db_setup_module(name: str):
+    spec = importlib.util.spec_from_file_location(f"db_setup_{name}", DB_SETUP_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@lru_cache(maxsize=1)
+def get_validators() -> Dict[str, Any]:
+    """Return collection name -> compiled validator (db-setup/validation.py), compiling on first use."""
+    return _load_db_setup_module('validation').compile_validators(
+        _load_db_setup_module('constants').VALIDATION_SCHEMAS
+    )
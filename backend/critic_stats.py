@@ -0,0 +1,224 @@
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from config import COLLECTIONS, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Running sums stored per critic; means are derived on read
+STAT_FIELDS = ("review_count", "rating_sum", "sentiment_sum", "sentiment_count", "harshness_sum")
+
+# Rebuild of `critic_stats` from every restaurant's `critic_reviews`; `backfill` stamps and merges the result
+BACKFILL_PIPELINE: List[Dict[str, Any]] = [
+    {"$project": {"avg_rating": 1, "critic_reviews": 1}},
+    {"$unwind": "$critic_reviews"},
+    {"$group": {
+        "_id": "$critic_reviews.name",
+        "review_count": {"$sum": 1},
+        "rating_sum": {"$sum": {"$toDouble": "$critic_reviews.rating"}},
+        # Reviews without a numeric sentiment_score (missing or null) are skipped, as in `_add`
+        "sentiment_sum": {"$sum": {
+            "$cond": [{"$isNumber": "$critic_reviews.sentiment_score"}, "$critic_reviews.sentiment_score", 0]
+        }},
+        "sentiment_count": {"$sum": {"$cond": [{"$isNumber": "$critic_reviews.sentiment_score"}, 1, 0]}},
+        "harshness_sum": {"$sum": {
+            "$subtract": [{"$toDouble": "$critic_reviews.rating"}, {"$ifNull": ["$avg_rating", 0]}]
+        }}
+    }}
+]
+
+ReviewKey = Tuple[str, str, float, Optional[float]]
+
+
+def _review_key(review: Dict[str, Any]) -> ReviewKey:
+    sentiment = review.get("sentiment_score")
+    return (
+        str(review.get("name", "")),
+        str(review.get("review", "")),
+        float(review.get("rating") or 0.0),
+        None if sentiment is None else float(sentiment)
+    )
+
+
+def _reviews(doc: Optional[Dict[str, Any]]) -> Counter:
+    if not doc:
+        return Counter()
+    return Counter(_review_key(review) for review in doc.get("critic_reviews") or [])
+
+
+def _avg_rating(doc: Optional[Dict[str, Any]]) -> float:
+    return float((doc or {}).get("avg_rating") or 0.0)
+
+
+def _add(deltas: Dict[str, Dict[str, float]], review: ReviewKey, avg_rating: float, count: int) -> None:
+    name, _, rating, sentiment = review
+    stats = deltas.setdefault(name, dict.fromkeys(STAT_FIELDS, 0))
+    stats["review_count"] += count
+    stats["rating_sum"] += count * rating
+    stats["harshness_sum"] += count * (rating - avg_rating)
+    if sentiment is not None:
+        stats["sentiment_sum"] += count * sentiment
+        stats["sentiment_count"] += count
+
+
+def review_deltas(event: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Compute per-critic stat increments for one write event.
+
+    Reviews are diffed between the before and after image of each restaurant,
+    so inserts, edits and deletes of individual reviews all net out.
+
+    Harshness is always measured against the restaurant's current average, as
+    the backfill does: removed reviews leave at the old average, added ones
+    arrive at the new one, and when the average moves every critic with a
+    review left on the restaurant is re-based by the change.
+
+    Args:
+        event: Write event (see `events.py`)
+
+    Returns:
+        Mapping of critic name to stat increments, without all-zero entries
+    """
+    before = {doc.get("_id"): doc for doc in event.get("before", [])}
+    after = {doc.get("_id"): doc for doc in event.get("after", [])}
+    deltas: Dict[str, Dict[str, float]] = {}
+
+    for doc_id in before.keys() | after.keys():
+        old_doc, new_doc = before.get(doc_id), after.get(doc_id)
+        old_reviews, new_reviews = _reviews(old_doc), _reviews(new_doc)
+        old_avg, new_avg = _avg_rating(old_doc), _avg_rating(new_doc)
+        for review, count in (old_reviews - new_reviews).items():
+            _add(deltas, review, old_avg, -count)
+        for review, count in (new_reviews - old_reviews).items():
+            _add(deltas, review, new_avg, count)
+        if new_avg != old_avg:
+            for review, count in (old_reviews & new_reviews).items():
+                stats = deltas.setdefault(review[0], dict.fromkeys(STAT_FIELDS, 0))
+                stats["harshness_sum"] -= count * (new_avg - old_avg)
+
+    return {name: stats for name, stats in deltas.items() if any(stats.values())}
+
+
+def critic_profile(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Turn a `critic_stats` document into a profile with derived means.
+
+    Args:
+        doc: Document from the `critic_stats` collection
+
+    Returns:
+        Profile dict, or None if the critic has no stats
+    """
+    if not doc or not doc.get("review_count"):
+        return None
+    review_count = doc["review_count"]
+    sentiment_count = doc.get("sentiment_count") or 0
+    return {
+        "name": doc["_id"],
+        "review_count": int(review_count),
+        "mean_rating": doc.get("rating_sum", 0.0) / review_count,
+        "mean_sentiment": doc.get("sentiment_sum", 0.0) / sentiment_count if sentiment_count else None,
+        "harshness": doc.get("harshness_sum", 0.0) / review_count,
+        "updated_at": doc.get("updated_at")
+    }
+
+
+class CriticStatsService:
+    """Maintains the `critic_stats` rollup from the review write path."""
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def on_write(self, event: Dict[str, Any]) -> None:
+        """
+        Write listener applying the event's review changes as `$inc` upserts.
+
+        Args:
+            event: Write event (see `events.py`)
+        """
+        if event.get("collection") != COLLECTIONS['RESTAURANTS']:
+            return
+        deltas = review_deltas(event)
+        if not deltas:
+            return
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"_id": name},
+                {"$inc": stats, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for name, stats in deltas.items()
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    def get_profile(self, name: str) -> Optional[Dict[str, Any]]:
+        """Read a critic's profile with a single `_id` lookup."""
+        return critic_profile(self.collection.find_one({"_id": name}))
+
+
+def backfill(db: Database) -> int:
+    """
+    Rebuild `critic_stats` from scratch with a single aggregation.
+
+    The collection stays readable throughout: each critic's document is
+    replaced in place by `$merge`, and only critics the rebuild did not
+    write (no reviews left) are removed afterwards. Listener `$inc`s that
+    land after the rebuild started stamp a later `updated_at` and are kept;
+    one landing between the aggregation's read and its merge of that critic
+    is overwritten by the rebuilt totals, which already include the review
+    unless it was written after the read.
+
+    Args:
+        db: Database holding the `restaurants` collection
+
+    Returns:
+        Number of critics written
+    """
+    started = datetime.now(timezone.utc)
+    pipeline = BACKFILL_PIPELINE + [
+        {"$set": {"updated_at": started}},
+        {"$merge": {"into": COLLECTIONS['CRITIC_STATS'], "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    db[COLLECTIONS['RESTAURANTS']].aggregate(pipeline, allowDiskUse=True)
+    stats = db[COLLECTIONS['CRITIC_STATS']]
+    stats.delete_many({"$or": [{"updated_at": {"$lt": started}}, {"updated_at": {"$exists": False}}]})
+    return stats.count_documents({"updated_at": started})
+
+
+_service: Optional[CriticStatsService] = None
+
+
+def get_critic_stats_service() -> CriticStatsService:
+    """Return the process-wide critic stats service."""
+    global _service
+    if _service is None:
+        _service = CriticStatsService(get_db()[COLLECTIONS['CRITIC_STATS']])
+    return _service
+
+
+def critic_stats_listener(event: Dict[str, Any]) -> None:
+    """Forward write events to the critic stats service."""
+    get_critic_stats_service().on_write(event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the critic_stats rollup collection")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        count = backfill(get_db())
+        print(f"Backfilled stats for {count} critics")
+
+
+if __name__ == "__main__":
+    main()
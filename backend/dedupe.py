@@ -0,0 +1,542 @@
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from config import COLLECTIONS, DEDUPE_THRESHOLD, DEDUPE_NUM_PERM, DEDUPE_BANDS, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Only review text and its owner are needed from `restaurants`
+DEDUPE_PROJECTION = {
+    "restaurant_id": 1,
+    "critic_reviews.name": 1,
+    "critic_reviews.review": 1
+}
+
+# Reviews are compared as sets of overlapping word 3-grams
+SHINGLE_SIZE = 3
+TOKEN = re.compile(r"[a-z0-9']+")
+MASK32 = np.uint64(0xFFFFFFFF)
+# MinHash permutations are (a * x + b) mod p over 32-bit shingle hashes;
+# with a < 2**31 the product stays below 2**63
+PRIME = np.uint64((1 << 31) - 1)
+# Rows scanned linearly between merges into the sorted band index
+MIN_PENDING = 4096
+# A band bucket this large is a degenerate text (e.g. "great food"); sample it
+MAX_BUCKET = 1000
+
+ReviewKey = Tuple[str, str, str]
+
+# Everything `_reset` builds, swapped in whole when a background load finishes
+INDEX_STATE = ("size", "signatures", "keys", "restaurant", "critic", "text_hash", "valid", "restaurant_ids",
+               "restaurant_index", "critics", "critic_index", "rows_by_review", "indexed", "sorted_keys",
+               "sorted_rows", "dead_rows")
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """
+    Distinct 32-bit hashes of a review's word 3-grams.
+
+    Text is lowercased and stripped of punctuation first, so case and
+    punctuation edits do not hide a copy. Reviews shorter than three words
+    are a single shingle.
+    """
+    tokens = TOKEN.findall((text or "").lower())
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    words = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+    size = min(SHINGLE_SIZE, len(words))
+    count = len(words) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = (hashes * np.uint64(1000003) + words[offset:offset + count]) & MASK32
+    return np.unique(hashes)
+
+
+def text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b((text or "").encode(), digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    """`num_perm` MinHash values per shingle set, computed for many texts at once."""
+
+    def __init__(self, num_perm: int = DEDUPE_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(PRIME), num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, int(PRIME), num_perm, dtype=np.uint64)[:, None]
+
+    def signatures(self, shingles: List[np.ndarray], chunk: int = 1 << 16) -> np.ndarray:
+        """
+        Signatures of several shingle sets, which must all be non-empty.
+
+        Returns:
+            uint32 array of shape (len(shingles), num_perm)
+        """
+        result = np.zeros((len(shingles), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(shingles):
+            # Group texts so one (num_perm, shingles) matrix stays around `chunk` columns
+            end, columns = start, 0
+            while end < len(shingles) and (end == start or columns + len(shingles[end]) <= chunk):
+                columns += len(shingles[end])
+                end += 1
+            values = np.concatenate(shingles[start:end])
+            offsets = np.cumsum([0] + [len(s) for s in shingles[start:end - 1]])
+            permuted = (self.a * values[None, :] + self.b) % PRIME
+            result[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return result
+
+
+class DedupeIndex:
+    """
+    MinHash/LSH index of review text for near-duplicate lookups.
+
+    Each signature is cut into `bands` bands; two reviews become candidates
+    when any band matches, and are reported when their estimated Jaccard
+    similarity reaches `threshold`. Band keys live in one sorted array per
+    band (binary search), plus a small pending tail of recent rows that is
+    scanned linearly and merged in once it grows, so inserts stay cheap.
+    Removed rows are masked out and reclaimed by `compact`, which runs in the
+    background once a quarter of the rows are dead.
+    """
+
+    def __init__(self, threshold: float = DEDUPE_THRESHOLD, num_perm: int = DEDUPE_NUM_PERM,
+                 bands: int = DEDUPE_BANDS, capacity: int = 1024):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.loaded = False
+        self.loading = False
+        # Write events received while a load is scanning, applied once it is swapped in
+        self._buffered: List[Dict[str, Any]] = []
+        self._compacting = False
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def _reset(self, capacity: int) -> None:
+        num_perm = self.hasher.num_perm
+        self.size = 0
+        self.signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        self.keys = np.zeros((capacity, self.bands), dtype=np.uint32)
+        self.restaurant = np.zeros(capacity, dtype=np.int32)
+        self.critic = np.zeros(capacity, dtype=np.int32)
+        self.text_hash = np.zeros(capacity, dtype=np.uint64)
+        self.valid = np.zeros(capacity, dtype=np.bool_)
+        self.restaurant_ids: List[str] = []
+        self.restaurant_index: Dict[str, int] = {}
+        self.critics: List[str] = []
+        self.critic_index: Dict[str, int] = {}
+        # (restaurant, critic, text hash) -> live rows holding that review, for `remove`
+        self.rows_by_review: Dict[Tuple[int, int, int], List[int]] = {}
+        # Rows [0, indexed) are in the sorted band arrays, [indexed, size) are pending
+        self.indexed = 0
+        self.sorted_keys: List[np.ndarray] = [np.zeros(0, dtype=np.uint32) for _ in range(self.bands)]
+        self.sorted_rows: List[np.ndarray] = [np.zeros(0, dtype=np.int32) for _ in range(self.bands)]
+        self.dead_rows = 0
+
+    def __len__(self) -> int:
+        return self.size - self.dead_rows
+
+    def _intern(self, values: List[str], index: Dict[str, int], value: str) -> int:
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(values)
+            values.append(value)
+        return position
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for row in range(self.rows_per_band):
+            keys = (keys * np.uint64(1000003) + bands[:, :, row]) & MASK32
+        return keys.astype(np.uint32)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        capacity = len(self.valid)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("signatures", "keys", "restaurant", "critic", "text_hash", "valid"):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _append(self, reviews: List[ReviewKey], signatures: np.ndarray, merge: bool = True) -> None:
+        self._reserve(len(reviews))
+        rows = slice(self.size, self.size + len(reviews))
+        self.signatures[rows] = signatures
+        self.keys[rows] = self._band_keys(signatures)
+        self.restaurant[rows] = [self._intern(self.restaurant_ids, self.restaurant_index, r) for r, _, _ in reviews]
+        self.critic[rows] = [self._intern(self.critics, self.critic_index, c) for _, c, _ in reviews]
+        self.text_hash[rows] = [text_hash(text) for _, _, text in reviews]
+        self.valid[rows] = True
+        for row in range(rows.start, rows.stop):
+            key = (int(self.restaurant[row]), int(self.critic[row]), int(self.text_hash[row]))
+            self.rows_by_review.setdefault(key, []).append(row)
+        self.size += len(reviews)
+        if merge and self.size - self.indexed > max(MIN_PENDING, self.indexed // 64):
+            self._merge()
+
+    def _merge(self) -> None:
+        """Merge pending rows into the sorted band arrays (one linear pass per band)"""
+        rows = np.arange(self.indexed, self.size, dtype=np.int32)
+        for band in range(self.bands):
+            keys = self.keys[self.indexed:self.size, band]
+            order = np.argsort(keys, kind="stable")
+            positions = np.searchsorted(self.sorted_keys[band], keys[order], side="right")
+            self.sorted_keys[band] = np.insert(self.sorted_keys[band], positions, keys[order])
+            self.sorted_rows[band] = np.insert(self.sorted_rows[band], positions, rows[order])
+        self.indexed = self.size
+
+    def _rebuild(self) -> None:
+        keys = self.keys[:self.size]
+        self.sorted_rows = [np.argsort(keys[:, band], kind="stable").astype(np.int32) for band in range(self.bands)]
+        self.sorted_keys = [keys[rows, band] for band, rows in enumerate(self.sorted_rows)]
+        self.indexed = self.size
+
+    def _matches(self, signature: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        keys = self._band_keys(signature[None, :])[0]
+        candidates = []
+        for band in range(self.bands):
+            sorted_keys = self.sorted_keys[band]
+            low = np.searchsorted(sorted_keys, keys[band], side="left")
+            high = np.searchsorted(sorted_keys, keys[band], side="right")
+            if high > low:
+                candidates.append(self.sorted_rows[band][low:min(high, low + MAX_BUCKET)])
+        if self.size > self.indexed:
+            pending = (self.keys[self.indexed:self.size] == keys).any(axis=1)
+            candidates.append(np.flatnonzero(pending).astype(np.int32) + self.indexed)
+        if not candidates:
+            return []
+        rows = np.unique(np.concatenate(candidates))
+        rows = rows[self.valid[rows]]
+        similarity = (self.signatures[rows] == signature).mean(axis=1)
+        hits = np.flatnonzero(similarity >= self.threshold)
+        hits = hits[np.argsort(-similarity[hits], kind="stable")][:limit]
+        return [(int(rows[i]), float(similarity[i])) for i in hits]
+
+    def find_duplicates(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Indexed reviews whose text is a near-duplicate of `text`.
+
+        Args:
+            text: Review text
+            limit: Most similar matches to return
+
+        Returns:
+            [{"restaurant_id", "critic", "similarity"}], most similar first
+        """
+        shingles = shingle_hashes(text)
+        if not len(shingles):
+            return []
+        signature = self.hasher.signatures([shingles])[0]
+        with self._lock:
+            return [
+                {
+                    "restaurant_id": self.restaurant_ids[self.restaurant[row]],
+                    "critic": self.critics[self.critic[row]],
+                    "similarity": similarity
+                }
+                for row, similarity in self._matches(signature, limit)
+            ]
+
+    def add_many(self, reviews: List[ReviewKey]) -> int:
+        """
+        Index reviews.
+
+        Args:
+            reviews: (restaurant_id, critic name, text) triples
+
+        Returns:
+            Number indexed (reviews without words are skipped)
+        """
+        shingles = [shingle_hashes(text) for _, _, text in reviews]
+        kept = [i for i, s in enumerate(shingles) if len(s)]
+        if not kept:
+            return 0
+        signatures = self.hasher.signatures([shingles[i] for i in kept])
+        with self._lock:
+            self._append([reviews[i] for i in kept], signatures)
+        return len(kept)
+
+    def remove(self, review: ReviewKey) -> bool:
+        """Unindex one copy of a review, returning whether it was found"""
+        restaurant_id, critic, text = review
+        with self._lock:
+            key = (self.restaurant_index.get(restaurant_id), self.critic_index.get(critic), text_hash(text))
+            rows = self.rows_by_review.get(key)
+            if not rows:
+                return False
+            self.valid[rows.pop()] = False
+            if not rows:
+                del self.rows_by_review[key]
+            self.dead_rows += 1
+            if self.dead_rows > self.size // 4 and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self.compact, name="dedupe-compact", daemon=True).start()
+            return True
+
+    def compact(self) -> None:
+        """Drop removed rows and rebuild the band arrays"""
+        with self._lock:
+            live = np.flatnonzero(self.valid[:self.size])
+            renumber = np.zeros(self.size, dtype=np.int64)
+            renumber[live] = np.arange(len(live))
+            for name in ("signatures", "keys", "restaurant", "critic", "text_hash", "valid"):
+                column = getattr(self, name)
+                column[:len(live)] = column[live]
+            self.valid[len(live):self.size] = False
+            self.rows_by_review = {key: [int(renumber[row]) for row in rows]
+                                   for key, rows in self.rows_by_review.items()}
+            self.size, self.dead_rows = len(live), 0
+            self._rebuild()
+            self._compacting = False
+
+    def load(self, restaurants: Collection, batch_size: int = 20_000) -> int:
+        """
+        Index every review in the collection.
+
+        The scan fills a separate index, so lookups keep answering from the
+        current one meanwhile. Write events that arrive during the scan are
+        buffered and applied after the swap; one the scan already saw can
+        leave a redundant row, which finds the same duplicates.
+
+        Args:
+            restaurants: The `restaurants` collection
+            batch_size: Reviews hashed per vectorized batch
+
+        Returns:
+            Number of reviews indexed
+        """
+        with self._lock:
+            self.loading = True
+        try:
+            fresh = DedupeIndex(self.threshold, self.hasher.num_perm, self.bands)
+            batch: List[ReviewKey] = []
+            for review in iter_reviews(restaurants):
+                batch.append(review[:3])
+                if len(batch) >= batch_size:
+                    fresh._load_batch(batch)
+                    batch = []
+            fresh._load_batch(batch)
+            fresh._rebuild()
+        except Exception:
+            with self._lock:
+                self.loading = False
+                self._buffered.clear()
+            raise
+        with self._lock:
+            for name in INDEX_STATE:
+                setattr(self, name, getattr(fresh, name))
+            self.loaded, self.loading = True, False
+            buffered, self._buffered = self._buffered, []
+            for event in buffered:
+                self.on_write(event)
+            return len(self)
+
+    def load_in_background(self, restaurants: Collection) -> None:
+        """Start `load` on a daemon thread; `loading` is set before this returns"""
+        def run() -> None:
+            try:
+                count = self.load(restaurants)
+                logger.info(f"Indexed {count} reviews for near-duplicate detection")
+            except Exception as e:
+                logger.error(f"Error loading the near-duplicate index: {str(e)}")
+
+        with self._lock:
+            self.loading = True
+        threading.Thread(target=run, name="dedupe-load", daemon=True).start()
+
+    def _load_batch(self, reviews: List[ReviewKey]) -> None:
+        # No merges while loading; the band arrays are built once at the end
+        shingles = [shingle_hashes(text) for _, _, text in reviews]
+        kept = [i for i, s in enumerate(shingles) if len(s)]
+        if kept:
+            self._append([reviews[i] for i in kept], self.hasher.signatures([shingles[i] for i in kept]),
+                         merge=False)
+
+    def on_write(self, event: Dict[str, Any]) -> None:
+        """
+        Write listener keeping the index in step with review changes.
+
+        Reviews are diffed between the before and after image of each
+        restaurant, as for the critic stats. Events arriving while a load is
+        running are held until it finishes; before any load they are dropped,
+        since the first load reads the already-written state.
+
+        Args:
+            event: Write event (see `events.py`)
+        """
+        if event.get("collection") != COLLECTIONS['RESTAURANTS']:
+            return
+        with self._lock:
+            if not self.loaded:
+                if self.loading:
+                    self._buffered.append(event)
+                return
+        old, new = Counter(), Counter()
+        for counter, docs in ((old, event.get("before", [])), (new, event.get("after", []))):
+            for doc in docs:
+                for review in doc.get("critic_reviews") or []:
+                    counter[(str(doc.get("restaurant_id")), review.get("name") or "", review.get("review") or "")] += 1
+        for review, count in (old - new).items():
+            for _ in range(count):
+                self.remove(review)
+        self.add_many(list((new - old).elements()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reviews": len(self),
+            "pending": self.size - self.indexed,
+            "dead_rows": self.dead_rows,
+            "bytes": sum(getattr(self, name).nbytes for name in
+                         ("signatures", "keys", "restaurant", "critic", "text_hash", "valid"))
+                     + sum(keys.nbytes + rows.nbytes for keys, rows in zip(self.sorted_keys, self.sorted_rows))
+        }
+
+
+def iter_reviews(restaurants: Collection) -> Iterator[Tuple[Any, str, str, str, int]]:
+    """(restaurant _id, restaurant_id, critic, text, position in critic_reviews) for every review, in _id order"""
+    for doc in restaurants.find({}, DEDUPE_PROJECTION).sort("_id", 1):
+        for position, review in enumerate(doc.get("critic_reviews") or []):
+            yield (str(doc.get("restaurant_id")), review.get("name") or "", review.get("review") or "",
+                   doc["_id"], position)
+
+
+def batch_dedupe(restaurants: Collection, threshold: float = DEDUPE_THRESHOLD, report: Optional[str] = None,
+                 flag: bool = False, batch_size: int = 5_000) -> Dict[str, Any]:
+    """
+    Find near-duplicates across the existing corpus in one pass.
+
+    Reviews are visited in restaurant `_id` order; each is checked against
+    the reviews before it and indexed only if it is not itself a duplicate,
+    so every duplicate points at the first copy seen.
+
+    Args:
+        restaurants: The `restaurants` collection
+        threshold: Minimum estimated Jaccard similarity
+        report: JSONL file listing each duplicate and what it duplicates
+        flag: Set `duplicate_of` on each duplicate review in place
+        batch_size: Reviews hashed per vectorized batch and flag updates per bulk_write
+
+    Returns:
+        Summary with reviews scanned, duplicates found and elapsed seconds
+    """
+    index = DedupeIndex(threshold)
+    started = time.perf_counter()
+    scanned, duplicates, operations = 0, 0, []
+    output = open(report, "w") if report else None
+
+    def process(batch: List[Tuple]) -> None:
+        nonlocal scanned, duplicates
+        shingles = [shingle_hashes(review[2]) for review in batch]
+        kept = [i for i, s in enumerate(shingles) if len(s)]
+        signatures = index.hasher.signatures([shingles[i] for i in kept]) if kept else []
+        for i, signature in zip(kept, signatures):
+            restaurant_id, critic, text, doc_id, position = batch[i]
+            matches = index._matches(signature, 1)
+            if matches:
+                row, similarity = matches[0]
+                original = {"restaurant_id": index.restaurant_ids[index.restaurant[row]],
+                            "critic": index.critics[index.critic[row]], "similarity": similarity}
+                duplicates += 1
+                if output:
+                    output.write(json.dumps({"restaurant_id": restaurant_id, "critic": critic, "review": text,
+                                             "duplicate_of": original}) + "\n")
+                if flag:
+                    prefix = f"critic_reviews.{position}"
+                    # Guarded by name and text, in case the array shifted since it was read
+                    operations.append(UpdateOne({"_id": doc_id, f"{prefix}.name": critic, f"{prefix}.review": text},
+                                                {"$set": {f"{prefix}.duplicate_of": original,
+                                                          "updated_at": datetime.now(timezone.utc)}}))
+            else:
+                index._append([(restaurant_id, critic, text)], signature[None, :])
+        scanned += len(batch)
+
+    batch = []
+    try:
+        for review in iter_reviews(restaurants):
+            batch.append(review)
+            if len(batch) >= batch_size:
+                process(batch)
+                batch = []
+                if operations:
+                    restaurants.bulk_write(operations, ordered=False)
+                    operations.clear()
+                logger.info(f"Scanned {scanned} reviews, {duplicates} near-duplicates")
+        process(batch)
+        if operations:
+            restaurants.bulk_write(operations, ordered=False)
+    finally:
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    return {"reviews": scanned, "duplicates": duplicates, "elapsed_s": elapsed}
+
+
+_index: Optional[DedupeIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedupe_index() -> DedupeIndex:
+    """
+    Return the process-wide near-duplicate index, starting its load on first use.
+
+    The load runs in the background, so the first caller is not held up by
+    a full collection scan; until it finishes the index is empty and finds
+    no duplicates. A failed load is retried by the next caller.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DedupeIndex()
+        if not _index.loaded and not _index.loading:
+            _index.load_in_background(get_db()[COLLECTIONS['RESTAURANTS']])
+        return _index
+
+
+def dedupe_listener(event: Dict[str, Any]) -> None:
+    """Forward write events to the near-duplicate index once it has been loaded."""
+    if _index is not None:
+        _index.on_write(event)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Find near-duplicate critic reviews")
+    parser.add_argument("command", choices=["batch"])
+    parser.add_argument("--threshold", type=float, default=DEDUPE_THRESHOLD)
+    parser.add_argument("--report", default="dedupe-report.jsonl", help="JSONL list of duplicates")
+    parser.add_argument("--flag", action="store_true", help="Set duplicate_of on duplicate reviews")
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        result = batch_dedupe(get_db()[COLLECTIONS['RESTAURANTS']], args.threshold, args.report, args.flag)
+        print(f"Scanned {result['reviews']} reviews in {result['elapsed_s']:.1f}s, "
+              f"{result['duplicates']} near-duplicates (report: {args.report})")
+
+
+if __name__ == "__main__":
+    main()
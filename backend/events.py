@@ -0,0 +1,54 @@
+import logging
+from typing import Any, Callable, Dict, List
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A write event is a plain dict:
+# {
+#     "collection": str,
+#     "operation": "insert" | "update" | "delete",
+#     "filter": Dict,
+#     "changes": Dict,
+#     "before": List[Dict],   # affected documents before the write
+#     "after": List[Dict],    # affected documents after the write
+#     "actor": str,           # who issued the write
+#     "timestamp": datetime
+# }
+WriteListener = Callable[[Dict[str, Any]], None]
+
+_listeners: List[WriteListener] = []
+
+
+def subscribe(listener: WriteListener) -> None:
+    """
+    Register a listener for write events.
+
+    Args:
+        listener: Callable invoked with every published write event
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def unsubscribe(listener: WriteListener) -> None:
+    """Remove a previously registered listener."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def publish(event: Dict[str, Any]) -> None:
+    """
+    Fan a write event out to every listener.
+
+    A failing listener is logged and does not stop the others, so one broken
+    derived view never blocks the write path.
+
+    Args:
+        event: Write event produced by a mutation path
+    """
+    for listener in list(_listeners):
+        try:
+            listener(event)
+        except Exception as e:
+            logger.error(f"Error in write listener {listener!r}: {str(e)}")
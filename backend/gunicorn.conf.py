@@ -0,0 +1,68 @@
+import gc
+import glob
+import os
+
+# Workers share their metrics through this directory, so /metrics reports the
+# whole server whichever worker answers the scrape (see metrics.WorkerSnapshots).
+# Set before config is imported, which reads it.
+os.environ.setdefault("METRICS_MULTIPROC_DIR", ".gunicorn-metrics")
+
+from config import ACTIVITY_STREAM_MAX_VIEWERS
+
+bind = os.getenv("BIND", "127.0.0.1:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+
+# Threaded workers: a live activity viewer (GET .../stream, SSE) holds a
+# thread for as long as it is connected, which would take a whole sync
+# worker away from the API. Each worker gets a thread per allowed viewer
+# (ACTIVITY_STREAM_MAX_VIEWERS, per process) plus GUNICORN_API_THREADS for
+# requests, so a full house of viewers never starves the API. The server's
+# viewer ceiling is workers x ACTIVITY_STREAM_MAX_VIEWERS: 4 x 256 = 1024
+# with the defaults; beyond it viewers get a 503 and poll. The Streamlit app
+# holds one stream per app process whatever its number of users (see
+# app/utils/activity_feed.py). gthread workers heartbeat from their main
+# thread, so `timeout` only kills a worker that is stuck, not a long-lived
+# stream.
+worker_class = "gthread"
+api_threads = int(os.getenv("GUNICORN_API_THREADS", "16"))
+threads = int(os.getenv("GUNICORN_THREADS", str(ACTIVITY_STREAM_MAX_VIEWERS + api_threads)))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+# With ACTIVITY_STREAM_SOURCE=local (or no change streams, see hub.py), each
+# worker only publishes the activity it logged itself, so a viewer sees the
+# writes served by its own worker. Use the Mongo activity store with change
+# streams for complete live feeds across workers.
+
+# Import the app (and, with PRELOAD_MODEL=true, the sentiment model) once in
+# the master so forked workers share the weights copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def on_starting(server):
+    # Counts from a previous run of the server must not add to this one's
+    for path in glob.glob(os.path.join(os.environ["METRICS_MULTIPROC_DIR"], "worker-*.json*")):
+        os.remove(path)
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach, so
+    # refcount/GC traversal in workers doesn't dirty the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from config import METRICS_ENABLED
+
+    if METRICS_ENABLED:
+        from metrics import start_worker_snapshots
+
+        start_worker_snapshots()
+
+    threads = os.getenv("SENTIMENT_THREADS")
+    if threads:
+        import sys
+
+        # Only touch torch if the master already imported it
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(int(threads))
@@ -0,0 +1,213 @@
+import argparse
+import copy
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+
+from audit_store import AuditStore, decode_value, is_delta
+from config import COLLECTIONS, SNAPSHOT_EVERY, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Audit keys that map onto a differently named restaurant field
+KEY_TO_FIELD = {
+    "user_reviews": "critic_reviews"
+}
+
+
+def to_audit_time(value: Any) -> datetime:
+    """
+    Normalize a datetime or ISO string to the stored `time_of_action` type.
+
+    Args:
+        value: datetime or ISO-8601 string
+
+    Returns:
+        UTC datetime comparable with `time_of_action`
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def apply_event(state: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a single audit event to a restaurant state in place.
+
+    Reviews are list-valued: inserts append, updates replace and deletes
+    remove the critic's review. Every other key is set or removed.
+    Delta-encoded values are resolved against the current state.
+
+    Args:
+        state: Restaurant state being rebuilt
+        event: Audit document
+
+    Returns:
+        The updated state
+    """
+    key, action = event["key"], event["action"]
+    field = KEY_TO_FIELD.get(key, key)
+
+    if field == "critic_reviews":
+        reviews = state.setdefault("critic_reviews", [])
+        if is_delta(event):
+            # Review deltas always carry the critic's name
+            critic = decode_value(event, {})["name"]
+            previous = next((review for review in reviews if review.get("name") == critic), {})
+            value = decode_value(event, previous)
+        else:
+            value = decode_value(event)
+            critic = value.get("name") if isinstance(value, dict) else value
+        if action != "insert":
+            reviews[:] = [review for review in reviews if review.get("name") != critic]
+        if action != "delete":
+            reviews.append(copy.deepcopy(value))
+    elif action == "delete":
+        state.pop(field, None)
+    else:
+        state[field] = copy.deepcopy(decode_value(event, state.get(field)))
+    return state
+
+
+def replay(state: Dict[str, Any], events: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """
+    Apply audit events in order.
+
+    Args:
+        state: Starting state (modified in place)
+        events: Audit documents sorted by `time_of_action`
+
+    Returns:
+        Final state and number of events applied
+    """
+    count = 0
+    for event in events:
+        apply_event(state, event)
+        count += 1
+    return state, count
+
+
+class RestaurantHistory:
+    """
+    Point-in-time restaurant reconstruction from the audit log.
+
+    Reconstruction starts from the nearest snapshot at or before the
+    requested time and replays only the audit events after it, reading
+    archived events through the same audit store as recent ones.
+    """
+
+    def __init__(self, store: AuditStore, snapshots: Collection, snapshot_every: int = SNAPSHOT_EVERY):
+        self.store = store
+        self.snapshots = snapshots
+        self.snapshot_every = snapshot_every
+
+    def _events(self, restaurant_id: str, after: Optional[Any], until: Optional[Any]) -> Iterable[Dict[str, Any]]:
+        return self.store.find(restaurant_id, start=after, end=until, start_exclusive=True)
+
+    def nearest_snapshot(self, restaurant_id: str, until: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        """Return the latest snapshot taken at or before `until`."""
+        query: Dict[str, Any] = {"restaurant_id": restaurant_id}
+        if until is not None:
+            query["as_of"] = {"$lte": until}
+        return self.snapshots.find_one(query, sort=[("as_of", DESCENDING)])
+
+    def as_of(self, restaurant_id: str, when: Any) -> Optional[Dict[str, Any]]:
+        """
+        Reconstruct a restaurant as it was at `when`.
+
+        Args:
+            restaurant_id: Restaurant identifier
+            when: datetime or ISO-8601 string
+
+        Returns:
+            Restaurant state, or None if it had no history yet
+        """
+        until = to_audit_time(when)
+        snapshot = self.nearest_snapshot(restaurant_id, until)
+        state = dict(snapshot["state"]) if snapshot else {}
+        state, applied = replay(state, self._events(restaurant_id, snapshot["as_of"] if snapshot else None, until))
+        if not snapshot and not applied:
+            return None
+        state["restaurant_id"] = restaurant_id
+        return state
+
+    def take_snapshots(self, restaurant_id: str) -> int:
+        """
+        Snapshot a restaurant every `snapshot_every` events since its last snapshot.
+
+        Snapshots are only cut between distinct `time_of_action` values, so a
+        snapshot always covers every event at its `as_of` time.
+
+        Args:
+            restaurant_id: Restaurant identifier
+
+        Returns:
+            Number of snapshots written
+        """
+        snapshot = self.nearest_snapshot(restaurant_id)
+        state = dict(snapshot["state"]) if snapshot else {}
+        pending, last_time, written = 0, None, 0
+        new_snapshots: List[Dict[str, Any]] = []
+
+        for event in self._events(restaurant_id, snapshot["as_of"] if snapshot else None, None):
+            if pending >= self.snapshot_every and event["time_of_action"] != last_time:
+                new_snapshots.append({
+                    "restaurant_id": restaurant_id,
+                    "as_of": last_time,
+                    "state": copy.deepcopy(state),
+                    "created_at": datetime.now(timezone.utc)
+                })
+                pending = 0
+            apply_event(state, event)
+            last_time = event["time_of_action"]
+            pending += 1
+
+        if pending >= self.snapshot_every:
+            new_snapshots.append({
+                "restaurant_id": restaurant_id,
+                "as_of": last_time,
+                "state": copy.deepcopy(state),
+                "created_at": datetime.now(timezone.utc)
+            })
+        if new_snapshots:
+            self.snapshots.insert_many(new_snapshots, ordered=False)
+            written = len(new_snapshots)
+        return written
+
+    def take_all_snapshots(self) -> int:
+        """Run `take_snapshots` for every restaurant in the audit log, archived or not."""
+        return sum(self.take_snapshots(restaurant_id) for restaurant_id in self.store.restaurant_ids())
+
+
+def get_history() -> RestaurantHistory:
+    """Return a history reader over the configured audit collections."""
+    db = get_db()
+    return RestaurantHistory(AuditStore(db[COLLECTIONS['AUDIT']]), db[COLLECTIONS['AUDIT_SNAPSHOTS']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time restaurant state from the audit log")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = subparsers.add_parser("snapshot", help="Take periodic snapshots (run from cron)")
+    snapshot_parser.add_argument("--every", type=int, default=SNAPSHOT_EVERY)
+    as_of_parser = subparsers.add_parser("as-of", help="Print a restaurant as of a point in time")
+    as_of_parser.add_argument("restaurant_id")
+    as_of_parser.add_argument("when")
+    args = parser.parse_args()
+
+    history = get_history()
+    if args.command == "snapshot":
+        history.snapshot_every = args.every
+        print(f"Wrote {history.take_all_snapshots()} snapshots")
+    else:
+        print(history.as_of(args.restaurant_id, args.when))
+
+
+if __name__ == "__main__":
+    main()
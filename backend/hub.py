@@ -0,0 +1,299 @@
+import logging
+import secrets
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from pymongo.collection import Collection
+
+from config import (
+    ACTIVITY_STREAM_SOURCE, ACTIVITY_STREAM_BUFFER, ACTIVITY_STREAM_REPLAY, ACTIVITY_STREAM_MAX_VIEWERS
+)
+from stores import MongoActivityStore, get_activity_store
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Topic of the all-users (admin) stream
+ALL_USERS = "*"
+
+# Events handed to viewers are (event id, SSE event type, data). Activity data
+# is the record as the activity API returns it: {"username", "action",
+# "timestamp", "details"}. A resync event has no id and tells the client its
+# stream has a gap, so it should reload the feed before carrying on.
+StreamEvent = Tuple[Optional[str], str, Dict[str, Any]]
+RESYNC: StreamEvent = (None, "resync", {"reason": "events were dropped, reload the activity feed"})
+
+
+class Subscription:
+    """
+    One connected viewer: a bounded buffer of events for one topic.
+
+    Publishers never wait on a viewer. When a viewer falls `buffer_size`
+    events behind (a slow client whose socket writes are blocking), its
+    backlog is dropped and replaced by a single resync event, so memory per
+    viewer stays bounded whatever the publish rate.
+    """
+
+    def __init__(self, topic: str, buffer_size: int):
+        self.topic = topic
+        self.buffer_size = buffer_size
+        self.delivered = 0
+        self.overflows = 0
+        self.closed = False
+        self._events: Deque[StreamEvent] = deque()
+        self._ready = threading.Condition()
+
+    def offer(self, event: StreamEvent) -> bool:
+        """Queue an event, returning False if the backlog had to be dropped"""
+        with self._ready:
+            if self.closed:
+                return True
+            kept = len(self._events) < self.buffer_size
+            if not kept:
+                self._events.clear()
+                self._events.append(RESYNC)
+                self.overflows += 1
+            self._events.append(event)
+            self._ready.notify()
+            return kept
+
+    def next_batch(self, timeout: float) -> Optional[List[StreamEvent]]:
+        """
+        Everything queued so far, waiting up to `timeout` seconds for the first event.
+
+        Returns:
+            The events ([] on timeout), or None once the subscription is closed
+        """
+        with self._ready:
+            if not self._events and not self.closed:
+                self._ready.wait(timeout)
+            if self.closed:
+                return None
+            batch = list(self._events)
+            self._events.clear()
+        self.delivered += len(batch)
+        return batch
+
+    def close(self) -> None:
+        with self._ready:
+            self.closed = True
+            self._events.clear()
+            self._ready.notify_all()
+
+
+class ActivityHub:
+    """
+    In-process pub/sub of new activity for live viewers.
+
+    Each viewer subscribes to one user's topic, or to every user's; a publish
+    is one dict lookup plus a non-blocking append per subscribed viewer, with
+    no database reads. The newest `replay_size` events are kept so a client
+    reconnecting with Last-Event-ID misses nothing; ids are only meaningful
+    to the hub that issued them, and anything else gets a resync.
+
+    Events come from `log_activity` and the write listener in this process
+    ('local' source), or, when activity lives in MongoDB and change streams
+    are available, from a change stream on the activity collection, which
+    also carries other server processes' activity ('change_stream' source).
+    With the 'local' source under several gunicorn workers, a viewer only
+    sees activity handled by the worker serving its stream.
+    """
+
+    def __init__(self, buffer_size: int = ACTIVITY_STREAM_BUFFER, replay_size: int = ACTIVITY_STREAM_REPLAY,
+                 max_viewers: int = ACTIVITY_STREAM_MAX_VIEWERS):
+        self.buffer_size = buffer_size
+        self.max_viewers = max_viewers
+        self.source = "local"
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._viewers = 0
+        self._recent: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=replay_size)
+        self._seq = 0
+        self._epoch = secrets.token_hex(4)
+        self._lock = threading.Lock()
+        self.stats = {"published": 0, "overflows": 0, "resyncs": 0}
+
+    def publish(self, record: Dict[str, Any]) -> str:
+        """
+        Fan an activity record out to its user's viewers and the all-users viewers.
+
+        Args:
+            record: Activity record ({"username", "action", "timestamp", "details"})
+
+        Returns:
+            The event id
+        """
+        username = record.get("username")
+        with self._lock:
+            self._seq += 1
+            event_id = f"{self._epoch}-{self._seq}"
+            self._recent.append((self._seq, username, record))
+            viewers = list(self._topics.get(username, ())) + list(self._topics.get(ALL_USERS, ()))
+            self.stats["published"] += 1
+        event = (event_id, "activity", record)
+        overflows = sum(not viewer.offer(event) for viewer in viewers)
+        if overflows:
+            with self._lock:
+                self.stats["overflows"] += overflows
+        return event_id
+
+    def publish_local(self, record: Dict[str, Any]) -> None:
+        """Publish activity recorded by this process, unless a change stream already carries it."""
+        if self.source == "local":
+            self.publish(record)
+
+    def _replay(self, topic: str, last_event_id: str) -> List[StreamEvent]:
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return [RESYNC]
+        oldest = self._recent[0][0] if self._recent else self._seq + 1
+        if int(seq) < oldest - 1:
+            # Older than anything still held
+            return [RESYNC]
+        return [(f"{self._epoch}-{position}", "activity", record) for position, username, record in self._recent
+                if position > int(seq) and topic in (ALL_USERS, username)]
+
+    def subscribe(self, topic: str, last_event_id: Optional[str] = None) -> Optional[Subscription]:
+        """
+        Start receiving a topic's events.
+
+        Args:
+            topic: Username, or ALL_USERS
+            last_event_id: Last event id the client saw, to replay what it missed
+
+        Returns:
+            The subscription, or None when the hub is at `max_viewers`
+        """
+        with self._lock:
+            if self._viewers >= self.max_viewers:
+                return None
+            subscription = Subscription(topic, self.buffer_size)
+            if last_event_id:
+                # Under the lock, so nothing is published between replay and going live
+                for event in self._replay(topic, last_event_id):
+                    if event is RESYNC:
+                        self.stats["resyncs"] += 1
+                    subscription.offer(event)
+            self._topics.setdefault(topic, set()).add(subscription)
+            self._viewers += 1
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            viewers = self._topics.get(subscription.topic)
+            if viewers is not None and subscription in viewers:
+                viewers.discard(subscription)
+                self._viewers -= 1
+                if not viewers:
+                    del self._topics[subscription.topic]
+        subscription.close()
+
+    def resync_all(self) -> None:
+        """Tell every viewer its stream has a gap"""
+        with self._lock:
+            viewers = [viewer for topic in self._topics.values() for viewer in topic]
+            self.stats["resyncs"] += len(viewers)
+        for viewer in viewers:
+            viewer.offer(RESYNC)
+
+    def watch(self, activity: Collection) -> bool:
+        """
+        Take events from a change stream on the activity collection.
+
+        Change streams need a replica set or Atlas; elsewhere this logs and
+        returns False, leaving the hub on local events. If the stream later
+        fails, the hub falls back to local events and viewers are resynced.
+
+        Args:
+            activity: The activity collection
+
+        Returns:
+            Whether the change stream was opened
+        """
+        try:
+            stream = activity.watch([{"$match": {"operationType": "insert"}}])
+        except Exception as e:
+            logger.info(f"Change streams unavailable for {activity.name}, live activity is local to this process: "
+                        f"{str(e)}")
+            return False
+
+        def run() -> None:
+            try:
+                for change in stream:
+                    record = dict(change["fullDocument"])
+                    record.pop("_id", None)
+                    self.publish(record)
+            except Exception as e:
+                logger.error(f"Activity change stream stopped, falling back to local events: {str(e)}")
+            self.source = "local"
+            self.resync_all()
+
+        self.source = "change_stream"
+        threading.Thread(target=run, name="activity-hub-watch", daemon=True).start()
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, source=self.source, viewers=self._viewers, topics=len(self._topics),
+                        replay=len(self._recent))
+
+
+def write_record(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Activity record for a write event, attributed to its actor.
+
+    Args:
+        event: Write event (see `events.py`)
+
+    Returns:
+        {"username", "action": operation, "timestamp", "details": {"collection", "filter", "documents"}}
+    """
+    timestamp = event.get("timestamp")
+    return {
+        "username": event.get("actor"),
+        "action": event.get("operation"),
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        "details": {
+            "collection": event.get("collection"),
+            "filter": event.get("filter"),
+            "documents": len(event.get("after") or event.get("before") or [])
+        }
+    }
+
+
+_hub: Optional[ActivityHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_activity_hub() -> ActivityHub:
+    """
+    Return the process-wide hub, created on the first viewer.
+
+    With ACTIVITY_STREAM_SOURCE 'auto' or 'change_stream' and the Mongo
+    activity store, the hub follows the activity collection's change stream.
+    """
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            hub = ActivityHub()
+            if ACTIVITY_STREAM_SOURCE != "local":
+                store = get_activity_store()
+                if isinstance(store, MongoActivityStore):
+                    hub.watch(store.activity)
+                elif ACTIVITY_STREAM_SOURCE == "change_stream":
+                    logger.warning("ACTIVITY_STREAM_SOURCE=change_stream needs ACTIVITY_STORE=mongo, using local events")
+            _hub = hub
+        return _hub
+
+
+def publish_activity(record: Dict[str, Any]) -> None:
+    """Forward activity logged by this process, once anyone has started viewing."""
+    if _hub is not None:
+        _hub.publish_local(record)
+
+
+def activity_stream_listener(event: Dict[str, Any]) -> None:
+    """Write listener forwarding mutations to their actor's live viewers."""
+    if _hub is not None:
+        _hub.publish(write_record(event))
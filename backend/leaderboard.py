@@ -0,0 +1,317 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+from sortedcontainers import SortedList
+
+from config import COLLECTIONS, LEADERBOARD_SIZE, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Board name -> fields of the restaurant summary used for ranking, best first
+BOARDS: Dict[str, Tuple[str, ...]] = {
+    "top_rated": ("avg_rating", "review_count"),
+    "most_reviewed": ("review_count", "avg_rating")
+}
+
+# Only the fields the leaderboards need are pulled from `restaurants`
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    "restaurant_id": 1,
+    "name": 1,
+    "address.zipcode": 1,
+    "avg_rating": 1,
+    "review_count": {"$size": {"$ifNull": ["$critic_reviews", []]}}
+}
+
+BoardKey = Tuple[str, str]
+
+
+def zipcode_scope(zipcode: str) -> str:
+    """Scope name of a per-zipcode board."""
+    return f"zipcode:{zipcode}"
+
+
+def summarize_restaurant(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a restaurant document to the fields the leaderboards rank on.
+
+    Args:
+        doc: Full restaurant document or a `SUMMARY_PROJECTION` result
+
+    Returns:
+        Restaurant summary dict
+    """
+    if "review_count" in doc:
+        review_count = int(doc["review_count"])
+    else:
+        review_count = len(doc.get("critic_reviews") or [])
+    return {
+        "restaurant_id": str(doc["restaurant_id"]),
+        "name": doc.get("name", ""),
+        "zipcode": (doc.get("address") or {}).get("zipcode"),
+        "avg_rating": float(doc.get("avg_rating") or 0.0),
+        "review_count": review_count
+    }
+
+
+class Leaderboard:
+    """A single ranking kept fully sorted so any change is an O(log n) update."""
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self._entries = SortedList()
+        self._keys: Dict[str, Tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sort_key(self, summary: Dict[str, Any]) -> Tuple:
+        # Negate so the best entries sort first; restaurant_id breaks ties
+        return tuple(-summary[field] for field in self.fields) + (summary["restaurant_id"],)
+
+    def upsert(self, summary: Dict[str, Any], size: int) -> bool:
+        """
+        Insert or move a restaurant.
+
+        Args:
+            summary: Restaurant summary
+            size: Number of entries that are published
+
+        Returns:
+            True if the published top `size` entries changed
+        """
+        restaurant_id = summary["restaurant_id"]
+        new_key = self._sort_key(summary)
+        old_key = self._keys.get(restaurant_id)
+        if old_key == new_key:
+            return False
+
+        touched_top = False
+        if old_key is not None:
+            touched_top = self._entries.index(old_key) < size
+            self._entries.remove(old_key)
+        self._entries.add(new_key)
+        self._keys[restaurant_id] = new_key
+        return touched_top or self._entries.index(new_key) < size
+
+    def remove(self, restaurant_id: str, size: int) -> bool:
+        """
+        Drop a restaurant from the ranking.
+
+        Returns:
+            True if the published top `size` entries changed
+        """
+        old_key = self._keys.pop(restaurant_id, None)
+        if old_key is None:
+            return False
+        touched_top = self._entries.index(old_key) < size
+        self._entries.remove(old_key)
+        return touched_top
+
+    def top(self, limit: int) -> List[str]:
+        """Return the restaurant_ids of the best `limit` entries."""
+        return [key[-1] for key in self._entries.islice(0, limit)]
+
+
+class LeaderboardService:
+    """
+    Global and per-zipcode leaderboards maintained incrementally from write
+    events and persisted to the `leaderboards` summary collection.
+    """
+
+    def __init__(self, summary_collection: Optional[Collection] = None,
+                 size: int = LEADERBOARD_SIZE):
+        self.summary_collection = summary_collection
+        self.size = size
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._boards: Dict[BoardKey, Leaderboard] = {}
+        self._restaurants: Dict[str, Dict[str, Any]] = {}
+
+    def _board(self, key: BoardKey) -> Leaderboard:
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = Leaderboard(BOARDS[key[0]])
+        return board
+
+    @staticmethod
+    def _scopes(summary: Dict[str, Any]) -> List[str]:
+        scopes = [GLOBAL_SCOPE]
+        if summary.get("zipcode"):
+            scopes.append(zipcode_scope(summary["zipcode"]))
+        return scopes
+
+    def load(self, restaurants: Collection) -> int:
+        """
+        Build every board once from the restaurants collection.
+
+        Args:
+            restaurants: The `restaurants` collection
+
+        Returns:
+            Number of restaurants loaded
+        """
+        with self._lock:
+            self._boards.clear()
+            self._restaurants.clear()
+            for doc in restaurants.find({}, SUMMARY_PROJECTION):
+                self._apply(summarize_restaurant(doc))
+            self.loaded = True
+            self.persist(set(self._boards))
+            return len(self._restaurants)
+
+    def _apply(self, summary: Dict[str, Any]) -> Set[BoardKey]:
+        """Place a summary on every board it belongs to, returning boards whose top changed."""
+        dirty: Set[BoardKey] = set()
+        restaurant_id = summary["restaurant_id"]
+        previous = self._restaurants.get(restaurant_id)
+        if previous is not None:
+            for scope in set(self._scopes(previous)) - set(self._scopes(summary)):
+                dirty |= self._remove_from_scope(restaurant_id, scope)
+
+        self._restaurants[restaurant_id] = summary
+        for scope in self._scopes(summary):
+            for board_name in BOARDS:
+                key = (board_name, scope)
+                if self._board(key).upsert(summary, self.size):
+                    dirty.add(key)
+        return dirty
+
+    def _remove_from_scope(self, restaurant_id: str, scope: str) -> Set[BoardKey]:
+        dirty: Set[BoardKey] = set()
+        for board_name in BOARDS:
+            key = (board_name, scope)
+            board = self._boards.get(key)
+            if board is None:
+                continue
+            if board.remove(restaurant_id, self.size):
+                dirty.add(key)
+            if not len(board):
+                del self._boards[key]
+                dirty.add(key)
+        return dirty
+
+    def update_restaurant(self, doc: Dict[str, Any]) -> Set[BoardKey]:
+        """
+        Apply a restaurant's new state to the boards and persist what changed.
+
+        Args:
+            doc: Restaurant document after the write
+
+        Returns:
+            Keys of the boards whose published entries changed
+        """
+        with self._lock:
+            dirty = self._apply(summarize_restaurant(doc))
+            self.persist(dirty)
+            return dirty
+
+    def remove_restaurant(self, restaurant_id: str) -> Set[BoardKey]:
+        """Remove a deleted restaurant from every board and persist what changed."""
+        with self._lock:
+            previous = self._restaurants.pop(str(restaurant_id), None)
+            if previous is None:
+                return set()
+            dirty: Set[BoardKey] = set()
+            for scope in self._scopes(previous):
+                dirty |= self._remove_from_scope(previous["restaurant_id"], scope)
+            self.persist(dirty)
+            return dirty
+
+    def on_write(self, event: Dict[str, Any]) -> None:
+        """
+        Write listener keeping the boards in sync with the restaurants collection.
+
+        Boards that have not been loaded yet are left alone, since the first
+        load reads the already-written state.
+
+        Args:
+            event: Write event (see `events.py`)
+        """
+        if not self.loaded or event.get("collection") != COLLECTIONS['RESTAURANTS']:
+            return
+        after_ids = set()
+        for doc in event.get("after", []):
+            if "restaurant_id" in doc:
+                after_ids.add(str(doc["restaurant_id"]))
+                self.update_restaurant(doc)
+        for doc in event.get("before", []):
+            if "restaurant_id" in doc and str(doc["restaurant_id"]) not in after_ids:
+                self.remove_restaurant(doc["restaurant_id"])
+
+    def top(self, board: str, zipcode: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read a leaderboard.
+
+        Args:
+            board: Board name, one of `BOARDS`
+            zipcode: Restrict to one zipcode, global board if omitted
+            limit: Number of entries, defaults to the configured size
+
+        Returns:
+            Ranked restaurant summaries
+        """
+        if board not in BOARDS:
+            raise ValueError(f"Unknown leaderboard: {board}")
+        scope = zipcode_scope(zipcode) if zipcode else GLOBAL_SCOPE
+        limit = self.size if limit is None else limit
+        with self._lock:
+            leaderboard = self._boards.get((board, scope))
+            if leaderboard is None:
+                return []
+            return [
+                {"rank": rank, **self._restaurants[restaurant_id]}
+                for rank, restaurant_id in enumerate(leaderboard.top(limit), start=1)
+            ]
+
+    def persist(self, keys: Set[BoardKey]) -> None:
+        """Write the published top entries of the given boards to the summary collection."""
+        if self.summary_collection is None or not keys:
+            return
+        now = datetime.now(timezone.utc)
+        operations = []
+        for board, scope in keys:
+            operations.append(ReplaceOne(
+                {"_id": f"{board}:{scope}"},
+                {
+                    "board": board,
+                    "scope": scope,
+                    "entries": self.top(board, scope.split(":", 1)[1] if scope != GLOBAL_SCOPE else None),
+                    "updated_at": now
+                },
+                upsert=True
+            ))
+        try:
+            self.summary_collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Error persisting leaderboards: {str(e)}")
+
+
+_service: Optional[LeaderboardService] = None
+_service_lock = threading.Lock()
+
+
+def get_leaderboard_service() -> LeaderboardService:
+    """Return the process-wide leaderboard service, building it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            db = get_db()
+            _service = LeaderboardService(db[COLLECTIONS['LEADERBOARDS']])
+        if not _service.loaded:
+            count = _service.load(get_db()[COLLECTIONS['RESTAURANTS']])
+            logger.info(f"Loaded leaderboards for {count} restaurants")
+        return _service
+
+
+def leaderboard_listener(event: Dict[str, Any]) -> None:
+    """Forward write events to the leaderboard service once it has been built."""
+    if _service is not None:
+        _service.on_write(event)
@@ -0,0 +1,502 @@
+import argparse
+import hashlib
+import http.client
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from config import (
+    LLM_BACKEND, PROJECT_ID, LOCATION, LLM_MODEL, LLM_ENDPOINT, LLM_RATE, LLM_BURST, LLM_DEADLINE,
+    LLM_HEDGE_AFTER, LLM_MAX_ATTEMPTS, LLM_MAX_CONCURRENCY
+)
+from metrics import LLM_COALESCED, LLM_UPSTREAM_CALLS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth another attempt
+RETRYABLE_STATUS = {
+    HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT
+}
+
+
+class LLMError(Exception):
+    """An LLM request failed"""
+
+
+class LLMTimeout(LLMError):
+    """No response within the request's deadline"""
+
+
+class UpstreamError(LLMError):
+    """One upstream attempt failed; `retryable` says whether another may succeed"""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` acquisitions per second on average and bursts
+    of up to `capacity`. A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        return self.rate <= 0 or self._take() == 0.0
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a token"""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            delay = self._take()
+            if delay == 0.0:
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+
+class SimulatedTransport:
+    """Canned responses, for development without an LLM"""
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        return f"Simulated LLM response for: {prompt}"
+
+
+class HttpTransport:
+    """
+    JSON over HTTP: POST {"model", "prompt"} to `endpoint`, which answers
+    {"text"} (a gateway in front of the model, or `llm.py fake-server`).
+
+    Each worker thread keeps one keep-alive connection and reuses it for
+    every call, so calls skip TCP and TLS setup.
+    """
+
+    def __init__(self, endpoint: str = LLM_ENDPOINT, model: str = LLM_MODEL):
+        url = urlsplit(endpoint)
+        self.model = model
+        self.https = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path or "/"
+        self._local = threading.local()
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        # Connections must not cross a fork
+        if connection is None or self._local.pid != os.getpid():
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=timeout)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        body = json.dumps({"model": self.model, "prompt": prompt}).encode()
+        connection = self._connection(timeout)
+        try:
+            connection.request("POST", self.path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Also covers a keep-alive connection the server has since closed
+            connection.close()
+            self._local.connection = None
+            raise UpstreamError(f"LLM endpoint unreachable: {str(e)}", retryable=True)
+        if response.status != HTTPStatus.OK:
+            raise UpstreamError(f"LLM endpoint returned {response.status}",
+                                retryable=response.status in RETRYABLE_STATUS)
+        try:
+            return json.loads(payload)["text"]
+        except json.JSONDecodeError as e:
+            # A truncated or garbled body, e.g. from a proxy, may not happen again
+            raise UpstreamError(f"LLM endpoint returned invalid JSON: {str(e)}", retryable=True)
+        except (KeyError, TypeError):
+            raise UpstreamError("LLM endpoint response has no \"text\"", retryable=False)
+
+
+class VertexTransport:
+    """
+    Gemini on Vertex AI through google-cloud-aiplatform's prediction client,
+    created once so its gRPC channel serves every call. The client (rather
+    than vertexai.GenerativeModel, which takes no timeout) is used so each
+    call carries the attempt's remaining time as its gRPC deadline.
+    """
+
+    def __init__(self, project: Optional[str] = PROJECT_ID, location: Optional[str] = LOCATION,
+                 model: str = LLM_MODEL):
+        from google.cloud import aiplatform_v1
+
+        self.types = aiplatform_v1
+        self.client = aiplatform_v1.PredictionServiceClient(
+            client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+        )
+        self.model = f"projects/{project}/locations/{location}/publishers/google/models/{model}"
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        request = self.types.GenerateContentRequest(
+            model=self.model,
+            contents=[self.types.Content(role="user", parts=[self.types.Part(text=prompt)])]
+        )
+        try:
+            response = self.client.generate_content(request=request, timeout=timeout)
+        except Exception as e:
+            # google.api_core exceptions carry the HTTP status as `code` (504 for an expired
+            # deadline); network errors have none
+            code = getattr(e, "code", None)
+            raise UpstreamError(f"Vertex AI call failed: {str(e)}",
+                                retryable=not isinstance(code, int) or code in RETRYABLE_STATUS)
+        if not response.candidates:
+            # Blocked prompts come back without candidates
+            raise UpstreamError(f"Vertex AI returned no candidates: {response.prompt_feedback}", retryable=False)
+        return "".join(part.text for part in response.candidates[0].content.parts)
+
+
+class _Flight:
+    """An upstream request that identical concurrent requests wait on"""
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMClient:
+    """
+    Shared LLM client: one transport per process, plus
+
+    - single flight: identical prompts already in flight wait for that
+      request's answer instead of making their own call;
+    - a token bucket over every upstream attempt;
+    - a per-request deadline covering rate-limit waits, attempts and backoff;
+    - hedging: when an attempt has not answered after `hedge_after` seconds,
+      a second one is started if a token is free, and the first answer wins;
+    - retries with jittered exponential backoff on retryable failures, up to
+      `max_attempts` attempts in total (hedges included).
+
+    Attempts run on a bounded thread pool. A losing attempt cannot be
+    interrupted; it runs to completion and its answer is dropped.
+    """
+
+    def __init__(self, transport: Any, rate: float = LLM_RATE, burst: int = LLM_BURST,
+                 deadline: float = LLM_DEADLINE, hedge_after: float = LLM_HEDGE_AFTER,
+                 max_attempts: int = LLM_MAX_ATTEMPTS, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 backoff: float = 0.2):
+        """
+        Args:
+            transport: Anything with `generate(prompt, timeout) -> str` raising UpstreamError
+            rate: Upstream attempts per second (0 for no limit)
+            burst: Attempts allowed at once after an idle period
+            deadline: Default seconds per request
+            hedge_after: Seconds before hedging a slow attempt (0 to disable)
+            max_attempts: Upstream attempts per request
+            max_concurrency: Upstream attempts in flight at once
+            backoff: First retry delay in seconds, doubled per retry
+        """
+        self.transport = transport
+        self.bucket = TokenBucket(rate, burst)
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff = backoff
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "hedges": 0, "retries": 0,
+                      "timeouts": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _call(self, prompt: str, deadline_at: float) -> str:
+        self._count("upstream_calls")
+        try:
+            text = self.transport.generate(prompt, max(deadline_at - time.monotonic(), 0.001))
+        except Exception:
+            LLM_UPSTREAM_CALLS.inc(outcome="error")
+            raise
+        LLM_UPSTREAM_CALLS.inc(outcome="ok")
+        return text
+
+    def _execute(self, prompt: str, deadline_at: float) -> str:
+        pending: "set[Future]" = set()
+        attempts = 0
+        hedge_at: Optional[float] = None
+        last_error: Optional[BaseException] = None
+        backoff = self.backoff
+        try:
+            while True:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise LLMTimeout(f"No LLM response within the deadline after {attempts} attempts"
+                                     + (f" (last error: {last_error})" if last_error else ""))
+                if not pending:
+                    if attempts >= self.max_attempts:
+                        raise last_error
+                    if not self.bucket.acquire(remaining):
+                        raise LLMTimeout("LLM rate limit would exceed the deadline")
+                    pending.add(self._executor.submit(self._call, prompt, deadline_at))
+                    attempts += 1
+                    hedge_at = time.monotonic() + self.hedge_after if self.hedge_after > 0 else None
+
+                timeout = remaining if hedge_at is None else max(0.0, min(remaining, hedge_at - time.monotonic()))
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        return future.result()
+                    if not getattr(error, "retryable", False):
+                        raise error
+                    last_error = error
+
+                if done and not pending:
+                    # Every attempt so far failed: back off, then retry
+                    self._count("retries")
+                    time.sleep(max(0.0, min(backoff * random.uniform(0.5, 1.0), deadline_at - time.monotonic())))
+                    backoff *= 2
+                elif not done and hedge_at is not None and time.monotonic() >= hedge_at:
+                    # One hedge per attempt, and only with a token to spare
+                    hedge_at = None
+                    if attempts < self.max_attempts and self.bucket.try_acquire():
+                        pending.add(self._executor.submit(self._call, prompt, deadline_at))
+                        attempts += 1
+                        self._count("hedges")
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def generate(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """
+        Complete a prompt.
+
+        Args:
+            prompt: Prompt text
+            deadline: Seconds to wait at most, default `self.deadline`
+
+        Returns:
+            The model's text
+
+        Raises:
+            LLMTimeout: No answer within the deadline
+            LLMError: The upstream call failed
+        """
+        deadline_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        key = hashlib.sha1(prompt.encode()).hexdigest()
+        with self._lock:
+            self.stats["requests"] += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            LLM_COALESCED.inc()
+
+        if leader:
+            try:
+                flight.result = self._execute(prompt, deadline_at)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                flight.done.set()
+        elif not flight.done.wait(max(deadline_at - time.monotonic(), 0.0)):
+            flight = _Flight()
+            flight.error = LLMTimeout("No LLM response within the deadline")
+
+        if flight.error is not None:
+            self._count("timeouts" if isinstance(flight.error, LLMTimeout) else "errors")
+            raise flight.error
+        return flight.result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._inflight))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_transport(kind: str = LLM_BACKEND) -> Any:
+    """
+    Build an LLM transport.
+
+    Args:
+        kind: 'simulated', 'vertex' or 'http'
+
+    Returns:
+        The transport
+    """
+    if kind == "simulated":
+        return SimulatedTransport()
+    if kind == "vertex":
+        return VertexTransport()
+    if kind == "http":
+        return HttpTransport()
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, rebuilt after a fork."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = LLMClient(create_transport())
+        return _client
+
+
+class FakeLLMServer:
+    """
+    Local stand-in for an LLM endpoint, speaking HttpTransport's protocol.
+
+    Latency is lognormal around `latency_ms`, plus `tail_ms` for a
+    `tail_ratio` share of calls (stragglers), and an `error_rate` share of
+    calls answer 503. Counts calls and peak concurrency.
+    """
+
+    def __init__(self, port: int = 0, latency_ms: float = 200.0, tail_ms: float = 2000.0,
+                 tail_ratio: float = 0.02, error_rate: float = 0.01, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.tail_ms = tail_ms
+        self.tail_ratio = tail_ratio
+        self.error_rate = error_rate
+        self.calls = 0
+        self.connections = 0
+        self.concurrent = 0
+        self.peak_concurrent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.calls += 1
+                    server.concurrent += 1
+                    server.peak_concurrent = max(server.peak_concurrent, server.concurrent)
+                    delay = server.latency_ms * server._rng.lognormvariate(0, 0.25)
+                    if server._rng.random() < server.tail_ratio:
+                        delay += server.tail_ms
+                    failed = server._rng.random() < server.error_rate
+                try:
+                    time.sleep(delay / 1000)
+                    if failed:
+                        status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "overloaded"}
+                    else:
+                        status, payload = HTTPStatus.OK, {"text": f"Fake response to: {request['prompt'][:200]}"}
+                    body = json.dumps(payload).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.concurrent -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/generate"
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "FakeLLMServer":
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fake = subparsers.add_parser("fake-server", help="Serve fake completions for LLM_BACKEND=http")
+    fake.add_argument("--port", type=int, default=8081)
+    fake.add_argument("--latency-ms", type=float, default=200.0)
+    fake.add_argument("--tail-ms", type=float, default=2000.0)
+    fake.add_argument("--tail-ratio", type=float, default=0.02)
+    fake.add_argument("--error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeLLMServer(args.port, args.latency_ms, args.tail_ms, args.tail_ratio, args.error_rate)
+    logger.info(f"Fake LLM endpoint at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
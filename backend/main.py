@@ -2,6 +2,24 @@ from flask import Flask
 import logging
 from routes.chat import chat_bp
 from routes.activity import activity_bp
+from routes.leaderboard import leaderboard_bp
+from routes.analytics import analytics_bp
+from routes.history import history_bp
+from routes.reviews import reviews_bp
+import events
+from leaderboard import leaderboard_listener
+from critic_stats import critic_stats_listener
+from audit import audit_listener
+from analytics import analytics_listener
+from dedupe import dedupe_listener
+from hub import activity_stream_listener
+from routes.health import health_bp
+from routes.metrics import metrics_bp
+from routes.profiler import profiler_bp
+from routes.events import events_bp
+from config import AUDIT_ENABLED, EVENTS_TOKEN, METRICS_ENABLED, PRELOAD_MODEL, PROFILER_TOKEN
+from metrics import instrument_app, instrument_mongo
+from sentiment import get_sentiment_model
 
 # Configure logging
 logging.basicConfig(
@@ -10,13 +28,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def create_app() -> Flask:
-    """Create and configure the Flask application."""
+def create_app(preload_model: bool = PRELOAD_MODEL) -> Flask:
+    """
+    Create and configure the Flask application.
+    
+    Args:
+        preload_model: Load the sentiment model now. Under `gunicorn --preload`
+            this happens once in the master, and forked workers share the
+            weights copy-on-write.
+    """
     app = Flask(__name__)
+    # Read by /readyz: a worker expected to have the model preloaded is not ready without it
+    app.config["PRELOAD_MODEL"] = preload_model
+    
+    if METRICS_ENABLED:
+        # Before anything calls get_db(): listeners only attach to new clients
+        instrument_mongo()
+        instrument_app(app)
+        app.register_blueprint(metrics_bp)
     
     # Register blueprints
     app.register_blueprint(chat_bp)
     app.register_blueprint(activity_bp)
+    app.register_blueprint(leaderboard_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(history_bp)
+    app.register_blueprint(reviews_bp)
+    app.register_blueprint(health_bp)
+    if PROFILER_TOKEN:
+        app.register_blueprint(profiler_bp)
+    if EVENTS_TOKEN:
+        app.register_blueprint(events_bp)
+    
+    # Keep derived views in sync with review writes
+    events.subscribe(leaderboard_listener)
+    events.subscribe(critic_stats_listener)
+    events.subscribe(analytics_listener)
+    events.subscribe(dedupe_listener)
+    events.subscribe(activity_stream_listener)
+    if AUDIT_ENABLED:
+        events.subscribe(audit_listener)
+    
+    if preload_model:
+        get_sentiment_model()
+        logger.info("Sentiment model preloaded")
     
     return app
 
@@ -0,0 +1,461 @@
+import bisect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from config import METRICS_MULTIPROC_DIR, METRICS_SNAPSHOT_INTERVAL, SLOW_COMMAND_MS, SLOW_COMMAND_EXPLAIN, get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond Mongo reads to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Labelled latency histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels: Any) -> Callable:
+        """Decorator observing the duration of every call."""
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self) -> Dict[Tuple[str, ...], List[Any]]:
+        """label values -> [per-bucket counts, sum, count]"""
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._series.items()}
+
+    @staticmethod
+    def merge(into: Dict[Tuple[str, ...], List[Any]], samples: Dict[Tuple[str, ...], List[Any]]) -> None:
+        for key, (counts, total, count) in samples.items():
+            merged = into.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+
+    def render(self, samples: Optional[Dict[Tuple[str, ...], List[Any]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        samples = self.samples() if samples is None else samples
+        series = sorted((key, counts, total, count) for key, (counts, total, count) in samples.items())
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Counter:
+    """Labelled monotonically increasing counter."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        """label values -> value"""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(into: Dict[Tuple[str, ...], float], samples: Dict[Tuple[str, ...], float]) -> None:
+        for key, value in samples.items():
+            into[key] = into.get(key, 0.0) + value
+
+    def render(self, samples: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        values = sorted((self.samples() if samples is None else samples).items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values)
+        return lines
+
+
+class Registry:
+    """Set of metrics exposed together at `/metrics`."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Any) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def snapshot(self) -> Dict[str, List[Any]]:
+        """Every metric's samples as JSON-ready [label values, value] pairs."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: [[list(key), value] for key, value in metric.samples().items()] for metric in metrics}
+
+    def render(self, snapshots: Iterable[Dict[str, List[Any]]] = ()) -> str:
+        """
+        Every metric in the Prometheus text exposition format.
+
+        Args:
+            snapshots: Other processes' `snapshot()`s to add to this one's values
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshots = list(snapshots)
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            for snapshot in snapshots:
+                metric.merge(samples, {tuple(key): value for key, value in snapshot.get(metric.name, [])})
+            lines.extend(metric.render(samples))
+        return "\n".join(lines) + "\n"
+
+
+class WorkerSnapshots:
+    """
+    Metrics of every worker process of one server, shared through a directory.
+
+    Each worker writes its registry snapshot to `worker-<pid>.json` every
+    `interval` seconds; `/metrics` in any worker renders its own live values
+    plus every other worker's latest snapshot, so a scrape through the
+    server's single port sees the whole server. Files of workers that have
+    exited are kept so their counts don't vanish from the totals; the
+    directory is cleared when the server starts (see gunicorn.conf.py).
+    """
+
+    def __init__(self, registry: Registry, directory: str, interval: float = METRICS_SNAPSHOT_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.pid = os.getpid()
+        self.path = os.path.join(directory, f"worker-{self.pid}.json")
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._run, name="metrics-snapshot", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+            time.sleep(self.interval)
+
+    def write(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(self.registry.snapshot(), snapshot)
+        os.replace(tmp_path, self.path)
+
+    def others(self) -> List[Dict[str, List[Any]]]:
+        """Latest snapshot of every other worker, past and present."""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == self.path:
+                continue
+            try:
+                with open(path, encoding="utf-8") as snapshot:
+                    snapshots.append(json.load(snapshot))
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading metrics snapshot {name}: {str(e)}")
+        return snapshots
+
+
+REGISTRY = Registry()
+
+_worker_snapshots: Optional[WorkerSnapshots] = None
+
+
+def start_worker_snapshots(directory: str = METRICS_MULTIPROC_DIR) -> Optional[WorkerSnapshots]:
+    """Share this worker's metrics with its siblings; call once per worker process (post_fork)."""
+    global _worker_snapshots
+    if directory:
+        _worker_snapshots = WorkerSnapshots(REGISTRY, directory)
+        _worker_snapshots.start()
+    return _worker_snapshots
+
+
+def render_metrics() -> str:
+    """This process's metrics, plus its sibling workers' when snapshots are shared."""
+    if _worker_snapshots is not None and _worker_snapshots.pid == os.getpid():
+        return REGISTRY.render(_worker_snapshots.others())
+    return REGISTRY.render()
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Flask request latency", ("blueprint", "endpoint", "method", "status")
+)
+MONGO_LATENCY = REGISTRY.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+)
+LLM_LATENCY = REGISTRY.histogram("llm_request_duration_seconds", "LLM response generation latency")
+LLM_UPSTREAM_CALLS = REGISTRY.counter(
+    "llm_upstream_calls_total", "LLM upstream attempts, hedges and retries included", ("outcome",)
+)
+LLM_COALESCED = REGISTRY.counter(
+    "llm_coalesced_requests_total", "LLM requests answered by an identical request already in flight"
+)
+SENTIMENT_LATENCY = REGISTRY.histogram(
+    "sentiment_inference_duration_seconds", "Sentiment model inference latency per predict() call", ("mode",)
+)
+SLOW_COMMANDS = REGISTRY.counter(
+    "mongodb_slow_commands_total", "MongoDB commands slower than the slow-command threshold", ("collection", "command")
+)
+
+
+# ---------------------------------------------------------------------------
+# Flask
+# ---------------------------------------------------------------------------
+
+def instrument_app(app: Any) -> None:
+    """Record per-blueprint request latency through before/after request hooks."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response: Any) -> Any:
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                blueprint=request.blueprint or "",
+                endpoint=request.endpoint or "unmatched",
+                method=request.method,
+                status=response.status_code
+            )
+        return response
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+# ---------------------------------------------------------------------------
+
+# Fields added by the driver that must not be sent back inside `explain`
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+
+def filter_shape(value: Any) -> Any:
+    """Replace the values of a filter with their type names, keeping operators and structure."""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(item) for item in value[:3]] + (["..."] if len(value) > 3 else [])
+    return type(value).__name__
+
+
+def command_filter(command_name: str, command: Dict[str, Any]) -> Any:
+    """The query part of a command, if it has one."""
+    if command_name in ("find", "count", "distinct", "findAndModify"):
+        return command.get("filter", command.get("query"))
+    if command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or []
+        return statements[0].get("q") if statements else None
+    if command_name == "aggregate":
+        stages = command.get("pipeline") or []
+        return stages[0].get("$match") if stages else None
+    return None
+
+
+def explain_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Winning plan stages, index names and scan counts from an explain result."""
+    planner = explain.get("queryPlanner") or {}
+    stages, indexes = [], []
+    stage = planner.get("winningPlan") or {}
+    while stage:
+        stage = stage.get("queryPlan", stage)
+        stages.append(stage.get("stage"))
+        if stage.get("indexName"):
+            indexes.append(stage["indexName"])
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+    stats = explain.get("executionStats") or {}
+    return {
+        "plan": " <- ".join(filter(None, stages)),
+        "indexes": indexes,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned")
+    }
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener timing every command per collection.
+
+    Commands slower than `slow_ms` are logged with their filter shape. The
+    explain summary is fetched on a background thread so the slow request
+    itself is not delayed further.
+    """
+
+    def __init__(self, slow_ms: float = SLOW_COMMAND_MS, explain: bool = SLOW_COMMAND_EXPLAIN,
+                 max_slow_log: int = 100):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.slow_log: Deque[Dict[str, Any]] = deque(maxlen=max_slow_log)
+        self._started: Dict[Tuple[Any, int], Tuple[str, Optional[Dict[str, Any]], str]] = {}
+        self._lock = threading.Lock()
+        self._explain_queue: "queue.Queue[Tuple[Dict[str, Any], Dict[str, Any], str]]" = queue.Queue(maxsize=100)
+        self._explain_thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if getattr(self._local, "explaining", False):
+            return
+        command_name = event.command_name
+        collection = event.command.get(command_name)
+        collection = collection if isinstance(collection, str) else ""
+        # Keep the command only when it might need explaining later
+        command = dict(event.command) if command_name in EXPLAINABLE else None
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (collection, command, event.database_name)
+
+    def _finish(self, event: Any, outcome: str) -> None:
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, command, database = started
+        seconds = event.duration_micros / 1_000_000
+        MONGO_LATENCY.observe(seconds, collection=collection, command=event.command_name, outcome=outcome)
+        if seconds * 1000 >= self.slow_ms:
+            self._record_slow(event.command_name, collection, command, database, seconds)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "failure")
+
+    def _record_slow(self, command_name: str, collection: str, command: Optional[Dict[str, Any]],
+                     database: str, seconds: float) -> None:
+        SLOW_COMMANDS.inc(collection=collection, command=command_name)
+        entry = {
+            "command": command_name,
+            "collection": collection,
+            "duration_ms": round(seconds * 1000, 2),
+            "filter_shape": filter_shape(command_filter(command_name, command)) if command else None,
+            "explain": None,
+            "timestamp": time.time()
+        }
+        self.slow_log.append(entry)
+        logger.warning(f"Slow MongoDB {command_name} on {collection} ({entry['duration_ms']} ms): "
+                       f"filter {entry['filter_shape']}")
+        if self.explain and command is not None:
+            self._start_explainer()
+            try:
+                self._explain_queue.put_nowait((entry, command, database))
+            except queue.Full:
+                pass
+
+    def _start_explainer(self) -> None:
+        with self._lock:
+            if self._explain_thread is None:
+                self._explain_thread = threading.Thread(target=self._run_explainer, name="slow-explain", daemon=True)
+                self._explain_thread.start()
+
+    def _run_explainer(self) -> None:
+        self._local.explaining = True
+        while True:
+            entry, command, database = self._explain_queue.get()
+            try:
+                explained = {key: value for key, value in command.items()
+                             if key not in DRIVER_FIELDS and not key.startswith("$")}
+                result = get_db().client[database].command("explain", explained, verbosity="executionStats")
+                entry["explain"] = explain_summary(result)
+                logger.warning(f"Slow MongoDB {entry['command']} on {entry['collection']} explain: {entry['explain']}")
+            except Exception as e:
+                logger.error(f"Error explaining slow command: {str(e)}")
+
+
+_command_metrics: Optional[MongoCommandMetrics] = None
+
+
+def instrument_mongo() -> MongoCommandMetrics:
+    """
+    Register the command listener with pymongo.
+
+    Listeners registered this way only apply to clients created afterwards,
+    so call this before the first `get_db()`.
+    """
+    global _command_metrics
+    if _command_metrics is None:
+        _command_metrics = MongoCommandMetrics()
+        monitoring.register(_command_metrics)
+    return _command_metrics
+
+
+def slow_commands() -> List[Dict[str, Any]]:
+    """Most recent slow commands, oldest first."""
+    return list(_command_metrics.slow_log) if _command_metrics else []
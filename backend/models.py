@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict
 
 @dataclass
 class ChatResponse:
@@ -15,7 +15,3 @@ class ActivityLog:
     action: str
     timestamp: datetime
     details: Dict
-
-# Store data in memory (replace with database in production)
-chat_history: List[ChatResponse] = []
-activity_logs: List[Dict] = []
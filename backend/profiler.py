@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import PROFILER_DIR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{code.co_firstlineno}"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Stack-sampling profiler over every live thread of the process.
+
+    A background thread snapshots `sys._current_frames()` every `interval`
+    seconds and counts identical stacks. Nothing is traced between samples,
+    so the cost to the sampled threads is the GIL time of one snapshot per
+    interval. Output is the collapsed-stack format read by flamegraph.pl and
+    speedscope ("frame;frame;frame count").
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """
+        Sample for `seconds` on the calling thread.
+
+        Args:
+            seconds: How long to sample
+
+        Returns:
+            self, with `samples` filled in
+        """
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                self.samples[_collapse(frame)] += 1
+            self.sample_count += 1
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, hottest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def summary(self, top: int = 20) -> Dict:
+        """Hottest leaf frames with their share of all samples."""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return {
+            "samples": self.sample_count,
+            "interval_ms": self.interval * 1000,
+            "top_frames": [
+                {"frame": frame, "samples": count, "share": count / total}
+                for frame, count in leaves.most_common(top)
+            ]
+        }
+
+
+# Only one profile at a time: concurrent samplers would skew each other
+_profile_lock = threading.Lock()
+
+
+def _profile_path(profile_id: str, suffix: str, directory: str) -> Path:
+    if not profile_id.isalnum():
+        raise ValueError(f"Invalid profile id: {profile_id}")
+    return Path(directory) / f"{profile_id}.{suffix}"
+
+
+def _write(path: Path, content: str) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+def start_profile(seconds: float, interval: float = 0.005, directory: str = PROFILER_DIR) -> Optional[str]:
+    """
+    Sample this process on a background thread, so the worker keeps serving
+    the traffic being profiled.
+
+    Results are written to `directory`, which the server's workers share, so
+    `read_profile` finds them whichever worker serves the fetch.
+
+    Args:
+        seconds: How long to sample
+        interval: Time between samples
+        directory: Where results are written
+
+    Returns:
+        The profile id, or None when a profile is already running in this process
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profile_id = secrets.token_hex(8)
+    try:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        running = _profile_path(profile_id, "running", directory)
+        _write(running, json.dumps({"pid": os.getpid(), "seconds": seconds, "started_at": time.time()}))
+    except Exception:
+        _profile_lock.release()
+        raise
+
+    def run() -> None:
+        try:
+            profiler = SamplingProfiler(interval).run(seconds)
+            _write(_profile_path(profile_id, "collapsed", directory), profiler.collapsed())
+            _write(_profile_path(profile_id, "json", directory), json.dumps(profiler.summary()))
+            logger.info(f"Profile {profile_id} done: {profiler.sample_count} samples over {seconds}s")
+        except Exception as e:
+            logger.error(f"Error in profile {profile_id}: {str(e)}")
+        finally:
+            running.unlink(missing_ok=True)
+            _profile_lock.release()
+
+    threading.Thread(target=run, name=f"profiler-{profile_id}", daemon=True).start()
+    return profile_id
+
+
+def read_profile(profile_id: str, output: str = "collapsed", directory: str = PROFILER_DIR) -> Dict[str, Any]:
+    """
+    State of a profile started by `start_profile` in any worker.
+
+    Args:
+        profile_id: Id returned by `start_profile`
+        output: 'collapsed' or 'json'
+
+    Returns:
+        {"status": "done", "result": ...}, {"status": "running", ...} or {"status": "unknown"}
+    """
+    result = _profile_path(profile_id, "collapsed" if output == "collapsed" else "json", directory)
+    if result.exists():
+        content = result.read_text()
+        return {"status": "done", "result": content if output == "collapsed" else json.loads(content)}
+    running = _profile_path(profile_id, "running", directory)
+    if running.exists():
+        return dict(json.loads(running.read_text()), status="running")
+    return {"status": "unknown"}
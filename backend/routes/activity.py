@@ -1,9 +1,16 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from http import HTTPStatus
+import hashlib
+import hmac
+import itertools
+import json
 import logging
-from typing import Dict, Tuple
+import zlib
+from typing import Dict, Iterator, Tuple, Union
 
-from models import activity_logs
+from config import EXPORT_BATCH_SIZE, EXPORT_CHUNK_BYTES, ACTIVITY_STREAM_HEARTBEAT, ACTIVITY_STREAM_ADMIN_TOKEN
+from hub import ALL_USERS, ActivityHub, StreamEvent, Subscription, get_activity_hub
+from stores import get_activity_store
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,13 +25,18 @@ def get_past_activity(username: str) -> Tuple[Dict, int]:
     
     Args:
         username: User's identifier
+    
+    Query parameters:
+        limit: Only the newest `limit` records (default: all)
     """
     try:
-        # Filter activities for the specified user
-        user_activities = [
-            log for log in activity_logs 
-            if log["username"] == username
-        ]
+        limit = request.args.get("limit", type=int)
+        if limit is not None and limit < 1:
+            return jsonify({
+                "error": "limit must be a positive integer"
+            }), HTTPStatus.BAD_REQUEST
+        
+        user_activities = get_activity_store().activities(username, limit)
         
         return jsonify({
             "username": username,
@@ -36,3 +48,185 @@ def get_past_activity(username: str) -> Tuple[Dict, int]:
         return jsonify({
             "error": "Internal server error"
         }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _export_chunks(records: Iterator[Tuple[str, Dict]], compress: bool) -> Iterator[bytes]:
+    """
+    Encode (cursor, record) pairs as NDJSON, in chunks of about EXPORT_CHUNK_BYTES.
+
+    With gzip each chunk is sync-flushed, so the client can decode what it has
+    received so far. A failure mid-stream ends the export with a final
+    `{"error", "cursor"}` line, cursor being the last record sent (null if
+    none), so a complete-looking body is never a truncated export; clients
+    resume from that cursor.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer, size = [], 0
+    last = None
+    try:
+        for cursor, record in records:
+            last = cursor
+            line = json.dumps({"cursor": cursor, **record}, default=str).encode() + b"\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                chunk = b"".join(buffer)
+                buffer, size = [], 0
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+    except Exception as e:
+        logger.error(f"Error in export_activity stream: {str(e)}")
+        buffer.append(json.dumps({"error": "export interrupted, resume from cursor", "cursor": last}).encode() + b"\n")
+    chunk = b"".join(buffer)
+    if compressor:
+        yield compressor.compress(chunk) + compressor.flush()
+    elif chunk:
+        yield chunk
+
+
+@activity_bp.route("/api/v1/activity/<username>/export", methods=["GET"])
+def export_activity(username: str):
+    """
+    Stream a user's full activity history as NDJSON, oldest first.
+
+    Each line is an activity record plus its `cursor`; pass the last cursor
+    received as `?cursor=` to resume an interrupted export; an export that
+    fails part way ends with an `error` line carrying that cursor. The body is
+    gzipped when the client accepts it. Responses carry an ETag derived from
+    the history's version, and a matching If-None-Match returns 304.
+
+    Args:
+        username: User's identifier
+    """
+    try:
+        store = get_activity_store()
+        after = request.args.get("cursor") or None
+        compress = request.accept_encodings["gzip"] > 0
+        version = store.activity_version(username)
+        etag = hashlib.sha1(
+            f"{username}\0{version}\0{after or ''}\0{'gzip' if compress else 'identity'}".encode()
+        ).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=HTTPStatus.NOT_MODIFIED)
+            response.set_etag(etag)
+            return response
+
+        records = store.iter_activities(username, after=after, batch_size=EXPORT_BATCH_SIZE)
+        # Read the first record now, so a bad cursor is a 400 rather than a broken stream
+        first = next(records, None)
+        if first is not None:
+            records = itertools.chain([first], records)
+
+        response = Response(stream_with_context(_export_chunks(records, compress)),
+                            mimetype="application/x-ndjson")
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        if compress:
+            response.headers["Content-Encoding"] = "gzip"
+        return response
+
+    except ValueError as e:
+        return jsonify({
+            "error": str(e)
+        }), HTTPStatus.BAD_REQUEST
+
+    except Exception as e:
+        logger.error(f"Error in export_activity: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _sse(event: StreamEvent) -> str:
+    event_id, kind, data = event
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _sse_stream(hub: ActivityHub, subscription: Subscription) -> Iterator[str]:
+    """
+    Encode a subscription's events as server-sent events until the client goes away.
+
+    Everything queued since the last write goes out as one chunk, and a
+    comment line every ACTIVITY_STREAM_HEARTBEAT seconds keeps proxies from
+    closing an idle stream (and lets the server notice a closed one).
+    """
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            batch = subscription.next_batch(ACTIVITY_STREAM_HEARTBEAT)
+            if batch is None:
+                return
+            yield "".join(_sse(event) for event in batch) if batch else ": keep-alive\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _stream_response(topic: str) -> Union[Response, Tuple[Dict, int]]:
+    hub = get_activity_hub()
+    subscription = hub.subscribe(topic, request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    if subscription is None:
+        return jsonify({
+            "error": "Too many live viewers, poll the activity feed instead"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
+    response = Response(stream_with_context(_sse_stream(hub, subscription)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@activity_bp.route("/api/v1/activity/<username>/stream", methods=["GET"])
+def stream_activity(username: str) -> Union[Response, Tuple[Dict, int]]:
+    """
+    Live tail of a user's new activity as server-sent events.
+
+    Each `activity` event carries a record shaped like the activity feed's;
+    reconnecting with Last-Event-ID (browsers do this themselves) replays
+    anything missed. A `resync` event means events were dropped, because the
+    client fell too far behind or the id is unknown to this server, and the
+    client should reload the feed. Each viewer holds a worker thread, so
+    serve streams from threaded or gevent workers.
+
+    Args:
+        username: User's identifier
+    """
+    try:
+        return _stream_response(username)
+
+    except Exception as e:
+        logger.error(f"Error in stream_activity: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _admin_authorized() -> bool:
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not supplied and request.headers.get("Authorization", "").startswith("Bearer "):
+        supplied = request.headers["Authorization"][len("Bearer "):]
+    return bool(ACTIVITY_STREAM_ADMIN_TOKEN) and hmac.compare_digest(supplied.encode(),
+                                                                     ACTIVITY_STREAM_ADMIN_TOKEN.encode())
+
+
+@activity_bp.route("/api/v1/activity-stream", methods=["GET"])
+def stream_all_activity() -> Union[Response, Tuple[Dict, int]]:
+    """
+    Live tail of every user's activity and writes, for admins.
+
+    Same events as the per-user stream. Needs ACTIVITY_STREAM_ADMIN_TOKEN as
+    an X-Admin-Token header or bearer token.
+    """
+    try:
+        if not _admin_authorized():
+            return jsonify({
+                "error": "Unauthorized"
+            }), HTTPStatus.UNAUTHORIZED
+
+        return _stream_response(ALL_USERS)
+
+    except Exception as e:
+        logger.error(f"Error in stream_all_activity: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
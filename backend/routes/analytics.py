@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify
+from http import HTTPStatus
+import logging
+from typing import Dict, Tuple
+
+from analytics import get_review_analytics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+analytics_bp = Blueprint('analytics', __name__)
+
+REPORTS = ("rating_histogram", "rating_sentiment_correlation", "disagreement", "zipcode_means")
+
+@analytics_bp.route("/api/v1/analytics/<report>", methods=["GET"])
+def get_analytics(report: str) -> Tuple[Dict, int]:
+    """
+    Run one review analytics report over the in-memory review columns.
+    
+    Args:
+        report: rating_histogram, rating_sentiment_correlation,
+            disagreement or zipcode_means
+    
+    Query parameters:
+        threshold: Rating/sentiment gap counted as disagreement (disagreement only, default 1.0)
+    """
+    try:
+        if report not in REPORTS:
+            return jsonify({
+                "error": f"Unknown report: {report}"
+            }), HTTPStatus.NOT_FOUND
+        
+        analytics = get_review_analytics()
+        if report == "disagreement":
+            result = analytics.disagreement(request.args.get("threshold", 1.0, type=float))
+        else:
+            result = getattr(analytics, report)()
+        
+        return jsonify({
+            "report": report,
+            "result": result
+        }), HTTPStatus.OK
+        
+    except Exception as e:
+        logger.error(f"Error in get_analytics: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
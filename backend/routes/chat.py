@@ -4,7 +4,10 @@ from http import HTTPStatus
 import logging
 from typing import Dict, Tuple
 
+from llm import LLMError, LLMTimeout
 from utils import log_activity, generate_llm_response
+from models import ChatResponse
+from stores import get_activity_store
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -39,6 +42,9 @@ def llm_chat() -> Tuple[Dict, int]:
         # Generate response
         llm_response = generate_llm_response(input1, input2)
         
+        chat = ChatResponse(username=username, message=llm_response, timestamp=datetime.utcnow())
+        get_activity_store().append_chat(chat.username, chat.message, chat.timestamp)
+        
         # Log the chat activity
         log_activity(
             username=username,
@@ -53,9 +59,21 @@ def llm_chat() -> Tuple[Dict, int]:
         return jsonify({
             "username": username,
             "response": llm_response,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": chat.timestamp.isoformat()
         }), HTTPStatus.OK
         
+    except LLMTimeout as e:
+        logger.error(f"Error in llm_chat: {str(e)}")
+        return jsonify({
+            "error": "The model did not answer in time"
+        }), HTTPStatus.GATEWAY_TIMEOUT
+
+    except LLMError as e:
+        logger.error(f"Error in llm_chat: {str(e)}")
+        return jsonify({
+            "error": "The model is unavailable"
+        }), HTTPStatus.BAD_GATEWAY
+
     except Exception as e:
         logger.error(f"Error in llm_chat: {str(e)}")
         return jsonify({
@@ -0,0 +1,67 @@
+from flask import Blueprint, request, jsonify
+from http import HTTPStatus
+import hmac
+import logging
+from typing import Dict, Tuple
+
+from bson import json_util
+
+import events
+from config import EVENTS_TOKEN
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint (only registered when EVENTS_TOKEN is set)
+events_bp = Blueprint('events', __name__)
+
+OPERATIONS = ("insert", "update", "delete")
+
+def _authorized() -> bool:
+    supplied = request.headers.get("X-Events-Token", "")
+    if not supplied and request.headers.get("Authorization", "").startswith("Bearer "):
+        supplied = request.headers["Authorization"][len("Bearer "):]
+    return bool(EVENTS_TOKEN) and hmac.compare_digest(supplied.encode(), EVENTS_TOKEN.encode())
+
+@events_bp.route("/api/v1/events", methods=["POST"])
+def publish_events() -> Tuple[Dict, int]:
+    """
+    Publish write events made by another process to this worker's listeners.
+    
+    This is how writes made through the app's MongoSQLParser reach the
+    leaderboard, critic_stats, audit, analytics and dedupe views: the app
+    registers an EventForwarder (app/utils/events.py) as a parser listener.
+    
+    Request body:
+        One write event (see `events.py`) or a list of them, as MongoDB
+        Extended JSON so ObjectIds and timestamps survive the trip
+    """
+    try:
+        if not _authorized():
+            return jsonify({
+                "error": "Unauthorized"
+            }), HTTPStatus.UNAUTHORIZED
+        
+        try:
+            body = json_util.loads(request.get_data(as_text=True))
+        except ValueError:
+            return jsonify({
+                "error": "Body must be JSON"
+            }), HTTPStatus.BAD_REQUEST
+        batch = body if isinstance(body, list) else [body]
+        for event in batch:
+            if (not isinstance(event, dict) or not isinstance(event.get("collection"), str)
+                    or event.get("operation") not in OPERATIONS):
+                return jsonify({
+                    "error": "Each event needs a collection and an operation of insert, update or delete"
+                }), HTTPStatus.BAD_REQUEST
+        
+        for event in batch:
+            events.publish(event)
+        return jsonify({"published": len(batch)}), HTTPStatus.OK
+        
+    except Exception as e:
+        logger.error(f"Error in publish_events: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,33 @@
+from flask import Blueprint, current_app, jsonify
+from http import HTTPStatus
+import logging
+from typing import Dict, Tuple
+
+from sentiment import is_model_loaded
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route("/healthz", methods=["GET"])
+def liveness() -> Tuple[Dict, int]:
+    """Report that the process is up."""
+    return jsonify({"status": "ok"}), HTTPStatus.OK
+
+@health_bp.route("/readyz", methods=["GET"])
+def readiness() -> Tuple[Dict, int]:
+    """
+    Report whether the worker is ready to serve.
+    
+    The sentiment model state is reported as warm or cold. When the model
+    is expected to be preloaded (`create_app(preload_model=True)`), a cold
+    worker is not ready yet.
+    """
+    model_state = "warm" if is_model_loaded() else "cold"
+    ready = model_state == "warm" or not current_app.config.get("PRELOAD_MODEL", False)
+    return jsonify({
+        "status": "ready" if ready else "starting",
+        "model": model_state
+    }), HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify
+from http import HTTPStatus
+import logging
+from typing import Dict, Tuple
+
+from history import get_history
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+history_bp = Blueprint('history', __name__)
+
+@history_bp.route("/api/v1/restaurants/<restaurant_id>/as-of", methods=["GET"])
+def get_restaurant_as_of(restaurant_id: str) -> Tuple[Dict, int]:
+    """
+    Reconstruct a restaurant as it was at a point in time.
+    
+    Args:
+        restaurant_id: Restaurant identifier
+    
+    Query parameters:
+        at: ISO-8601 timestamp
+    """
+    try:
+        at = request.args.get("at")
+        if not at:
+            return jsonify({
+                "error": "Missing required parameter: at"
+            }), HTTPStatus.BAD_REQUEST
+        
+        try:
+            state = get_history().as_of(restaurant_id, at)
+        except ValueError:
+            return jsonify({
+                "error": f"Invalid timestamp: {at}"
+            }), HTTPStatus.BAD_REQUEST
+        
+        if state is None:
+            return jsonify({
+                "error": "No history for restaurant at the given time"
+            }), HTTPStatus.NOT_FOUND
+        
+        return jsonify({
+            "restaurant_id": restaurant_id,
+            "as_of": at,
+            "state": state
+        }), HTTPStatus.OK
+        
+    except Exception as e:
+        logger.error(f"Error in get_restaurant_as_of: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from http import HTTPStatus
+import logging
+from typing import Dict, Tuple
+
+from leaderboard import BOARDS, get_leaderboard_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+leaderboard_bp = Blueprint('leaderboard', __name__)
+
+@leaderboard_bp.route("/api/v1/leaderboards/<board>", methods=["GET"])
+def get_leaderboard(board: str) -> Tuple[Dict, int]:
+    """
+    Retrieve a restaurant leaderboard.
+    
+    Args:
+        board: Leaderboard name (top_rated or most_reviewed)
+    
+    Query parameters:
+        zipcode: Restrict to a single zipcode (optional)
+        limit: Number of entries to return (optional)
+    """
+    try:
+        if board not in BOARDS:
+            return jsonify({
+                "error": f"Unknown leaderboard: {board}"
+            }), HTTPStatus.NOT_FOUND
+        
+        zipcode = request.args.get("zipcode")
+        limit = request.args.get("limit", type=int)
+        
+        return jsonify({
+            "board": board,
+            "zipcode": zipcode,
+            "entries": get_leaderboard_service().top(board, zipcode, limit)
+        }), HTTPStatus.OK
+        
+    except Exception as e:
+        logger.error(f"Error in get_leaderboard: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
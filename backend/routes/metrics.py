@@ -0,0 +1,36 @@
+from flask import Blueprint, Response, jsonify
+from http import HTTPStatus
+import logging
+from typing import Dict, Tuple
+
+from metrics import render_metrics, slow_commands
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics() -> Response:
+    """
+    Expose the server's metrics in the Prometheus text format.
+    
+    Under gunicorn this is every worker's metrics summed (other workers'
+    as of their last snapshot); slow-command logs stay per worker.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@metrics_bp.route("/metrics/slow-commands", methods=["GET"])
+def get_slow_commands() -> Tuple[Dict, int]:
+    """Recent slow MongoDB commands with their filter shape and explain summary."""
+    try:
+        return jsonify({
+            "slow_commands": slow_commands()
+        }), HTTPStatus.OK
+        
+    except Exception as e:
+        logger.error(f"Error in get_slow_commands: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
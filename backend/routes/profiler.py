@@ -0,0 +1,112 @@
+from flask import Blueprint, Response, request, jsonify
+from http import HTTPStatus
+import hmac
+import logging
+from typing import Dict, Tuple, Union
+
+from config import PROFILER_TOKEN, PROFILER_MAX_SECONDS
+from profiler import read_profile, start_profile
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint (only registered when PROFILER_TOKEN is set)
+profiler_bp = Blueprint('profiler', __name__)
+
+def _authorized() -> bool:
+    supplied = request.headers.get("X-Profiler-Token", "")
+    if not supplied and request.headers.get("Authorization", "").startswith("Bearer "):
+        supplied = request.headers["Authorization"][len("Bearer "):]
+    return bool(PROFILER_TOKEN) and hmac.compare_digest(supplied.encode(), PROFILER_TOKEN.encode())
+
+@profiler_bp.route("/debug/profile", methods=["POST"])
+def start_run() -> Tuple[Dict, int]:
+    """
+    Start sampling every thread of this worker over live traffic.
+    
+    Sampling runs on a background thread, so this returns at once and the
+    worker goes on serving requests; fetch the result from the returned
+    `result_url` once `seconds` have passed.
+    
+    Query parameters:
+        seconds: Sampling duration (default 10, capped by PROFILER_MAX_SECONDS)
+        interval_ms: Time between samples (default 5)
+    """
+    try:
+        if not _authorized():
+            return jsonify({
+                "error": "Unauthorized"
+            }), HTTPStatus.UNAUTHORIZED
+        
+        seconds = min(float(request.args.get("seconds", 10)), PROFILER_MAX_SECONDS)
+        interval = max(float(request.args.get("interval_ms", 5)), 1.0) / 1000
+        if seconds <= 0:
+            return jsonify({
+                "error": "Invalid seconds"
+            }), HTTPStatus.BAD_REQUEST
+        
+        profile_id = start_profile(seconds, interval)
+        if profile_id is None:
+            return jsonify({
+                "error": "A profile is already running"
+            }), HTTPStatus.CONFLICT
+        
+        return jsonify({
+            "id": profile_id,
+            "seconds": seconds,
+            "result_url": f"/debug/profile/{profile_id}"
+        }), HTTPStatus.ACCEPTED
+        
+    except ValueError:
+        return jsonify({
+            "error": "Invalid seconds or interval_ms"
+        }), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        logger.error(f"Error in start_run: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+@profiler_bp.route("/debug/profile/<profile_id>", methods=["GET"])
+def get_run(profile_id: str) -> Union[Response, Tuple[Dict, int]]:
+    """
+    Fetch a profile started with POST /debug/profile, from any worker.
+    
+    Query parameters:
+        format: 'collapsed' (flamegraph-ready text, default) or 'json' (top frames)
+    
+    Returns 202 while the profile is still sampling.
+    """
+    try:
+        if not _authorized():
+            return jsonify({
+                "error": "Unauthorized"
+            }), HTTPStatus.UNAUTHORIZED
+        
+        output = request.args.get("format", "collapsed")
+        if output not in ("collapsed", "json"):
+            return jsonify({
+                "error": "Invalid format"
+            }), HTTPStatus.BAD_REQUEST
+        
+        try:
+            state = read_profile(profile_id, output)
+        except ValueError:
+            state = {"status": "unknown"}
+        if state["status"] == "unknown":
+            return jsonify({
+                "error": f"Unknown profile: {profile_id}"
+            }), HTTPStatus.NOT_FOUND
+        if state["status"] == "running":
+            return jsonify(state), HTTPStatus.ACCEPTED
+        
+        if output == "json":
+            return jsonify(state["result"]), HTTPStatus.OK
+        return Response(state["result"], mimetype="text/plain",
+                        headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+        
+    except Exception as e:
+        logger.error(f"Error in get_run: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,66 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from http import HTTPStatus
+import json
+import logging
+from typing import Dict, Iterator, Tuple
+
+from config import COLLECTIONS, DEDUPE_MODE, get_db, get_validators
+from dedupe import get_dedupe_index
+from ingest import BulkReviewIngester, iter_lines
+from sentiment import get_sentiment_model
+from utils import log_activity
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+reviews_bp = Blueprint('reviews', __name__)
+
+@reviews_bp.route("/api/v1/reviews/bulk", methods=["POST"])
+def bulk_reviews() -> Tuple[Dict, int]:
+    """
+    Ingest many critic reviews from a JSONL request body.
+
+    Each line is {"restaurant_id" or "restaurant", "critic", "review", "rating"};
+    `critic` defaults to the submitting user. Near-duplicate reviews are
+    flagged or rejected according to DEDUPE_MODE. The response is NDJSON, one
+    result per input line in completion order ({"line", "status", ...}), then
+    a final {"summary": ...} line with per-stage and end-to-end throughput.
+
+    Query parameters:
+        username: Submitting user (required)
+    """
+    try:
+        username = request.args.get("username")
+        if not username:
+            return jsonify({
+                "error": "Missing required fields"
+            }), HTTPStatus.BAD_REQUEST
+
+        ingester = BulkReviewIngester(
+            get_db()[COLLECTIONS['RESTAURANTS']],
+            get_sentiment_model(),
+            validator=get_validators().get(COLLECTIONS['RESTAURANTS']),
+            actor=username,
+            dedupe=get_dedupe_index() if DEDUPE_MODE != 'off' else None
+        )
+        stream = request.stream
+
+        def generate() -> Iterator[str]:
+            for result in ingester.ingest(iter_lines(stream)):
+                yield json.dumps(result) + "\n"
+            summary = ingester.summary()
+            yield json.dumps({"summary": summary}) + "\n"
+            log_activity(
+                username=username,
+                action="bulk_reviews",
+                details={key: summary[key] for key in ("lines", "written", "failed", "elapsed_s")}
+            )
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    except Exception as e:
+        logger.error(f"Error in bulk_reviews: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
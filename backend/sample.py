@@ -1,10 +1,5 @@
-from transformers import pipeline
+from sentiment import get_sentiment_model
 
-sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert/distilbert-base-uncased-finetuned-sst-2-english")
 data = ["fucking hate you"]
-sentiment_label = sentiment_pipeline(data)[0]
-if sentiment_label["label"] == "NEGATIVE":
-    score = -1*sentiment_label["score"]
-else:
-    score = sentiment_label["score"]
-print(score)
\ No newline at end of file
+score = get_sentiment_model().predict(data)[0]
+print(score)
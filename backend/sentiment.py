@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from config import SENTIMENT_CACHE_DIR, SENTIMENT_MODE, SENTIMENT_THREADS
+from metrics import SENTIMENT_LATENCY
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+INFERENCE_MODES = ("fp32", "int8")
+
+
+class SentimentModel:
+    """
+    CPU sentiment scorer returning a signed score in [-1, 1].
+
+    In 'int8' mode the linear layers are dynamically quantized to int8. The
+    quantized model is cached on disk so later starts skip quantization.
+    torch and transformers are only imported by `load`, keeping imports of
+    this module (and the Flask app) cheap.
+    """
+
+    def __init__(self, mode: str = SENTIMENT_MODE, num_threads: int = SENTIMENT_THREADS,
+                 cache_dir: str = SENTIMENT_CACHE_DIR):
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unsupported inference mode: {mode}")
+        self.mode = mode
+        self.num_threads = num_threads
+        self.cache_dir = Path(cache_dir)
+        self.tokenizer = None
+        self.model = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def cache_path(self) -> Path:
+        import torch
+
+        # Pickled quantized modules are tied to the torch version that wrote them
+        return self.cache_dir / f"{MODEL_NAME.replace('/', '--')}-int8-torch{torch.__version__}.pt"
+
+    def load(self) -> "SentimentModel":
+        """Load the tokenizer and model for the configured mode."""
+        if self.model is not None:
+            return self
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        if self.num_threads > 0:
+            torch.set_num_threads(self.num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+        if self.mode == "int8" and self.cache_path.exists():
+            self.model = torch.load(self.cache_path, weights_only=False)
+        else:
+            model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+            if self.mode == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_path.with_suffix(".tmp")
+                torch.save(model, tmp_path)
+                os.replace(tmp_path, self.cache_path)
+                logger.info(f"Cached quantized sentiment model at {self.cache_path}")
+            self.model = model
+        self.model.eval()
+        return self
+
+    def predict(self, texts: List[str], batch_size: int = 32) -> List[float]:
+        """
+        Score texts.
+
+        Args:
+            texts: Review texts
+            batch_size: Texts per forward pass
+
+        Returns:
+            Positive probability for positive texts, negated negative probability otherwise
+        """
+        import torch
+
+        self.load()
+        negative = self._negative_label()
+        scores: List[float] = []
+        with SENTIMENT_LATENCY.time(mode=self.mode), torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                        return_tensors="pt")
+                probabilities = torch.softmax(self.model(**inputs).logits, dim=-1)
+                confidence, labels = probabilities.max(dim=-1)
+                for label, score in zip(labels.tolist(), confidence.tolist()):
+                    scores.append(-score if label == negative else score)
+        return scores
+
+    def _negative_label(self) -> int:
+        for label_id, label in self.model.config.id2label.items():
+            if label.upper() == "NEGATIVE":
+                return int(label_id)
+        return 0
+
+
+_model: Optional[SentimentModel] = None
+_model_lock = threading.Lock()
+
+
+def get_sentiment_model() -> SentimentModel:
+    """Return the process-wide sentiment model in the configured mode, loading it on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = SentimentModel()
+        _model.load()
+        return _model
+
+
+def is_model_loaded() -> bool:
+    """Whether the process-wide model is warm, without triggering a load."""
+    return _model is not None and _model.loaded
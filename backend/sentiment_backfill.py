@@ -0,0 +1,230 @@
+import argparse
+import copy
+import logging
+import multiprocessing
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+import events
+from audit import audit_listener
+from config import AUDIT_ENABLED, COLLECTIONS, SENTIMENT_MODE, get_db
+from critic_stats import critic_stats_listener
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = ".sentiment-backfill.checkpoint"
+ACTOR = "sentiment-backfill"
+
+# Set in each pool worker by `_init_worker`
+_worker_model = None
+
+
+def _init_worker(mode: str, threads: int) -> None:
+    """Load the sentiment model once per worker process."""
+    global _worker_model
+    from sentiment import SentimentModel
+
+    _worker_model = SentimentModel(mode=mode, num_threads=threads).load()
+
+
+def _score(texts: List[str]) -> List[float]:
+    return _worker_model.predict(texts)
+
+
+def _needs_score(review: Dict[str, Any], rescore_all: bool) -> bool:
+    return bool(review.get("review")) and (rescore_all or review.get("sentiment_score") is None)
+
+
+def _reviews_to_score(doc: Dict[str, Any], rescore_all: bool) -> List[Dict[str, Any]]:
+    """Reviews needing a score, one per (name, review) so array filters never overlap."""
+    seen, reviews = set(), []
+    for review in doc.get("critic_reviews") or []:
+        key = (review.get("name"), review.get("review"))
+        if key not in seen and _needs_score(review, rescore_all):
+            seen.add(key)
+            reviews.append(review)
+    return reviews
+
+
+def _update_for(doc: Dict[str, Any], reviews: List[Dict[str, Any]], scores: List[float],
+                when: datetime) -> UpdateOne:
+    """One update per restaurant, one array filter per scored review."""
+    updates, array_filters = {"updated_at": when}, []
+    for i, (review, score) in enumerate(zip(reviews, scores)):
+        updates[f"critic_reviews.$[r{i}].sentiment_score"] = float(score)
+        array_filters.append({f"r{i}.name": review.get("name"), f"r{i}.review": review.get("review")})
+    return UpdateOne({"_id": doc["_id"]}, {"$set": updates}, array_filters=array_filters)
+
+
+def _write_event(doc: Dict[str, Any], reviews: List[Dict[str, Any]], scores: List[float],
+                 when: datetime) -> Dict[str, Any]:
+    """Write event for one restaurant's update, with the scores applied to every matching review."""
+    by_key = {(review.get("name"), review.get("review")): float(score) for review, score in zip(reviews, scores)}
+    after = copy.deepcopy(doc)
+    after["updated_at"] = when
+    for review in after.get("critic_reviews") or []:
+        key = (review.get("name"), review.get("review"))
+        if key in by_key:
+            review["sentiment_score"] = by_key[key]
+    return {
+        "collection": COLLECTIONS['RESTAURANTS'],
+        "operation": "update",
+        "filter": {"_id": doc["_id"]},
+        "changes": {"critic_reviews": after.get("critic_reviews")},
+        "before": [doc],
+        "after": [after],
+        "actor": ACTOR,
+        "timestamp": when
+    }
+
+
+class Checkpoint:
+    """Last fully written restaurant `_id`, persisted atomically."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def load(self) -> Tuple[Optional[Any], int]:
+        if not self.path.exists():
+            return None, 0
+        state = json_util.loads(self.path.read_text())
+        return state.get("last_id"), state.get("reviews", 0)
+
+    def save(self, last_id: Any, reviews: int) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json_util.dumps({"last_id": last_id, "reviews": reviews}))
+        os.replace(tmp_path, self.path)
+
+
+def backfill(restaurants: Collection, workers: int = 1, batch_size: int = 500, chunk_size: int = 64,
+             mode: str = SENTIMENT_MODE, rescore_all: bool = False, checkpoint: Optional[Checkpoint] = None,
+             dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Recompute review sentiment scores across the restaurants collection.
+
+    Restaurants are streamed in `_id` order. Each batch's reviews are scored
+    by a process pool and written back with one `bulk_write` of array-filter
+    updates. After each write the last `_id` is checkpointed, so a rerun
+    resumes after the last completed batch, and a write event per updated
+    restaurant is published (see `events.py`) so derived views such as
+    `critic_stats` pick up the new scores.
+
+    Args:
+        restaurants: The `restaurants` collection
+        workers: Pool size; each worker loads the model once
+        batch_size: Restaurants per read/write round
+        chunk_size: Reviews per pool task
+        mode: Sentiment inference mode ('fp32' or 'int8')
+        rescore_all: Rescore every review, not only those without a score
+        checkpoint: Where to persist progress, None to always start over
+        dry_run: Score but do not write results or checkpoints
+
+    Returns:
+        Summary with reviews scored, elapsed seconds and reviews/sec
+    """
+    last_id, scored = checkpoint.load() if checkpoint else (None, 0)
+    if last_id is not None:
+        logger.info(f"Resuming after _id {last_id} ({scored} reviews already scored)")
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    session_scored = 0
+
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker,
+                                                   initargs=(mode, threads)) as pool:
+        # Wait for the workers to load the model so throughput excludes startup
+        pool.map(_score, [["warm up"]] * workers, chunksize=1)
+        started = time.perf_counter()
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(restaurants.find(query, {"restaurant_id": 1, "avg_rating": 1, "critic_reviews": 1})
+                         .sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+
+            pending = []
+            for doc in batch:
+                reviews = _reviews_to_score(doc, rescore_all)
+                if reviews:
+                    pending.append((doc, reviews))
+            texts = [review["review"] for _, reviews in pending for review in reviews]
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            scores = [score for chunk_scores in pool.map(_score, chunks) for score in chunk_scores]
+
+            operations, write_events, position = [], [], 0
+            now = datetime.now(timezone.utc)
+            for doc, reviews in pending:
+                doc_scores = scores[position:position + len(reviews)]
+                operations.append(_update_for(doc, reviews, doc_scores, now))
+                write_events.append(_write_event(doc, reviews, doc_scores, now))
+                position += len(reviews)
+
+            last_id = batch[-1]["_id"]
+            session_scored += len(texts)
+            if not dry_run:
+                if operations:
+                    restaurants.bulk_write(operations, ordered=False)
+                    for event in write_events:
+                        events.publish(event)
+                if checkpoint:
+                    checkpoint.save(last_id, scored + session_scored)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Scored {scored + session_scored} reviews, {session_scored / elapsed:.1f} reviews/sec")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "reviews": session_scored,
+        "elapsed_s": elapsed,
+        "reviews_per_sec": session_scored / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Backfill critic review sentiment scores")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="Pool size; several values run a scaling comparison (implies --dry-run)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--mode", choices=["fp32", "int8"], default=SENTIMENT_MODE)
+    parser.add_argument("--rescore-all", action="store_true", help="Rescore reviews that already have a score")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    restaurants = get_db()[COLLECTIONS['RESTAURANTS']]
+    # The views persisted in MongoDB; the API's in-memory views reload on restart
+    events.subscribe(critic_stats_listener)
+    if AUDIT_ENABLED:
+        events.subscribe(audit_listener)
+    scaling = len(args.workers) > 1
+    checkpoint = None if scaling else Checkpoint(args.checkpoint)
+    if checkpoint and args.restart and checkpoint.path.exists():
+        checkpoint.path.unlink()
+
+    results = [
+        backfill(restaurants, workers, args.batch_size, args.chunk_size, args.mode, args.rescore_all or scaling,
+                 checkpoint, args.dry_run or scaling)
+        for workers in args.workers
+    ]
+    print(f"{'workers':>8} {'reviews':>9} {'seconds':>9} {'reviews/s':>10} {'speedup':>8}")
+    for result in results:
+        speedup = result["reviews_per_sec"] / results[0]["reviews_per_sec"] if results[0]["reviews_per_sec"] else 0.0
+        print(f"{result['workers']:>8} {result['reviews']:>9} {result['elapsed_s']:>9.1f} "
+              f"{result['reviews_per_sec']:>10.1f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
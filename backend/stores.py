@@ -0,0 +1,402 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+from pymongo.database import Database
+
+from config import (
+    COLLECTIONS, ACTIVITY_STORE, ACTIVITY_DB_PATH, ACTIVITY_BATCH_SIZE, ACTIVITY_FLUSH_INTERVAL, get_db
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Records are plain dicts with ISO-8601 timestamps, as returned by the API:
+#   activity: {"username", "action", "timestamp", "details"}
+#   chat:     {"username", "message", "timestamp"}
+
+
+def _timestamp(timestamp: Optional[datetime]) -> str:
+    return (timestamp or datetime.utcnow()).isoformat()
+
+
+def _int_cursor(after: Optional[str]) -> int:
+    if not after:
+        return -1
+    if not after.isdigit():
+        raise ValueError(f"Invalid cursor: {after}")
+    return int(after)
+
+
+class ActivityStore(ABC):
+    """
+    Storage interface for user activity and chat history.
+
+    Reads return a user's records oldest first. Implementations must be
+    safe to share between threads; the sqlite and Mongo stores are also
+    safe to use from several server processes at once.
+    """
+
+    @abstractmethod
+    def append_activity(self, username: str, action: str, details: Dict,
+                        timestamp: Optional[datetime] = None) -> None:
+        ...
+
+    @abstractmethod
+    def activities(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def iter_activities(self, username: str, after: Optional[str] = None,
+                        batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream a user's activity in insertion order, one batch in memory at a time.
+
+        Args:
+            username: User's identifier
+            after: Resume after the record with this cursor
+            batch_size: Records read per query
+
+        Yields:
+            (cursor, record) pairs; cursors are opaque strings
+        """
+
+    @abstractmethod
+    def activity_version(self, username: str) -> str:
+        """Opaque value that changes whenever the user's activity changes."""
+
+    @abstractmethod
+    def append_chat(self, username: str, message: str, timestamp: Optional[datetime] = None) -> None:
+        ...
+
+    @abstractmethod
+    def chats(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        ...
+
+    def flush(self) -> None:
+        """Make buffered appends durable and visible to other processes."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemoryActivityStore(ActivityStore):
+    """Per-process lists; only correct with a single server process."""
+
+    def __init__(self):
+        self._activities: List[Dict[str, Any]] = []
+        # Username -> positions of its records in _activities, ascending
+        self._positions: Dict[str, List[int]] = {}
+        self._chats: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def append_activity(self, username: str, action: str, details: Dict,
+                        timestamp: Optional[datetime] = None) -> None:
+        with self._lock:
+            self._positions.setdefault(username, []).append(len(self._activities))
+            self._activities.append({
+                "username": username,
+                "action": action,
+                "timestamp": _timestamp(timestamp),
+                "details": details
+            })
+
+    def activities(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            positions = self._positions.get(username, [])
+            records = [self._activities[index] for index in (positions[-limit:] if limit else positions)]
+        return records
+
+    def iter_activities(self, username: str, after: Optional[str] = None,
+                        batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Appends never move records, so the list position is a stable cursor
+        position = _int_cursor(after) + 1
+        while True:
+            with self._lock:
+                positions = self._positions.get(username, [])
+                start = bisect.bisect_left(positions, position)
+                batch = [(index, self._activities[index]) for index in positions[start:start + batch_size]]
+            if not batch:
+                return
+            for index, record in batch:
+                yield str(index), record
+            position = batch[-1][0] + 1
+
+    def activity_version(self, username: str) -> str:
+        with self._lock:
+            positions = self._positions.get(username, [])
+            return f"{len(positions)}-{positions[-1] if positions else 0}"
+
+    def append_chat(self, username: str, message: str, timestamp: Optional[datetime] = None) -> None:
+        with self._lock:
+            self._chats.append({"username": username, "message": message, "timestamp": _timestamp(timestamp)})
+
+    def chats(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = [record for record in self._chats if record["username"] == username]
+        return records[-limit:] if limit else records
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activity_username_timestamp ON activity (username, timestamp);
+CREATE INDEX IF NOT EXISTS activity_username_id ON activity (username, id);
+CREATE TABLE IF NOT EXISTS chat (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    message TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chat_username_timestamp ON chat (username, timestamp);
+CREATE TABLE IF NOT EXISTS activity_version (
+    username TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+class SqliteActivityStore(ActivityStore):
+    """
+    Local sqlite database in WAL mode, shared by every process on the host.
+
+    Appends are buffered and committed together once `batch_size` records
+    are pending or `flush_interval` seconds have passed, so a burst of
+    requests costs one fsync rather than one each. A process always sees its
+    own pending appends; other processes see them after the next commit.
+    """
+
+    def __init__(self, path: str = ACTIVITY_DB_PATH, batch_size: int = ACTIVITY_BATCH_SIZE,
+                 flush_interval: float = ACTIVITY_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending_activities: List[tuple] = []
+        self._pending_chats: List[tuple] = []
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork: reopen in each new process
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SQLITE_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+            self._pending_activities, self._pending_chats = [], []
+            self._thread = threading.Thread(target=self._run, name="activity-flusher", daemon=True)
+            self._thread.start()
+        return self._connection
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Error flushing activity store: {str(e)}")
+
+    def _append(self, table: str, row: tuple) -> None:
+        with self._lock:
+            self._connect()
+            pending = self._pending_activities if table == "activity" else self._pending_chats
+            pending.append(row)
+            if len(self._pending_activities) + len(self._pending_chats) >= self.batch_size:
+                self.flush()
+
+    def append_activity(self, username: str, action: str, details: Dict,
+                        timestamp: Optional[datetime] = None) -> None:
+        self._append("activity", (username, action, _timestamp(timestamp), json.dumps(details, default=str)))
+
+    def append_chat(self, username: str, message: str, timestamp: Optional[datetime] = None) -> None:
+        self._append("chat", (username, message, _timestamp(timestamp)))
+
+    def flush(self) -> None:
+        with self._lock:
+            if not (self._pending_activities or self._pending_chats) or self._pid != os.getpid():
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT INTO activity (username, action, timestamp, details) VALUES (?, ?, ?, ?)",
+                    self._pending_activities
+                )
+                self._connection.executemany(
+                    "INSERT INTO chat (username, message, timestamp) VALUES (?, ?, ?)",
+                    self._pending_chats
+                )
+                # Per-user append counter, so activity_version never has to count rows
+                self._connection.executemany(
+                    "INSERT INTO activity_version (username, version) VALUES (?, ?) "
+                    "ON CONFLICT (username) DO UPDATE SET version = version + excluded.version",
+                    Counter(row[0] for row in self._pending_activities).items()
+                )
+            self._pending_activities, self._pending_chats = [], []
+
+    def _select(self, sql: str, username: str, limit: Optional[int]) -> List[tuple]:
+        with self._lock:
+            connection = self._connect()
+            self.flush()
+            if limit:
+                rows = connection.execute(sql + " ORDER BY timestamp DESC, id DESC LIMIT ?",
+                                          (username, limit)).fetchall()
+                return rows[::-1]
+            return connection.execute(sql + " ORDER BY timestamp, id", (username,)).fetchall()
+
+    def activities(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._select("SELECT username, action, timestamp, details FROM activity WHERE username = ?",
+                            username, limit)
+        return [
+            {"username": row[0], "action": row[1], "timestamp": row[2], "details": json.loads(row[3])}
+            for row in rows
+        ]
+
+    def iter_activities(self, username: str, after: Optional[str] = None,
+                        batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Keyset pagination on the rowid: each batch is an indexed range scan,
+        # and the lock is released between batches so writers are not blocked
+        last_id = _int_cursor(after)
+        while True:
+            with self._lock:
+                connection = self._connect()
+                self.flush()
+                rows = connection.execute(
+                    "SELECT id, username, action, timestamp, details FROM activity "
+                    "WHERE username = ? AND id > ? ORDER BY id LIMIT ?",
+                    (username, last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield str(row[0]), {"username": row[1], "action": row[2], "timestamp": row[3],
+                                    "details": json.loads(row[4])}
+            last_id = rows[-1][0]
+
+    def activity_version(self, username: str) -> str:
+        with self._lock:
+            connection = self._connect()
+            self.flush()
+            version, last_id = connection.execute(
+                "SELECT (SELECT version FROM activity_version WHERE username = ?), "
+                "(SELECT MAX(id) FROM activity WHERE username = ?)", (username, username)
+            ).fetchone()
+        return f"{version or 0}-{last_id or 0}"
+
+    def chats(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._select("SELECT username, message, timestamp FROM chat WHERE username = ?", username, limit)
+        return [{"username": row[0], "message": row[1], "timestamp": row[2]} for row in rows]
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self.flush()
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+class MongoActivityStore(ActivityStore):
+    """Activity and chat collections in MongoDB, indexed on (username, timestamp)."""
+
+    def __init__(self, db: Database):
+        self.activity = db[COLLECTIONS['ACTIVITY']]
+        self.chat = db[COLLECTIONS['CHAT_HISTORY']]
+        # Per-user append counters, keyed by username
+        self.versions = db[COLLECTIONS['ACTIVITY_VERSIONS']]
+        for collection in (self.activity, self.chat):
+            collection.create_index([("username", ASCENDING), ("timestamp", ASCENDING)])
+        # Keyset pagination for exports
+        self.activity.create_index([("username", ASCENDING), ("_id", ASCENDING)])
+
+    def append_activity(self, username: str, action: str, details: Dict,
+                        timestamp: Optional[datetime] = None) -> None:
+        self.activity.insert_one({
+            "username": username,
+            "action": action,
+            "timestamp": _timestamp(timestamp),
+            "details": details
+        })
+        self.versions.update_one({"_id": username}, {"$inc": {"version": 1}}, upsert=True)
+
+    def append_chat(self, username: str, message: str, timestamp: Optional[datetime] = None) -> None:
+        self.chat.insert_one({"username": username, "message": message, "timestamp": _timestamp(timestamp)})
+
+    def _find(self, collection: Any, username: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+        cursor = collection.find({"username": username}, {"_id": 0})
+        if limit:
+            return list(cursor.sort([("timestamp", -1), ("_id", -1)]).limit(limit))[::-1]
+        return list(cursor.sort([("timestamp", ASCENDING), ("_id", ASCENDING)]))
+
+    def activities(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._find(self.activity, username, limit)
+
+    def iter_activities(self, username: str, after: Optional[str] = None,
+                        batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        query: Dict[str, Any] = {"username": username}
+        if after:
+            try:
+                query["_id"] = {"$gt": ObjectId(after)}
+            except InvalidId:
+                raise ValueError(f"Invalid cursor: {after}")
+        cursor = self.activity.find(query, batch_size=batch_size).sort("_id", ASCENDING)
+        for record in cursor:
+            yield str(record.pop("_id")), record
+
+    def activity_version(self, username: str) -> str:
+        last = self.activity.find_one({"username": username}, {"_id": 1}, sort=[("_id", -1)])
+        counter = self.versions.find_one({"_id": username})
+        return f"{counter['version'] if counter else 0}-{last['_id'] if last else 0}"
+
+    def chats(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._find(self.chat, username, limit)
+
+
+def create_activity_store(kind: str = ACTIVITY_STORE) -> ActivityStore:
+    """
+    Build an activity store.
+
+    Args:
+        kind: 'sqlite', 'mongo' or 'memory'
+
+    Returns:
+        The store
+    """
+    if kind == "sqlite":
+        return SqliteActivityStore()
+    if kind == "mongo":
+        return MongoActivityStore(get_db())
+    if kind == "memory":
+        return MemoryActivityStore()
+    raise ValueError(f"Unknown activity store: {kind}")
+
+
+_store: Optional[ActivityStore] = None
+_store_lock = threading.Lock()
+
+
+def get_activity_store() -> ActivityStore:
+    """Return the process-wide activity store in the configured backend."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_activity_store()
+            atexit.register(_store.close)
+        return _store
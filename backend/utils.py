@@ -1,6 +1,11 @@
 from datetime import datetime
 from typing import Dict
-from models import activity_logs
+from stores import get_activity_store
+from config import AUDIT_ENABLED, LLM_BACKEND
+from audit import record_activity
+from hub import publish_activity
+from metrics import LLM_LATENCY
+from llm import get_llm_client
 
 def log_activity(username: str, action: str, details: Dict) -> None:
     """
@@ -11,22 +16,30 @@ def log_activity(username: str, action: str, details: Dict) -> None:
         action: Type of action performed
         details: Additional information about the action
     """
-    activity_logs.append({
-        "username": username,
-        "action": action,
-        "timestamp": datetime.utcnow().isoformat(),
-        "details": details
-    })
+    timestamp = datetime.utcnow()
+    get_activity_store().append_activity(username, action, details, timestamp)
+    publish_activity({"username": username, "action": action, "timestamp": timestamp.isoformat(), "details": details})
+    if AUDIT_ENABLED:
+        record_activity(username, action, details)
 
+@LLM_LATENCY.timed()
 def generate_llm_response(input1: str, input2: str) -> str:
     """
-    Placeholder for LLM response generation.
+    Generate an LLM response through the shared client (see llm.py).
+
+    Identical concurrent requests share one upstream call. The simulated
+    backend answers directly, without the client's rate limit and threads.
     
     Args:
         input1: First input parameter
         input2: Second input parameter
     
     Returns:
-        Simulated LLM response
+        The model's response (simulated unless LLM_BACKEND is set)
+
+    Raises:
+        LLMError: The model did not answer in time or the call failed
     """
-    return f"Simulated LLM response for inputs: {input1} and {input2}"
+    if LLM_BACKEND == 'simulated':
+        return f"Simulated LLM response for inputs: {input1} and {input2}"
+    return get_llm_client().generate(f"{input1}\n\n{input2}")
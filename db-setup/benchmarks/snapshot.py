@@ -0,0 +1,100 @@
+"""
+Full scan from a columnar snapshot versus a Mongo cursor scan.
+
+Both sides compute the review count and mean review rating over every
+restaurant. The Mongo side needs a MongoDB at MONGO_URI (or pass
+--mongo-uri) and is skipped with --skip-mongo. Run from the db-setup
+directory:
+
+    python -m benchmarks.snapshot --restaurants 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import ObjectId
+from pymongo import MongoClient
+
+from constants import COLLECTIONS, MONGO_URI
+from snapshot import RestaurantSnapshot
+
+
+def make_restaurants(count: int, per_restaurant: int, rng: random.Random):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        yield {
+            "_id": ObjectId(),
+            "restaurant_id": str(i),
+            "name": f"Restaurant {i}",
+            "address": {"building": str(i), "coord": [-86.5 + rng.random() / 10, 39.1 + rng.random() / 10],
+                        "street": "East Kirkwood Avenue", "zipcode": f"474{rng.randrange(100):02d}"},
+            "avg_rating": rng.uniform(1, 5),
+            "critic_reviews": [
+                {"name": f"Critic {rng.randrange(5000)}", "review": "Fresh ingredients, slow service.",
+                 "rating": float(rng.randint(1, 5)), "sentiment_score": rng.uniform(-1, 1)}
+                for _ in range(per_restaurant)
+            ],
+            "created_at": start,
+            "updated_at": start + timedelta(seconds=i)
+        }
+
+
+def timed(label: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:10.1f} ms   {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=100_000)
+    parser.add_argument("--per-restaurant", type=int, default=10)
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--database", default="food-critic-reviews-bench")
+    parser.add_argument("--skip-mongo", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = RestaurantSnapshot(directory)
+        start = time.perf_counter()
+        snapshot.export(make_restaurants(args.restaurants, args.per_restaurant, random.Random(42)))
+        print(f"Export: {time.perf_counter() - start:.1f}s")
+
+        def column_scan():
+            parts = snapshot.parts()
+            ratings = np.concatenate([np.asarray(part.reviews["rating"]) for part in parts])
+            return len(ratings), round(float(ratings.mean()), 4)
+
+        def document_scan():
+            count, total = 0, 0.0
+            for doc in snapshot.documents():
+                for review in doc["critic_reviews"]:
+                    count += 1
+                    total += review["rating"]
+            return count, round(total / count, 4)
+
+        timed("snapshot memmap column scan", column_scan)
+        timed("snapshot document scan", document_scan)
+
+    if not args.skip_mongo:
+        collection = MongoClient(args.mongo_uri)[args.database][COLLECTIONS["RESTAURANTS"]]
+        collection.drop()
+        docs = list(make_restaurants(args.restaurants, args.per_restaurant, random.Random(42)))
+        collection.insert_many(docs, ordered=False)
+
+        def cursor_scan():
+            count, total = 0, 0.0
+            for doc in collection.find({}, {"critic_reviews.rating": 1}):
+                for review in doc["critic_reviews"]:
+                    count += 1
+                    total += review["rating"]
+            return count, round(total / count, 4)
+
+        timed("mongo cursor scan", cursor_scan)
+
+
+if __name__ == "__main__":
+    main()
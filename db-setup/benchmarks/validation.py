@@ -0,0 +1,92 @@
+"""
+Compiled client-side validation versus the generic jsonschema library.
+
+Both validators enforce the same VALIDATION_SCHEMAS: for jsonschema the
+`bsonType` keywords become `type` keywords backed by a type checker with
+the same BSON type predicates. Documents come from the synthetic
+generator. About a tenth of them are corrupted (bad zipcode, rating above
+5, missing field) so both valid and invalid paths are timed, and the two
+validators must agree on which documents are invalid. Run from the
+db-setup directory:
+
+    python -m benchmarks.validation --restaurants 20000
+"""
+import argparse
+import copy
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+import jsonschema
+
+from constants import VALIDATION_SCHEMAS
+from generate import SyntheticData
+from main import RestaurantReviewsDB
+from validation import BSON_TYPES, compile_validators
+
+
+def to_json_schema(node: Any) -> Any:
+    """Rename `bsonType` to `type` throughout a schema."""
+    if isinstance(node, dict):
+        return {('type' if key == 'bsonType' else key): to_json_schema(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [to_json_schema(value) for value in node]
+    return node
+
+
+def jsonschema_validator(collection: str) -> Callable[[Dict[str, Any]], List[str]]:
+    type_checker = jsonschema.Draft7Validator.TYPE_CHECKER.redefine_many({
+        name: (lambda predicate: lambda checker, value: predicate(value))(predicate)
+        for name, predicate in BSON_TYPES.items()
+    })
+    validator_class = jsonschema.validators.extend(jsonschema.Draft7Validator, type_checker=type_checker)
+    validator = validator_class(to_json_schema(VALIDATION_SCHEMAS[collection]['validator']['$jsonSchema']))
+    return lambda doc: [error.message for error in validator.iter_errors(doc)]
+
+
+def corrupt(doc: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    choice = rng.randrange(3)
+    if choice == 0:
+        doc['address']['zipcode'] = '4740'
+    elif choice == 1:
+        doc['critic_reviews'][0]['rating'] = 7.0
+    else:
+        del doc['avg_rating']
+    return doc
+
+
+def make_documents(count: int) -> List[Dict[str, Any]]:
+    loader = RestaurantReviewsDB.__new__(RestaurantReviewsDB)
+    restaurants, _ = SyntheticData(count, max(1, count // 20), shard_size=count).generate_shard(0)
+    docs = [loader._process_restaurant_doc(doc) for doc in restaurants]
+    rng = random.Random(0)
+    return [corrupt(doc, rng) if rng.random() < 0.1 else doc for doc in docs]
+
+
+def throughput(validate: Callable[[Dict[str, Any]], List[str]], docs: List[Dict[str, Any]]) -> tuple:
+    started = time.perf_counter()
+    invalid = [bool(validate(doc)) for doc in docs]
+    return len(docs) / (time.perf_counter() - started), invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--restaurants', type=int, default=20000)
+    args = parser.parse_args()
+
+    docs = make_documents(args.restaurants)
+    compiled = compile_validators(VALIDATION_SCHEMAS)['restaurants']
+    generic = jsonschema_validator('restaurants')
+
+    compiled_rate, compiled_invalid = throughput(compiled, docs)
+    generic_rate, generic_invalid = throughput(generic, docs)
+    print(f"{'validator':<12} {'docs/s':>10}")
+    print(f"{'compiled':<12} {compiled_rate:>10.0f}")
+    print(f"{'jsonschema':<12} {generic_rate:>10.0f}")
+    print(f"speedup {compiled_rate / generic_rate:.1f}x, {sum(compiled_invalid)} invalid documents, "
+          f"validators agree: {compiled_invalid == generic_invalid}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,10 @@ MONGO_URI = f"mongodb+srv://{DB_CONFIG['username']}:{DB_CONFIG['password']}@{DB_
 COLLECTIONS = {
     'RESTAURANTS': 'restaurants',
     'AUDIT': 'audit',
-    'USERS': 'users'
+    'USERS': 'users',
+    'LEADERBOARDS': 'leaderboards',
+    'CRITIC_STATS': 'critic_stats',
+    'AUDIT_SNAPSHOTS': 'audit_snapshots'
 }
 
 # Field Names
@@ -111,11 +114,12 @@ VALIDATION_SCHEMAS = {
                 'required': ['key', 'value', 'restaurant_id', 'action_by', 'action', 'time_of_action'],
                 'properties': {
                     'key': {'bsonType': 'string'},
-                    'value': {'bsonType': ['object', 'string', 'array', 'double', 'int']},
+                    'value': {'bsonType': ['object', 'string', 'array', 'double', 'int', 'binData']},
                     'restaurant_id': {'bsonType': 'string'},
                     'action_by': {'bsonType': 'string'},
                     'action': {'enum': ['insert', 'update', 'delete']},
-                    'time_of_action': {'bsonType': 'string'}
+                    'time_of_action': {'bsonType': 'date'},
+                    'encoding': {'enum': ['delta', 'zlib', 'delta+zlib']}
                 }
             }
         }
@@ -141,8 +145,16 @@ VALIDATION_SCHEMAS = {
 }
 
 # File Paths
+# Data paths may be a .json file, a .jsonl file or a directory of .jsonl files
+# (e.g. the output of generate.py)
 PATHS = {
-    'RESTAURANT_DATA': 'data/restaurant_reviews.json',
-    'AUDIT_DATA': 'data/audit_data.json',
-    'USER_DATA': 'data/users.json'
-}
\ No newline at end of file
+    'RESTAURANT_DATA': os.getenv('RESTAURANT_DATA', 'data/restaurant_reviews.json'),
+    'AUDIT_DATA': os.getenv('AUDIT_DATA', 'data/audit_data.json'),
+    'USER_DATA': os.getenv('USER_DATA', 'data/users.json'),
+    'SNAPSHOT_DIR': 'data/snapshot',
+    'GENERATED_DIR': 'data/generated'
+}
+
+# Loading
+# Documents per insert_many when streaming data files into a collection
+INSERT_BATCH_SIZE = int(os.getenv('INSERT_BATCH_SIZE', '10000'))
@@ -0,0 +1,369 @@
+import argparse
+import json
+import multiprocessing
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from constants import PATHS
+
+
+class GeneratorError(Exception):
+    """Exception raised for synthetic data generation issues"""
+    pass
+
+
+FIRST_NAMES = [
+    'Sarah', 'Mike', 'Emily', 'David', 'Jessica', 'Chris', 'Ashley', 'James', 'Amanda', 'Robert',
+    'Olivia', 'Daniel', 'Sophia', 'Matthew', 'Grace', 'Andrew', 'Chloe', 'Joshua', 'Hannah', 'Ryan',
+    'Priya', 'Wei', 'Carlos', 'Fatima', 'Kenji', 'Aisha', 'Luca', 'Mei', 'Omar', 'Elena'
+]
+LAST_NAMES = [
+    'Johnson', 'Thompson', 'Chen', 'Williams', 'Garcia', 'Martinez', 'Brown', 'Davis', 'Miller', 'Wilson',
+    'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'White', 'Harris', 'Clark', 'Lewis', 'Walker',
+    'Patel', 'Nguyen', 'Kim', 'Singh', 'Rossi', 'Tanaka', 'Haddad', 'Novak', 'Silva', 'Cohen'
+]
+NAME_PREFIXES = ['The', 'Little', 'Golden', 'Blue', 'Rustic', 'Urban', 'Old Town', 'Corner', 'Happy', 'Red']
+NAME_CUISINES = ['Bistro', 'Grill', 'Kitchen', 'Taqueria', 'Noodle Bar', 'Pizzeria', 'Diner', 'Cafe',
+                 'Smokehouse', 'Sushi House', 'Trattoria', 'Bakery', 'Curry House', 'Brasserie', 'Deli']
+STREETS = ['East Kirkwood Avenue', 'North College Avenue', 'South Walnut Street', 'West 3rd Street',
+           'East 10th Street', 'North Dunn Street', 'South Rogers Street', 'East 4th Street']
+
+# Review sentences by star rating; sentiment follows the rating
+REVIEW_PHRASES = {
+    1: ['Terrible experience, would not return.', 'The food arrived cold and bland.', 'Rude staff and a dirty table.'],
+    2: ['Overpriced for what you get.', 'Long wait and the order was wrong.', 'Portions were tiny and underseasoned.'],
+    3: ['Decent food but nothing special.', 'Fresh ingredients but the service was a bit slow.', 'Good value, average taste.'],
+    4: ['Really enjoyed the seasonal menu.', 'Friendly staff and a cozy atmosphere.', 'Great flavors, will come back.'],
+    5: ['Amazing experience, the best in town!', 'Outstanding dishes and perfect service.', 'An absolute gem, loved every bite.']
+}
+SENTIMENT_BY_RATING = {1: -0.8, 2: -0.4, 3: 0.1, 4: 0.55, 5: 0.9}
+
+# Zipcode cluster centers are spread over a region around Bloomington, IN
+REGION_CENTER = (-86.53, 39.17)
+REGION_SPREAD_DEG = 1.5
+CLUSTER_SPREAD_DEG = 0.01
+# Vectorized redraws of repeated critics before falling back to an exact per-restaurant draw
+CRITIC_REDRAW_ROUNDS = 8
+
+
+def zipf_probabilities(count: int, exponent: float) -> np.ndarray:
+    """Probability of rank 1..count under a Zipf law, as a cumulative distribution."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return np.cumsum(weights / weights.sum())
+
+
+def critic_name(index: int) -> str:
+    """Unique critic name for a critic index."""
+    combinations = len(FIRST_NAMES) * len(LAST_NAMES)
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return f"{first} {last}" if index < combinations else f"{first} {last} {index // combinations + 1}"
+
+
+class SyntheticData:
+    """
+    Seeded generator of restaurants, their audit trails and users.
+
+    Restaurants are generated in fixed-size shards, each from its own seed
+    derived from the base seed and the shard number, so the output only
+    depends on the seed and shard size and not on how many processes ran.
+    """
+
+    def __init__(self, restaurants: int, critics: int, seed: int = 0, shard_size: int = 50_000,
+                 review_exponent: float = 2.0, critic_exponent: float = 1.1, max_reviews: int = 200,
+                 start: datetime = datetime(2023, 1, 1, tzinfo=timezone.utc)):
+        if restaurants < 1 or critics < 1:
+            raise GeneratorError("Need at least one restaurant and one critic")
+        self.restaurants = restaurants
+        self.critics = critics
+        self.seed = seed
+        self.shard_size = shard_size
+        self.review_exponent = review_exponent
+        self.critic_exponent = critic_exponent
+        self.max_reviews = max_reviews
+        self.start = start
+
+        rng = np.random.default_rng([seed, 0xC0DE])
+        self.zipcode_count = max(1, min(restaurants // 500, 900))
+        self.zipcodes = [f"{47001 + i:05d}" for i in range(self.zipcode_count)]
+        self.zipcode_centers = rng.uniform(-REGION_SPREAD_DEG, REGION_SPREAD_DEG, (self.zipcode_count, 2)) + REGION_CENTER
+        # Busy zipcodes hold more restaurants; critic activity is Zipf-distributed too
+        self.zipcode_cdf = zipf_probabilities(self.zipcode_count, 0.8)
+        self.critic_cdf = zipf_probabilities(critics, critic_exponent)
+        # Popular ranks are assigned to shuffled critics so heavy reviewers are not all "Sarah ..."
+        self.critic_order = rng.permutation(critics)
+        self.critic_probabilities = np.diff(self.critic_cdf, prepend=0.0)
+        self.critic_probabilities /= self.critic_probabilities.sum()
+        self.critic_names = [critic_name(index) for index in range(critics)]
+
+    @property
+    def shards(self) -> int:
+        return (self.restaurants + self.shard_size - 1) // self.shard_size
+
+    def generate_shard(self, shard: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Generate one shard of restaurants and their audit trails.
+
+        Args:
+            shard: Shard number
+
+        Returns:
+            (restaurant documents, audit documents)
+        """
+        restaurants, audit = [], []
+        for restaurant, trail in self.iter_shard(shard):
+            restaurants.append(restaurant)
+            audit.extend(trail)
+        return restaurants, audit
+
+    def iter_shard(self, shard: int) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Generate one shard restaurant by restaurant.
+
+        The shard's random draws are vectorized up front; documents are built
+        one restaurant at a time so only the row being written is held as dicts.
+
+        Args:
+            shard: Shard number
+
+        Yields:
+            (restaurant document, its audit documents)
+        """
+        rng = np.random.default_rng([self.seed, shard])
+        first = shard * self.shard_size
+        count = min(self.shard_size, self.restaurants - first)
+
+        zipcode_index = np.searchsorted(self.zipcode_cdf, rng.random(count))
+        coords = self.zipcode_centers[zipcode_index] + rng.normal(0, CLUSTER_SPREAD_DEG, (count, 2))
+        # A critic reviews a restaurant at most once, so no restaurant has more reviews than there are critics
+        review_counts = np.minimum(rng.zipf(self.review_exponent, count), min(self.max_reviews, self.critics))
+        total_reviews = int(review_counts.sum())
+        # Each restaurant gets a quality level; its ratings scatter around it
+        quality = rng.normal(3.6, 0.8, count)
+        ratings = np.clip(np.rint(np.repeat(quality, review_counts) + rng.normal(0, 0.9, total_reviews)), 1, 5).astype(int)
+        critics = self.critic_order[self._critic_ranks(rng, review_counts)]
+        phrases = rng.integers(0, 3, total_reviews)
+        base_sentiment = np.array([0.0] + [SENTIMENT_BY_RATING[stars] for stars in range(1, 6)])
+        sentiment = np.round(np.clip(base_sentiment[ratings] + rng.normal(0, 0.08, total_reviews), -1, 1), 2)
+        names = rng.integers(0, len(NAME_PREFIXES) * len(NAME_CUISINES), count)
+        streets = rng.integers(0, len(STREETS), count)
+        avg_ratings = np.round(np.add.reduceat(ratings, np.cumsum(review_counts) - review_counts) / review_counts, 2)
+
+        # Timestamps, vectorized: reviews follow the restaurant's creation at exponential gaps
+        start_s = int(self.start.timestamp())
+        created_s = start_s + rng.integers(0, 365 * 24 * 3600, count)
+        gaps = rng.exponential(3 * 24 * 3600, total_reviews).astype(np.int64) + 1
+        starts = np.cumsum(review_counts) - review_counts
+        cumulative = np.cumsum(gaps)
+        # Restart the running sum of gaps at each restaurant's first review
+        group_start = np.repeat(cumulative[starts] - gaps[starts], review_counts)
+        reviewed_s = np.repeat(created_s, review_counts) + cumulative - group_start
+        created_iso = [f"{value}Z" for value in np.datetime_as_string(created_s.astype('datetime64[s]'))]
+        reviewed_iso = [f"{value}Z" for value in np.datetime_as_string(reviewed_s.astype('datetime64[s]'))]
+
+        ratings, critics, phrases, sentiment = ratings.tolist(), critics.tolist(), phrases.tolist(), sentiment.tolist()
+        coords = np.round(coords, 6).tolist()
+        position = 0
+        for row in range(count):
+            restaurant_id = str(first + row + 1)
+            created_at = created_iso[row]
+            prefix, cuisine = divmod(int(names[row]), len(NAME_CUISINES))
+            address = {
+                'building': str(100 + (first + row) % 900),
+                'coord': coords[row],
+                'street': STREETS[streets[row]],
+                'zipcode': self.zipcodes[zipcode_index[row]]
+            }
+            name = f"{NAME_PREFIXES[prefix]} {NAME_CUISINES[cuisine]} {restaurant_id}"
+            audit = []
+            audit.append({'key': 'name', 'value': name, 'restaurant_id': restaurant_id, 'action_by': 'system',
+                          'action': 'insert', 'time_of_action': created_at})
+            audit.append({'key': 'address', 'value': address, 'restaurant_id': restaurant_id,
+                          'action_by': 'system', 'action': 'insert', 'time_of_action': created_at})
+
+            reviews = []
+            end = position + int(review_counts[row])
+            for i in range(position, end):
+                rating = ratings[i]
+                critic = self.critic_names[critics[i]]
+                review = {
+                    'name': critic,
+                    'review': REVIEW_PHRASES[rating][phrases[i]],
+                    'rating': rating,
+                    'sentiment_score': sentiment[i]
+                }
+                reviews.append(review)
+                audit.append({'key': 'user_reviews', 'value': review, 'restaurant_id': restaurant_id,
+                              'action_by': critic, 'action': 'insert', 'time_of_action': reviewed_iso[i]})
+
+            restaurant = {
+                'name': name,
+                'restaurant_id': restaurant_id,
+                'address': address,
+                'avg_rating': float(avg_ratings[row]),
+                'critic_reviews': reviews,
+                'created_at': created_at,
+                'updated_at': reviewed_iso[end - 1]
+            }
+            position = end
+            yield restaurant, audit
+
+    def _draw_ranks(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return np.minimum(np.searchsorted(self.critic_cdf, rng.random(size)), self.critics - 1)
+
+    def _repeats(self, restaurant: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+        """Mask of reviews whose critic already reviewed the same restaurant earlier in the shard."""
+        keys = restaurant.astype(np.int64) * self.critics + ranks
+        order = np.argsort(keys, kind='stable')
+        repeated = np.zeros(len(keys), dtype=bool)
+        repeated[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+        return repeated
+
+    def _critic_ranks(self, rng: np.random.Generator, review_counts: np.ndarray) -> np.ndarray:
+        """
+        Zipf-distributed critic ranks for every review, distinct within each restaurant.
+
+        All reviews are drawn at once and only repeats are redrawn. Restaurants
+        still holding a repeat after a few rounds (reviewed by most of a small
+        critic pool) are redrawn whole with a weighted draw without replacement.
+        """
+        restaurant = np.repeat(np.arange(len(review_counts)), review_counts)
+        ranks = self._draw_ranks(rng, len(restaurant))
+        for _ in range(CRITIC_REDRAW_ROUNDS):
+            repeated = self._repeats(restaurant, ranks)
+            if not repeated.any():
+                return ranks
+            ranks[repeated] = self._draw_ranks(rng, int(repeated.sum()))
+        starts = np.cumsum(review_counts) - review_counts
+        for row in np.unique(restaurant[self._repeats(restaurant, ranks)]):
+            ranks[starts[row]:starts[row] + review_counts[row]] = rng.choice(
+                self.critics, int(review_counts[row]), replace=False, p=self.critic_probabilities
+            )
+        return ranks
+
+    def users(self) -> List[Dict[str, Any]]:
+        """One login per critic, plus the admin account."""
+        users = [{'name': 'Admin', 'password': 'admin', 'email': 'admin@gmail.com'}]
+        for index in range(self.critics):
+            name = critic_name(index)
+            users.append({
+                'name': name,
+                'password': f"critic{index}",
+                'email': f"{name.lower().replace(' ', '.')}@example.com"
+            })
+        return users
+
+
+class JsonlWriter:
+    """
+    Streams documents to a JSONL file, published atomically on a clean close.
+
+    Lines go to a sibling .tmp file that replaces `path` only when the
+    context exits without an error, so readers never see a partial shard.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_suffix('.tmp')
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> 'JsonlWriter':
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.tmp_path.open('w', encoding='utf-8')
+        return self
+
+    def write(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for doc in docs:
+            self._file.write(json.dumps(doc, separators=(',', ':')) + '\n')
+            self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        if exc_type is None:
+            self.tmp_path.replace(self.path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+
+
+def write_jsonl(path: Path, docs: Iterable[Dict[str, Any]]) -> None:
+    """Write documents one JSON object per line, publishing the file atomically."""
+    with JsonlWriter(path) as writer:
+        writer.write(docs)
+
+
+# Set in each pool worker by `_init_worker`
+_worker_data = None
+_worker_out_dir = None
+
+
+def _init_worker(data: SyntheticData, out_dir: str) -> None:
+    global _worker_data, _worker_out_dir
+    _worker_data, _worker_out_dir = data, Path(out_dir)
+
+
+def _write_shard(shard: int) -> Tuple[int, int]:
+    with JsonlWriter(_worker_out_dir / 'restaurants' / f"part-{shard:05d}.jsonl") as restaurants, \
+            JsonlWriter(_worker_out_dir / 'audit' / f"part-{shard:05d}.jsonl") as audit:
+        for restaurant, trail in _worker_data.iter_shard(shard):
+            restaurants.write((restaurant,))
+            audit.write(trail)
+    return restaurants.count, audit.count
+
+
+def generate(data: SyntheticData, out_dir: str, workers: int = 1) -> Dict[str, int]:
+    """
+    Write every shard plus the users file under `out_dir`.
+
+    Layout: restaurants/part-NNNNN.jsonl, audit/part-NNNNN.jsonl and
+    users/part-00000.jsonl, each directly readable by main.py.
+
+    Args:
+        data: Generator
+        out_dir: Output directory
+        workers: Processes generating shards in parallel
+
+    Returns:
+        Documents written per collection
+    """
+    counts = {'restaurants': 0, 'audit': 0}
+    with multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker,
+                                                   initargs=(data, out_dir)) as pool:
+        for restaurants, audit in pool.imap_unordered(_write_shard, range(data.shards)):
+            counts['restaurants'] += restaurants
+            counts['audit'] += audit
+            print(f"Wrote {counts['restaurants']}/{data.restaurants} restaurants")
+    users = data.users()
+    write_jsonl(Path(out_dir) / 'users' / 'part-00000.jsonl', users)
+    counts['users'] = len(users)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic restaurants, audit trails and users as JSONL")
+    parser.add_argument('--restaurants', type=int, default=100_000)
+    parser.add_argument('--critics', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--out', default=PATHS['GENERATED_DIR'])
+    args = parser.parse_args()
+
+    try:
+        data = SyntheticData(args.restaurants, args.critics, args.seed, args.shard_size)
+        started = time.perf_counter()
+        counts = generate(data, args.out, args.workers)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        print(f"Generated {json.dumps(counts)} in {elapsed:.1f}s ({total / elapsed:,.0f} docs/sec) under {args.out}")
+        print(f"Load with: RESTAURANT_DATA={args.out}/restaurants AUDIT_DATA={args.out}/audit "
+              f"USER_DATA={args.out}/users python main.py")
+    except GeneratorError as e:
+        print(f"An error occurred: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 import json
+import re
 from pathlib import Path
 from pymongo import MongoClient, ASCENDING, DESCENDING, GEOSPHERE
-from typing import List, Dict, Any
-from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Iterator
+from datetime import datetime, timedelta, timezone
 from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
 from constants import (
     MONGO_URI, DB_CONFIG, COLLECTIONS, VALIDATION_SCHEMAS, 
-    PATHS
+    PATHS, INSERT_BATCH_SIZE
 )
+from validation import compile_validators
+
+# Client-side copies of the server validators, checked before any insert
+VALIDATORS = compile_validators(VALIDATION_SCHEMAS)
 
 
 class DatabaseConnectionError(Exception):
@@ -66,6 +71,20 @@ class RestaurantReviewsDB:
             review['sentiment_score'] = self._convert_to_float(review['sentiment_score'])
         return review
 
+    def _process_timestamp(self, value: Any) -> Any:
+        """Convert an ISO timestamp string to a datetime."""
+        if not isinstance(value, str):
+            return value
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            # Hand-written data may overflow a field (e.g. 16:78); carry it over
+            match = re.match(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})', value)
+            if not match:
+                raise
+            year, month, day, hours, minutes, seconds = (int(part) for part in match.groups())
+            return datetime(year, month, day, tzinfo=timezone.utc) + timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
     def _process_restaurant_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
         """Process a single restaurant document."""
         # Process avg_rating
@@ -80,13 +99,80 @@ class RestaurantReviewsDB:
         if 'critic_reviews' in doc:
             doc['critic_reviews'] = [self._process_review(review) for review in doc['critic_reviews']]
         
+        # Process timestamps
+        for field in ('created_at', 'updated_at'):
+            if field in doc:
+                doc[field] = self._process_timestamp(doc[field])
+        
+        return doc
+
+    def _process_audit_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single audit document."""
+        # Store time_of_action as a real date so range queries use the index
+        doc['time_of_action'] = self._process_timestamp(doc.get('time_of_action'))
         return doc
 
-    def _load_json_data(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Load and parse JSON data from file."""
+    def _load_jsonl_data(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """Stream one JSON document per line."""
         with file_path.open('r', encoding='utf-8') as file:
-            data = json.load(file)
-            return data if isinstance(data, list) else [data]
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _load_json_data(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """Stream documents from a JSON file, a .jsonl file or a directory of .jsonl shards."""
+        if file_path.is_dir():
+            for part in sorted(file_path.glob('*.jsonl')):
+                yield from self._load_jsonl_data(part)
+        elif file_path.suffix == '.jsonl':
+            yield from self._load_jsonl_data(file_path)
+        else:
+            with file_path.open('r', encoding='utf-8') as file:
+                data = json.load(file)
+            yield from data if isinstance(data, list) else [data]
+
+    def _validate_documents(self, data: Iterable[Dict[str, Any]], collection_name: str) -> Iterator[Dict[str, Any]]:
+        """Drop documents the collection's validator would reject, reporting why."""
+        validator = VALIDATORS.get(collection_name)
+        if validator is None:
+            yield from data
+            return
+        invalid = 0
+        for doc in data:
+            errors = validator(doc)
+            if errors:
+                invalid += 1
+                if invalid <= 5:
+                    print(f"Warning: Skipping invalid {collection_name} document: {'; '.join(errors)}")
+            else:
+                yield doc
+        if invalid:
+            print(f"Warning: Skipped {invalid} invalid documents for {collection_name}")
+
+    def iter_json_file(self, file_path: str, collection_name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream processed, valid documents from a JSON file, .jsonl file or shard directory.
+        
+        Documents are read, processed and validated one at a time, so memory
+        does not grow with the size of the input.
+        
+        Args:
+            file_path: Path to the data
+            collection_name: Name of the collection
+            
+        Returns:
+            Iterator of processed documents
+        """
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(file_path)
+        print(f"Reading data for {collection_name} from {file_path}")
+        data = self._load_json_data(path)
+        if collection_name == COLLECTIONS['RESTAURANTS']:
+            data = (self._process_restaurant_doc(doc) for doc in data)
+        elif collection_name == COLLECTIONS['AUDIT']:
+            data = (self._process_audit_doc(doc) for doc in data)
+        return self._validate_documents(data, collection_name)
 
     def read_json_file(self, file_path: str, collection_name: str) -> List[Dict[str, Any]]:
         """
@@ -100,20 +186,12 @@ class RestaurantReviewsDB:
             List of processed documents
         """
         try:
-            path = Path(file_path)
-            print(f"Reading data for {collection_name} from {file_path}")
-            
-            # Load data
-            data_list = self._load_json_data(path)
+            data_list = list(self.iter_json_file(file_path, collection_name))
             
             if not data_list:
                 print(f"Warning: No data found in {file_path}")
                 return []
             
-            # Process data based on collection type
-            if collection_name == COLLECTIONS['RESTAURANTS']:
-                data_list = [self._process_restaurant_doc(doc) for doc in data_list]
-            
             print(f"Successfully read {len(data_list)} records for {collection_name}")
             return data_list
             
@@ -191,6 +269,12 @@ class RestaurantReviewsDB:
                 collection.create_index([("action", ASCENDING)])
                 print("Audit indexes created successfully")
                 
+            elif collection_name == COLLECTIONS['AUDIT_SNAPSHOTS']:
+                # Nearest snapshot at or before a point in time
+                print("Creating audit snapshot indexes...")
+                collection.create_index([("restaurant_id", ASCENDING), ("as_of", DESCENDING)])
+                print("Audit snapshot indexes created successfully")
+                
             elif collection_name == COLLECTIONS['USERS']:
                 # Create specific indexes for users
                 print("Creating user-specific indexes...")
@@ -202,7 +286,31 @@ class RestaurantReviewsDB:
             print(f"Error creating indexes for {collection_name}: {e}")
             raise CollectionSetupError(f"Failed to create indexes for {collection_name}: {e}")
 
-    def setup_collection(self, collection_name: str, data: List[Dict[str, Any]]) -> int:
+    def _insert_batch(self, collection_name: str, batch: List[Dict[str, Any]]) -> int:
+        try:
+            return len(self.db[collection_name].insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as bwe:
+            errors = bwe.details.get('writeErrors', [])
+            first = f" (first: {errors[0].get('errmsg')})" if errors else ""
+            print(f"Bulk write error in {collection_name}: {len(errors)} documents rejected{first}")
+            return bwe.details.get('nInserted', 0)
+
+    def setup_collection(self, collection_name: str, data: Iterable[Dict[str, Any]],
+                         batch_size: int = INSERT_BATCH_SIZE) -> int:
+        """
+        Create a collection with its validator and indexes, then insert the documents.
+        
+        Documents are consumed lazily and inserted `batch_size` at a time, so
+        a streamed input is never held in memory whole.
+        
+        Args:
+            collection_name: Name of the collection
+            data: Documents (a list or a stream such as `iter_json_file`)
+            batch_size: Documents per insert_many
+            
+        Returns:
+            Number of documents inserted
+        """
         try:
             print(f"\nSetting up collection: {collection_name}")
             
@@ -212,33 +320,42 @@ class RestaurantReviewsDB:
             # Create indexes
             self.create_indexes(collection_name)
             
-            # Add timestamps if needed
+            # Add timestamps if needed (generated data carries its own) and insert in batches
             current_time = datetime.now(timezone.utc)
+            inserted_count, batch = 0, []
             for doc in data:
-                doc['created_at'] = current_time
-                doc['updated_at'] = current_time
+                doc.setdefault('created_at', current_time)
+                doc.setdefault('updated_at', current_time)
+                batch.append(doc)
+                if len(batch) == batch_size:
+                    inserted_count += self._insert_batch(collection_name, batch)
+                    batch = []
+            if batch:
+                inserted_count += self._insert_batch(collection_name, batch)
             
-            # Insert data
-            if data:
-                print(f"Inserting {len(data)} documents into {collection_name}")
-                collection = self.db[collection_name]
-                result = collection.insert_many(data, ordered=False)
-                inserted_count = len(result.inserted_ids)
+            if inserted_count:
                 print(f"Successfully inserted {inserted_count} documents into {collection_name}")
-                return inserted_count
             else:
                 print(f"No data to insert into {collection_name}")
-                return 0
-            
-        except BulkWriteError as bwe:
-            print(f"Bulk write error details: {bwe.details}")
-            inserted_count = bwe.details.get('nInserted', 0)
-            print(f"Partial success: Inserted {inserted_count} documents into {collection_name}")
             return inserted_count
+            
+        except FileNotFoundError as e:
+            print(f"Error: Data file not found: {e}")
+            return 0
+        except json.JSONDecodeError as e:
+            print(f"Error: Invalid JSON for {collection_name}: {e}")
+            return 0
         except Exception as e:
             print(f"Error in setup_collection for {collection_name}: {str(e)}")
             raise DataImportError(f"Failed to import data into {collection_name}: {str(e)}")
 
+    def _setup_from_file(self, collection_name: str, file_path: str) -> int:
+        """Stream a data file into a fresh collection."""
+        if not Path(file_path).exists():
+            print(f"Error: Data file not found: {file_path}")
+            return 0
+        return self.setup_collection(collection_name, self.iter_json_file(file_path, collection_name))
+
     def setup_database(self) -> Dict[str, int]:
         results = {}
         
@@ -251,21 +368,19 @@ class RestaurantReviewsDB:
 
             # Process restaurants first
             print("\nProcessing restaurants collection...")
-            restaurant_data = self.read_json_file(PATHS['RESTAURANT_DATA'], COLLECTIONS['RESTAURANTS'])
-            if restaurant_data:
-                results[COLLECTIONS['RESTAURANTS']] = self.setup_collection(COLLECTIONS['RESTAURANTS'], restaurant_data)
+            results[COLLECTIONS['RESTAURANTS']] = self._setup_from_file(COLLECTIONS['RESTAURANTS'], PATHS['RESTAURANT_DATA'])
             
             # Process audit data
             print("\nProcessing audit collection...")
-            audit_data = self.read_json_file(PATHS['AUDIT_DATA'], COLLECTIONS['AUDIT'])
-            if audit_data:
-                results[COLLECTIONS['AUDIT']] = self.setup_collection(COLLECTIONS['AUDIT'], audit_data)
+            results[COLLECTIONS['AUDIT']] = self._setup_from_file(COLLECTIONS['AUDIT'], PATHS['AUDIT_DATA'])
+            
+            # Snapshots are derived from the audit log, only the indexes are set up here
+            self.create_collection_if_not_exists(COLLECTIONS['AUDIT_SNAPSHOTS'])
+            self.create_indexes(COLLECTIONS['AUDIT_SNAPSHOTS'])
             
             # Process user data
             print("\nProcessing users collection...")
-            user_data = self.read_json_file(PATHS['USER_DATA'], COLLECTIONS['USERS'])
-            if user_data:
-                results[COLLECTIONS['USERS']] = self.setup_collection(COLLECTIONS['USERS'], user_data)
+            results[COLLECTIONS['USERS']] = self._setup_from_file(COLLECTIONS['USERS'], PATHS['USER_DATA'])
 
             return results
             
@@ -0,0 +1,384 @@
+import argparse
+import json
+import math
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from bson import json_util
+from pymongo import DeleteOne, ReplaceOne
+from constants import COLLECTIONS, PATHS
+from main import RestaurantReviewsDB
+
+
+class SnapshotError(Exception):
+    """Exception raised for snapshot export/import issues"""
+    pass
+
+
+SNAPSHOT_VERSION = 2
+
+# Column name -> dtype; 'str' columns are stored as a string heap plus offsets.
+# Rows are keyed by `doc_id`, the document's _id as Extended JSON.
+RESTAURANT_COLUMNS = {
+    'doc_id': 'str',
+    'restaurant_id': 'str',
+    'name': 'str',
+    'building': 'str',
+    'street': 'str',
+    'zipcode': 'str',
+    'lon': np.float64,
+    'lat': np.float64,
+    'avg_rating': np.float64,
+    'created_at': np.int64,
+    'updated_at': np.int64,
+    'review_start': np.int64,
+    'review_count': np.int32
+}
+
+REVIEW_COLUMNS = {
+    'restaurant_row': np.int64,
+    'critic': 'str',
+    'review': 'str',
+    'rating': np.float64,
+    'sentiment_score': np.float64
+}
+
+# doc_ids of restaurants deleted since the previous part
+TOMBSTONE_COLUMNS = {
+    'deleted_id': 'str'
+}
+
+
+def _to_ms(value: Any) -> int:
+    """Convert a date (or ISO string) to epoch milliseconds, -1 if missing."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if not isinstance(value, datetime):
+        return -1
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value: int) -> Optional[datetime]:
+    return None if value < 0 else datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+
+def _doc_id(value: Any) -> str:
+    """Key a document by its _id, keeping the BSON type (ObjectId or not) for import."""
+    return json_util.dumps(value)
+
+
+class StringColumn:
+    """Zero-copy view over a string heap (<name>.heap) and its offsets (<name>.offsets.npy)."""
+
+    def __init__(self, directory: Path, name: str):
+        self.offsets = np.load(directory / f"{name}.offsets.npy", mmap_mode='r')
+        heap_path = directory / f"{name}.heap"
+        size = heap_path.stat().st_size
+        # np.memmap cannot map an empty file
+        self.heap = np.memmap(heap_path, dtype=np.uint8, mode='r') if size else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.heap[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+
+def _write_column(directory: Path, name: str, dtype: Any, values: List[Any]) -> None:
+    if dtype == 'str':
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        (directory / f"{name}.heap").write_bytes(b''.join(encoded))
+        np.save(directory / f"{name}.offsets.npy", offsets)
+    else:
+        np.save(directory / f"{name}.npy", np.asarray(values, dtype=dtype))
+
+
+class SnapshotPart:
+    """One exported part, with every column opened through np.memmap."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.restaurants = {name: self._open(name, dtype) for name, dtype in RESTAURANT_COLUMNS.items()}
+        self.reviews = {name: self._open(name, dtype) for name, dtype in REVIEW_COLUMNS.items()}
+        self.tombstones = {name: self._open(name, dtype) for name, dtype in TOMBSTONE_COLUMNS.items()}
+
+    def _open(self, name: str, dtype: Any) -> Any:
+        if dtype == 'str':
+            return StringColumn(self.directory, name)
+        return np.load(self.directory / f"{name}.npy", mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.restaurants['avg_rating'])
+
+    def document(self, row: int) -> Dict[str, Any]:
+        """Rebuild the restaurant document stored at `row`."""
+        r = self.restaurants
+        start, count = int(r['review_start'][row]), int(r['review_count'][row])
+        reviews = []
+        for i in range(start, start + count):
+            review = {
+                'name': self.reviews['critic'][i],
+                'review': self.reviews['review'][i],
+                'rating': float(self.reviews['rating'][i])
+            }
+            sentiment = float(self.reviews['sentiment_score'][i])
+            if not math.isnan(sentiment):
+                review['sentiment_score'] = sentiment
+            reviews.append(review)
+        doc = {
+            '_id': json_util.loads(r['doc_id'][row]),
+            'restaurant_id': r['restaurant_id'][row],
+            'name': r['name'][row],
+            'address': {
+                'building': r['building'][row],
+                'coord': [float(r['lon'][row]), float(r['lat'][row])],
+                'street': r['street'][row],
+                'zipcode': r['zipcode'][row]
+            },
+            'avg_rating': float(r['avg_rating'][row]),
+            'critic_reviews': reviews
+        }
+        for field in ('created_at', 'updated_at'):
+            value = _from_ms(int(r[field][row]))
+            if value is not None:
+                doc[field] = value
+        return doc
+
+
+class RestaurantSnapshot:
+    """
+    Columnar on-disk snapshot of the restaurants collection.
+
+    A snapshot directory holds a manifest and one or more parts. Each part
+    stores restaurants and their flattened reviews as fixed-width .npy
+    columns plus string heaps with offsets, all readable via np.memmap. An
+    incremental export appends a part with the restaurants updated since the
+    previous one, plus tombstones for the ones deleted since; readers
+    resolve a restaurant (by _id) to its latest part, or drop it when that
+    part deleted it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / 'manifest.json'
+
+    def manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {'version': SNAPSHOT_VERSION, 'parts': []}
+        manifest = json.loads(self.manifest_path.read_text())
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version: {manifest.get('version')}")
+        return manifest
+
+    def export(self, docs: Iterator[Dict[str, Any]], live_ids: Optional[Iterable[Any]] = None) -> Dict[str, Any]:
+        """
+        Write restaurant documents as a new part.
+
+        The part is written to a temporary directory and renamed into place,
+        then published in the manifest, so an export that dies half way
+        leaves nothing a later export trips over.
+
+        Args:
+            docs: Restaurant documents with their _id (e.g. a Mongo cursor)
+            live_ids: _id of every restaurant that currently exists; snapshot
+                restaurants not among them are recorded as deleted
+
+        Returns:
+            Manifest entry of the written part
+        """
+        restaurants: Dict[str, List[Any]] = {name: [] for name in RESTAURANT_COLUMNS}
+        reviews: Dict[str, List[Any]] = {name: [] for name in REVIEW_COLUMNS}
+        tombstones: Dict[str, List[Any]] = {name: [] for name in TOMBSTONE_COLUMNS}
+        if live_ids is not None:
+            live = {_doc_id(value) for value in live_ids}
+            tombstones['deleted_id'] = sorted(doc_id for doc_id in self.latest_ids() if doc_id not in live)
+
+        for row, doc in enumerate(docs):
+            if '_id' not in doc:
+                raise SnapshotError(f"Restaurant without an _id: {doc.get('restaurant_id')!r}")
+            address = doc.get('address') or {}
+            coord = address.get('coord') or [math.nan, math.nan]
+            doc_reviews = doc.get('critic_reviews') or []
+            restaurants['doc_id'].append(_doc_id(doc['_id']))
+            restaurants['restaurant_id'].append(str(doc.get('restaurant_id', '')))
+            restaurants['name'].append(doc.get('name', ''))
+            restaurants['building'].append(address.get('building', ''))
+            restaurants['street'].append(address.get('street', ''))
+            restaurants['zipcode'].append(address.get('zipcode', ''))
+            restaurants['lon'].append(float(coord[0]))
+            restaurants['lat'].append(float(coord[1]))
+            restaurants['avg_rating'].append(float(doc.get('avg_rating') or 0.0))
+            restaurants['created_at'].append(_to_ms(doc.get('created_at')))
+            restaurants['updated_at'].append(_to_ms(doc.get('updated_at')))
+            restaurants['review_start'].append(len(reviews['critic']))
+            restaurants['review_count'].append(len(doc_reviews))
+            for review in doc_reviews:
+                sentiment = review.get('sentiment_score')
+                reviews['restaurant_row'].append(row)
+                reviews['critic'].append(review.get('name', ''))
+                reviews['review'].append(review.get('review', ''))
+                reviews['rating'].append(float(review.get('rating') or 0.0))
+                reviews['sentiment_score'].append(math.nan if sentiment is None else float(sentiment))
+
+        manifest = self.manifest()
+        name = f"part-{len(manifest['parts']):05d}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=self.directory))
+        for column, dtype in RESTAURANT_COLUMNS.items():
+            _write_column(tmp_dir, column, dtype, restaurants[column])
+        for column, dtype in REVIEW_COLUMNS.items():
+            _write_column(tmp_dir, column, dtype, reviews[column])
+        for column, dtype in TOMBSTONE_COLUMNS.items():
+            _write_column(tmp_dir, column, dtype, tombstones[column])
+        part_dir = self.directory / name
+        if part_dir.exists():
+            # Left by an export that crashed before publishing it
+            shutil.rmtree(part_dir)
+        tmp_dir.rename(part_dir)
+
+        entry = {
+            'name': name,
+            'restaurants': len(restaurants['name']),
+            'reviews': len(reviews['critic']),
+            'deleted': len(tombstones['deleted_id']),
+            'max_updated_at': max(restaurants['updated_at'], default=-1)
+        }
+        manifest['parts'].append(entry)
+        # Publish the part only once all of its columns are on disk
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        tmp_path.replace(self.manifest_path)
+        return entry
+
+    def high_watermark(self) -> Optional[datetime]:
+        """Latest `updated_at` covered by the snapshot, for incremental exports."""
+        return _from_ms(max((part['max_updated_at'] for part in self.manifest()['parts']), default=-1))
+
+    def parts(self) -> List[SnapshotPart]:
+        return [SnapshotPart(self.directory / part['name']) for part in self.manifest()['parts']]
+
+    def _latest(self) -> Dict[str, tuple]:
+        latest: Dict[str, tuple] = {}
+        for part in self.parts():
+            deleted = part.tombstones['deleted_id']
+            for i in range(len(deleted)):
+                latest.pop(deleted[i], None)
+            ids = part.restaurants['doc_id']
+            for row in range(len(part)):
+                latest[ids[row]] = (part, row)
+        return latest
+
+    def latest_ids(self) -> List[str]:
+        """doc_id of every restaurant the snapshot holds."""
+        return list(self._latest())
+
+    def deleted_ids(self) -> List[str]:
+        """doc_id of every restaurant a part deleted and no later part brought back."""
+        latest = self._latest()
+        deleted = set()
+        for part in self.parts():
+            column = part.tombstones['deleted_id']
+            deleted.update(column[i] for i in range(len(column)))
+        return sorted(deleted - latest.keys())
+
+    def latest_rows(self) -> List[tuple]:
+        """(part, row) of the newest version of every restaurant."""
+        return list(self._latest().values())
+
+    def documents(self) -> Iterator[Dict[str, Any]]:
+        """Yield the newest version of every restaurant as a document."""
+        for part, row in self.latest_rows():
+            yield part.document(row)
+
+
+def export_snapshot(db: Any, directory: str, incremental: bool = False) -> Dict[str, Any]:
+    """
+    Export the restaurants collection to a columnar snapshot.
+
+    Incremental exports find changed restaurants by `updated_at`, which
+    every restaurant writer stamps: the app's MongoSQLParser, bulk review
+    ingestion, sentiment backfill and dedupe flagging. A write made
+    outside them that leaves `updated_at` alone is only picked up by a
+    full export.
+
+    Args:
+        db: Database handle
+        directory: Snapshot directory
+        incremental: Only export restaurants updated since the last part
+
+    Returns:
+        Manifest entry of the written part
+    """
+    snapshot = RestaurantSnapshot(directory)
+    collection = db[COLLECTIONS['RESTAURANTS']]
+    query: Dict[str, Any] = {}
+    if incremental:
+        watermark = snapshot.high_watermark()
+        if watermark is not None:
+            query = {'updated_at': {'$gt': watermark}}
+    # Deletes leave no updated_at behind: find them by diffing the _ids
+    live_ids = [doc['_id'] for doc in collection.find({}, {'_id': 1})]
+    cursor = collection.find(query).sort('updated_at', 1)
+    return snapshot.export(cursor, live_ids)
+
+
+def import_snapshot(db: Any, directory: str, batch_size: int = 1000) -> int:
+    """
+    Load a snapshot into the restaurants collection, replacing by _id and
+    deleting the restaurants the snapshot recorded as deleted.
+
+    Args:
+        db: Database handle
+        directory: Snapshot directory
+        batch_size: Documents per bulk write
+
+    Returns:
+        Number of restaurants written or deleted
+    """
+    collection = db[COLLECTIONS['RESTAURANTS']]
+    snapshot = RestaurantSnapshot(directory)
+    written, batch = 0, []
+    deletes = (DeleteOne({'_id': json_util.loads(doc_id)}) for doc_id in snapshot.deleted_ids())
+    replaces = (ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in snapshot.documents())
+    for operation in (*deletes, *replaces):
+        batch.append(operation)
+        if len(batch) == batch_size:
+            collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        written += len(batch)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar snapshot export/import of the restaurants collection")
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('--dir', default=PATHS['SNAPSHOT_DIR'])
+    parser.add_argument('--incremental', action='store_true', help="Only export restaurants updated since the last export")
+    args = parser.parse_args()
+
+    try:
+        db_setup = RestaurantReviewsDB()
+        if args.command == 'export':
+            entry = export_snapshot(db_setup.db, args.dir, args.incremental)
+            print(f"Exported {entry['restaurants']} restaurants, {entry['reviews']} reviews and "
+                  f"{entry['deleted']} deletions to {args.dir}/{entry['name']}")
+        else:
+            count = import_snapshot(db_setup.db, args.dir)
+            print(f"Imported {count} restaurant writes and deletions from {args.dir}")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
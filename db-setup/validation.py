@@ -0,0 +1,224 @@
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Compiles the `$jsonSchema` validators in constants.VALIDATION_SCHEMAS into
+# plain Python closures so documents can be checked before a round trip to
+# the server. Only this module's stdlib imports are needed, so the app and
+# the backend can load it by file path.
+
+# A compiled check appends "path: message" strings for every violation
+Check = Callable[[Any, str, List[str]], None]
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# bsonType -> predicate on the Python value pymongo would encode as that type
+BSON_TYPES: Dict[str, Callable[[Any], bool]] = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, (list, tuple)),
+    'string': lambda value: isinstance(value, str),
+    'double': lambda value: isinstance(value, float),
+    'int': lambda value: _is_int(value) and INT32_MIN <= value <= INT32_MAX,
+    'long': _is_int,
+    'decimal': lambda value: type(value).__name__ == 'Decimal128',
+    'number': lambda value: isinstance(value, float) or _is_int(value),
+    'bool': lambda value: isinstance(value, bool),
+    'date': lambda value: isinstance(value, datetime),
+    'null': lambda value: value is None,
+    'binData': lambda value: isinstance(value, (bytes, bytearray)),
+    'objectId': lambda value: type(value).__name__ == 'ObjectId'
+}
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _compile_type(bson_type: Any) -> Check:
+    names = bson_type if isinstance(bson_type, list) else [bson_type]
+    predicates = tuple(BSON_TYPES[name] for name in names)
+    expected = ' or '.join(names)
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        for predicate in predicates:
+            if predicate(value):
+                return
+        errors.append(f"{path or 'document'}: expected {expected}, got {type(value).__name__}")
+    return check
+
+
+def compile_node(schema: Dict[str, Any]) -> Tuple[Check, Dict[str, Any]]:
+    """
+    Compile one schema node.
+
+    Args:
+        schema: A `$jsonSchema` node
+
+    Returns:
+        (check, children) where children maps property names, and '[]' for
+        array items, to the compiled child nodes used by field-level checks
+    """
+    checks: List[Check] = []
+    children: Dict[str, Any] = {}
+
+    if 'bsonType' in schema:
+        checks.append(_compile_type(schema['bsonType']))
+
+    if 'enum' in schema:
+        allowed = list(schema['enum'])
+
+        def check_enum(value: Any, path: str, errors: List[str]) -> None:
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    if 'minimum' in schema or 'maximum' in schema:
+        minimum, maximum = schema.get('minimum'), schema.get('maximum')
+
+        def check_range(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: {value} is below the minimum {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: {value} is above the maximum {maximum}")
+        checks.append(check_range)
+
+    if 'minLength' in schema or 'maxLength' in schema or 'pattern' in schema:
+        min_length, max_length = schema.get('minLength'), schema.get('maxLength')
+        # $jsonSchema patterns are unanchored searches, like re.search
+        pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+
+        def check_string(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: shorter than {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: longer than {max_length} characters")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{path}: {value!r} does not match {pattern.pattern}")
+        checks.append(check_string)
+
+    if 'required' in schema or 'properties' in schema:
+        required = tuple(schema.get('required', ()))
+        properties = []
+        for name, child_schema in schema.get('properties', {}).items():
+            child = compile_node(child_schema)
+            children[name] = child
+            properties.append((name, child[0]))
+        allowed = set(schema.get('properties', {})) | {'_id'} if schema.get('additionalProperties') is False else None
+
+        def check_object(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{_join(path, name)}: required")
+            for name, child_check in properties:
+                if name in value:
+                    child_check(value[name], _join(path, name), errors)
+            if allowed is not None:
+                for name in value.keys() - allowed:
+                    errors.append(f"{_join(path, name)}: unexpected field")
+        checks.append(check_object)
+
+    if 'items' in schema or 'minItems' in schema or 'maxItems' in schema:
+        min_items, max_items = schema.get('minItems'), schema.get('maxItems')
+        item = compile_node(schema['items']) if 'items' in schema else None
+        if item is not None:
+            children['[]'] = item
+        item_check = item[0] if item is not None else None
+
+        def check_array(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, (list, tuple)):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: fewer than {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: more than {max_items} items")
+            if item_check is not None:
+                for index, element in enumerate(value):
+                    item_check(element, f"{path}.{index}", errors)
+        checks.append(check_array)
+
+    checks = tuple(checks)
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        for node_check in checks:
+            node_check(value, path, errors)
+    return check, children
+
+
+class CompiledSchema:
+    """Validator for one collection, compiled once from its `$jsonSchema`."""
+
+    def __init__(self, json_schema: Dict[str, Any]):
+        self._check, self._children = compile_node(json_schema)
+
+    def __call__(self, doc: Dict[str, Any]) -> List[str]:
+        """
+        Validate a whole document.
+
+        Args:
+            doc: Document about to be inserted
+
+        Returns:
+            Violations as "path: message", empty when the document is valid
+        """
+        errors: List[str] = []
+        self._check(doc, '', errors)
+        return errors
+
+    def _resolve(self, field: str) -> Optional[Check]:
+        node: Tuple[Check, Dict[str, Any]] = (self._check, self._children)
+        for segment in field.split('.'):
+            children = node[1]
+            if segment in children:
+                node = children[segment]
+            elif '[]' in children and (segment.isdigit() or segment.startswith('$')):
+                # Array index or positional operator ($, $[], $[name])
+                node = children['[]']
+            else:
+                return None
+        return node[0]
+
+    def validate_fields(self, fields: Dict[str, Any]) -> List[str]:
+        """
+        Validate the values of a `$set`, addressed by dotted field paths.
+
+        Fields the schema does not describe are not checked.
+
+        Args:
+            fields: Dotted path -> new value
+
+        Returns:
+            Violations as "path: message", empty when every value is valid
+        """
+        errors: List[str] = []
+        for field, value in fields.items():
+            check = self._resolve(field)
+            if check is not None:
+                check(value, field, errors)
+        return errors
+
+
+def compile_validators(schemas: Dict[str, Dict[str, Any]]) -> Dict[str, CompiledSchema]:
+    """
+    Compile every collection's validator.
+
+    Args:
+        schemas: Collection name -> {'validator': {'$jsonSchema': ...}} (VALIDATION_SCHEMAS)
+
+    Returns:
+        Collection name -> compiled validator
+    """
+    return {
+        collection: CompiledSchema(options['validator']['$jsonSchema'])
+        for collection, options in schemas.items()
+    }